@@ -0,0 +1,311 @@
+#!/usr/bin/env python
+"""
+StockBot
+
+https://github.com/shirosaidev/stockbot
+
+Copyright (C) Chris Park (shirosai) 2021
+stockbot is released under the Apache 2.0 license. See
+LICENSE for the full license text.
+"""
+
+import json
+import optparse
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from itertools import product
+from types import SimpleNamespace
+
+from alpaca_trade_api.rest import APIError
+from pytz import timezone
+
+from stockbot import standin
+from stockbot.bot import Account, Context, StockBot
+from stockbot.config import Config
+from stockbot.fetcher import Quote
+from stockbot.history import TradeHistory
+from stockbot.orders import OrderExecutor
+from stockbot.scheduler import VirtualClock
+from stockbot.simulate import settled_sleep
+
+
+# runs a trading day of StockBot's phases (get stocks screening and ranking,
+# the buy loop, the sell loops and the end of day report) against synthetic
+# random walk stocks for 100, 1,000 and 10,000 symbols and shows each phase's
+# time, throughput (symbols screened, prices checked or orders reported per
+# sec) and peak python memory. quotes and alpaca (bars, calendar, orders) are
+# answered in process by the stand-in exchange's SimMarket/SimAccount with no
+# http, and the day runs on a virtual clock, so only stockbot's own work is
+# timed. settings come from config.py.sample, -k and -p change MAX_NUM_STOCKS
+# and PRICE_POLL_SECS (comma separated values are all run)
+#
+# results are compared to the baseline file and phases slower or using more
+# memory than it by more than the tolerance are flagged (exit 1), -s saves
+# the results as the new baseline. baselines are only comparable on the same
+# machine, run from repo root with: python -m benchmarks.bench_bot
+
+TZ = timezone('America/New_York')
+
+START_DATE = '2021-03-01'
+
+PHASES = ['get_stocks', 'buy', 'sell', 'report']
+
+BASELINE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'bench_bot.json')
+
+
+class SimQuotes:
+    """In-process stand-in for fetcher.QuoteFetcher, quotes of the simulated
+    market at the clock's time."""
+
+    def __init__(self, market, clock):
+        self.market = market
+        self.clock = clock
+
+    def fetch(self, symbol):
+        bar = self.market.quote(symbol, self.clock.now())
+        if bar is None:
+            return None
+        return Quote(symbol, 'NMS', bar['c'], bar['h'], bar['l'], bar['v'])
+
+    def fetch_all(self, symbols):
+        return {symbol: self.fetch(symbol) for symbol in symbols}
+
+
+class SimApi:
+    """In-process stand-in for the alpaca rest client, answers like the
+    stand-in server's alpaca routes without the http round trips."""
+
+    def __init__(self, market, clock):
+        self.market = market
+        self.clock = clock
+        self.account = standin.SimAccount(market, clock)
+
+    def result(self, response):
+        status, body = response
+        if status != 200:
+            raise APIError(body)
+        if isinstance(body, list):
+            return [SimpleNamespace(**item) for item in body]
+        return SimpleNamespace(**body)
+
+    def get_barset(self, symbols, timeframe, limit=None, **kwargs):
+        now = self.clock.now()
+        return {symbol: [SimpleNamespace(**bar) for bar in self.market.bars(symbol, now, limit)]
+                for symbol in symbols.split(',')}
+
+    def get_calendar(self, start, end):
+        return [SimpleNamespace(**day) for day in self.market.calendar(start, end)]
+
+    def submit_order(self, symbol, qty, side, type, time_in_force, client_order_id=None):
+        return self.result(self.account.submit({'symbol': symbol, 'qty': qty, 'side': side, 'type': type,
+                                                'time_in_force': time_in_force,
+                                                'client_order_id': client_order_id}))
+
+    def get_order(self, order_id):
+        return self.result(self.account.get_order(order_id=order_id))
+
+    def get_order_by_client_order_id(self, client_order_id):
+        return self.result(self.account.get_order(client_order_id=client_order_id))
+
+    def list_orders(self, status='open', limit=50, after=None, direction='desc'):
+        query = {'status': status, 'limit': limit, 'direction': direction}
+        if after is not None:
+            query['after'] = after
+        return self.result(self.account.list_orders(query))
+
+    def list_positions(self):
+        return self.result(self.account.list_positions())
+
+
+def sim_market(numstocks, history):
+    # random walk stocks for two trading days from START_DATE, each symbol's
+    # minute prices are made once and kept, so they're not made again in
+    # every run's (timed) phases
+    market = standin.SimMarket.synthetic(numstocks, START_DATE, 2, history=history)
+    path_fn = market.path_fn
+    paths = {}
+
+    def kept_path(i, d):
+        if (i, d) not in paths:
+            paths[i, d] = path_fn(i, d)
+        return paths[i, d]
+    market.path_fn = kept_path
+    return market
+
+
+def make_bot(market, config, options):
+    # a StockBot with its clients pointed at the simulated market, on a
+    # virtual clock at midnight of the first day
+    clock = VirtualClock(TZ, TZ.localize(datetime.combine(market.days[-2].item(), datetime.min.time())))
+    api = SimApi(market, clock)
+    context = Context(config)
+    orders = OrderExecutor(api, max_workers=config.ORDER_WORKERS, max_retries=config.ORDER_MAX_RETRIES,
+                           max_backoff=config.ORDER_MAX_BACKOFF, sleep=clock.sleep)
+    context.accounts[None] = Account(None, api, orders, None, None, None)
+    context.fetcher = SimQuotes(market, clock)
+    context.barstore = None
+    context.market.now = lambda: clock.now().timestamp()
+    context.market.screener_fn = lambda: {'data': {'table': {'rows': [
+        {'symbol': symbol, 'name': market.company(symbol)} for symbol in market.symbols]}}}
+    context.market.listed_fn = lambda: [(symbol, market.company(symbol)) for symbol in market.symbols]
+    bot = StockBot(context, options.tradealgo, options.startbuytime, 'poll', clock=clock,
+                   params=context.strategy_params({'STOCK_UNIVERSE': options.universe}),
+                   history=TradeHistory(config.HISTORY_FILE) if config.HISTORY_FILE else None)
+    bot.feed.sleep = settled_sleep(bot.orders, clock.sleep)
+    return bot
+
+
+def run_day(market, config, options, trace=False):
+    # {phase: (secs, items, peak bytes)} of the day's phases, items is the
+    # number of symbols screened, prices checked or orders reported. sell and
+    # report before anything was bought (buying at close) aren't counted
+    bot = make_bot(market, config, options)
+    checked = [0]
+    next_prices = bot.feed.next_prices
+
+    def counted(symbols):
+        prices = next_prices(symbols)
+        checked[0] += len(prices)
+        return prices
+    bot.feed.next_prices = counted
+
+    results = {}
+    try:
+        for phase in bot.scheduler:
+            if phase.name in ('sell', 'report') and bot.book is None:
+                getattr(bot, phase.name)(phase)
+                continue
+            checked[0] = 0
+            if trace:
+                tracemalloc.reset_peak()
+            start = time.perf_counter()
+            getattr(bot, phase.name)(phase)
+            secs = time.perf_counter() - start
+            peak = tracemalloc.get_traced_memory()[1] if trace else None
+            if phase.name == 'get_stocks':
+                items = len(market.symbols)
+            elif phase.name == 'report':
+                items = len(bot.ledger.seen)
+            else:
+                items = checked[0]
+            results.setdefault(phase.name, (secs, items, peak))
+            if phase.name == 'report':
+                return results
+    finally:
+        bot.context.close()
+
+
+def measure(market, config, options):
+    # best time of repeat runs, peak memory from a traced run after them so
+    # it doesn't count the simulated prices made by the first one
+    runs = [run_day(market, config, options) for _ in range(options.repeat)]
+    tracemalloc.start()
+    try:
+        traced = run_day(market, config, options, trace=True)
+    finally:
+        tracemalloc.stop()
+    results = {}
+    for name in PHASES:
+        secs, items, _ = min((run[name] for run in runs), key=lambda result: result[0])
+        results[name] = {'secs': secs, 'items': items, 'rate': items / secs if secs else 0,
+                         'peak_bytes': traced[name][2]}
+    return results
+
+
+def run_key(options, numstocks, maxstocks, pollsecs):
+    return '{} {} {} n={} k={} p={}'.format(options.tradealgo, options.startbuytime, options.universe, numstocks,
+                                            maxstocks, pollsecs)
+
+
+def int_list(value):
+    return [int(v) for v in value.split(',')]
+
+
+def main():
+    parser = optparse.OptionParser(usage="Usage: python -m benchmarks.bench_bot [-h] [options]")
+    parser.add_option('-n', '--numstocks', default='100,1000,10000',
+                        help='numbers of synthetic symbols to screen, default "%default"')
+    parser.add_option('-k', '--maxstocks',
+                        help='MAX_NUM_STOCKS values, default the one in config.py.sample')
+    parser.add_option('-p', '--pollsecs',
+                        help='PRICE_POLL_SECS values, default the one in config.py.sample')
+    parser.add_option('-t', '--tradealgo', default='moved',
+                        help='algo to use for trading, options are moved, lowtomarket or lowtohigh, default "%default"')
+    parser.add_option('-b', '--startbuytime', default='buyatopen',
+                        help='when to starting buying stocks, options are buyatopen, and buyatclose, default "%default"')
+    parser.add_option('-u', '--universe', default='screener',
+                        help='stocks to pick from, screener or listed, default "%default"')
+    parser.add_option('-r', '--repeat', type='int', default=5,
+                        help='times to run each day, the best time is shown, default "%default"')
+    parser.add_option('-B', '--baseline', default=BASELINE_FILE,
+                        help='baseline results file to compare to, default "%default"')
+    parser.add_option('-s', '--save', action='store_true', default=False,
+                        help='save the results to the baseline file (adds to or replaces its runs)')
+    parser.add_option('-T', '--tolerance', type='float', default=0.5,
+                        help='fraction slower or more memory than the baseline that is flagged, default "%default"')
+    options, args = parser.parse_args()
+
+    sample = Config.load(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                      'config.py.sample'))
+    maxstocks = int_list(options.maxstocks) if options.maxstocks else [sample.MAX_NUM_STOCKS]
+    pollsecs = int_list(options.pollsecs) if options.pollsecs else [sample.PRICE_POLL_SECS]
+
+    baseline = {}
+    if os.path.exists(options.baseline):
+        with open(options.baseline) as f:
+            baseline = json.load(f)
+
+    print('best of {} runs'.format(options.repeat))
+    print('{:<48} {:<10} {:>10} {:>12} {:>10} {:>12}'.format('run', 'phase', 'time', 'per sec', 'peak mem',
+                                                           'vs baseline'))
+    results = {}
+    failed = False
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmpdir:
+        # the report's trade history and csv files are written to the current directory
+        os.chdir(tmpdir)
+        try:
+            for numstocks in int_list(options.numstocks):
+                market = sim_market(numstocks, max(sample.MOVED_DAYS, 30))
+                for k, p in product(maxstocks, pollsecs):
+                    # quotes are reused for less than a poll so each poll gets a new price
+                    config = Config.load(sample.path, MAX_NUM_STOCKS=k, PRICE_POLL_SECS=p,
+                                         QUOTE_CACHE_SECS=min(sample.QUOTE_CACHE_SECS, p / 2))
+                    key = run_key(options, numstocks, k, p)
+                    results[key] = measure(market, config, options)
+                    for name in PHASES:
+                        result = results[key][name]
+                        base = baseline.get('runs', {}).get(key, {}).get(name)
+                        compared = ''
+                        if base:
+                            slower = result['secs'] / base['secs'] if base['secs'] else 1
+                            bigger = result['peak_bytes'] / base['peak_bytes'] if base['peak_bytes'] else 1
+                            compared = 'x{:.2f} x{:.2f}'.format(slower, bigger)
+                            if max(slower, bigger) > 1 + options.tolerance:
+                                compared += ' REGRESSED'
+                                failed = True
+                        print('{:<48} {:<10} {:>8.1f}ms {:>12.0f} {:>8.1f}MB {:>12}'.format(
+                            key, name, result['secs'] * 1000, result['rate'], result['peak_bytes'] / 1024 / 1024,
+                            compared))
+        finally:
+            os.chdir(cwd)
+
+    print('per sec is symbols screened (get_stocks), prices checked (buy, sell) or orders reported (report), '
+          'vs baseline is time and memory')
+    if options.save:
+        baseline.setdefault('runs', {}).update(results)
+        baseline['python'] = sys.version.split()[0]
+        with open(options.baseline, 'w') as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+        print('saved to {}'.format(options.baseline))
+    elif baseline:
+        print('compared to {}, tolerance {:.0f}%'.format(options.baseline, options.tolerance * 100))
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+#!/usr/bin/env python
+"""
+StockBot
+
+https://github.com/shirosaidev/stockbot
+
+Copyright (C) Chris Park (shirosai) 2021
+stockbot is released under the Apache 2.0 license. See
+LICENSE for the full license text.
+"""
+
+import optparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from stockbot.history import TradeHistory
+
+
+# fills a trade history with a year of random trades of several strategies
+# and times recording a day and each of the report command's queries, over all
+# of it and filtered to a symbol, a strategy and a month. exits with 1 if a
+# query is over the budget, run from repo root with:
+# python -m benchmarks.bench_history
+
+STRATEGIES = [('moved', 'buyatopen'), ('lowtomarket', 'buyatopen'), ('lowtohigh', 'buyatclose'),
+              ('moved', 'buyatclose')]
+
+
+def trade_rows(rng, day, symbols, numtrades):
+    rows = []
+    for symbol in rng.sample(symbols, numtrades):
+        buy = round(rng.uniform(20, 100), 2)
+        sell = round(buy * rng.gauss(1, 0.02), 2)
+        rows.append([symbol, symbol + ' Inc.', buy, day + 'T09:42:00-05:00', sell, day + 'T13:10:00-05:00',
+                     round(sell - buy, 2), round((sell - buy) / buy * 100, 2), rng.randint(10 ** 5, 10 ** 7),
+                     rng.randint(10 ** 5, 10 ** 7), 5])
+    return rows
+
+
+def timed(fn, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = optparse.OptionParser(usage="Usage: python -m benchmarks.bench_history [-h] [options]")
+    parser.add_option('-d', '--days', type='int', default=252,
+                        help='number of trading days, default "%default" (a year)')
+    parser.add_option('-n', '--numtrades', type='int', default=20,
+                        help='trades per strategy per day, default "%default"')
+    parser.add_option('-y', '--numsymbols', type='int', default=2000,
+                        help='number of symbols traded, default "%default"')
+    parser.add_option('-b', '--budget', type='float', default=1.0,
+                        help='max secs of each query, default "%default"')
+    parser.add_option('-r', '--repeat', type='int', default=5,
+                        help='times to run each query, the best time is shown, default "%default"')
+    options, args = parser.parse_args()
+
+    rng = random.Random(0)
+    symbols = ['S{0:05d}'.format(i) for i in range(options.numsymbols)]
+    days = [str(day) for day in np.busday_offset('2021-01-04', np.arange(options.days), roll='forward')]
+    summary = {'total_buy': 5000, 'total_sell': 5010}
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        history = TradeHistory(os.path.join(tmpdir, 'history.db'))
+        start = time.perf_counter()
+        for day in days:
+            for tradealgo, startbuytime in STRATEGIES:
+                history.record_day(day, '{}_{}'.format(tradealgo, startbuytime), tradealgo, startbuytime,
+                                   trade_rows(rng, day, symbols, options.numtrades), summary, 0.2, 5010)
+        record_secs = (time.perf_counter() - start) / (len(days) * len(STRATEGIES))
+        totals = history.totals()
+        print('{} days, {} strategies, {} trades, {} symbols'.format(
+            totals['days'], len(STRATEGIES), totals['trades'], options.numsymbols))
+        print('{:<40} {:8.2f}ms'.format('record a strategy\'s day', record_secs * 1000))
+
+        month = {'start': days[len(days) // 2][:8] + '01', 'end': days[len(days) // 2][:8] + '31'}
+        queries = [
+            ('totals', lambda: history.totals()),
+            ('by strategy', lambda: history.by_strategy()),
+            ('by symbol', lambda: history.by_symbol()),
+            ('totals of a symbol', lambda: history.totals(symbol=symbols[0])),
+            ('by strategy of a symbol', lambda: history.by_strategy(symbol=symbols[0])),
+            ('by symbol of a strategy', lambda: history.by_symbol(tradealgo='moved', startbuytime='buyatopen')),
+            ('by strategy of a month', lambda: history.by_strategy(**month)),
+            ('by symbol of a month', lambda: history.by_symbol(**month)),
+            ('export csv', lambda: history.export_csv(os.path.join(tmpdir, 'trades.csv'))),
+            ]
+        failed = False
+        report_secs = 0
+        for name, fn in queries:
+            secs, result = timed(fn, options.repeat)
+            ok = secs <= options.budget
+            failed |= not ok
+            if name in ('totals', 'by strategy', 'by symbol'):
+                report_secs += secs
+            print('{:<40} {:8.2f}ms  {}'.format(name, secs * 1000, 'ok' if ok else 'OVER BUDGET'))
+        print('{:<40} {:8.2f}ms'.format('report over all of it', report_secs * 1000))
+    print('budget {:.0f}ms per query'.format(options.budget * 1000))
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
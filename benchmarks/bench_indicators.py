@@ -0,0 +1,67 @@
+#!/usr/bin/env python
+"""
+StockBot
+
+https://github.com/shirosaidev/stockbot
+
+Copyright (C) Chris Park (shirosai) 2021
+stockbot is released under the Apache 2.0 license. See
+LICENSE for the full license text.
+"""
+
+import optparse
+import time
+from bisect import bisect_left, insort
+
+import numpy as np
+
+from stockbot.indicators import Indicators
+
+
+# compares the time per price check of the old went up/down counts (each
+# price compared to every earlier sample, kept sorted) vs the rolling
+# indicators.Indicators, early and late in a session of streamed trades,
+# run from repo root with: python -m benchmarks.bench_indicators
+
+
+def sorted_samples(prices):
+    # old path, how many earlier samples the price is above, then insert it
+    samples = []
+    for price in prices:
+        went_up = bisect_left(samples, price)
+        len(samples) - went_up
+        insort(samples, price)
+
+
+def rolling(prices, window):
+    indicators = Indicators(window)
+    for price in prices:
+        indicators.update(price)
+        indicators.buy_signal()
+
+
+def per_price(fn, prices, *args):
+    start = time.perf_counter()
+    fn(prices, *args)
+    return (time.perf_counter() - start) / len(prices)
+
+
+def main():
+    parser = optparse.OptionParser(usage="Usage: python -m benchmarks.bench_indicators [-h] [options]")
+    parser.add_option('-n', '--numprices', type='int', default=200000,
+                        help='number of prices of a symbol in the session, default "%default"')
+    parser.add_option('-w', '--window', type='int', default=15,
+                        help='TREND_WINDOW of the indicators, default "%default"')
+    options, args = parser.parse_args()
+
+    prices = np.round(50 + np.cumsum(np.random.default_rng(0).normal(0, 0.02, options.numprices)), 2).tolist()
+    first = prices[:1000]
+    print('{} prices'.format(len(prices)))
+    print('sorted samples:  first 1000 {:.2f}us, all {:.2f}us per price'.format(
+        per_price(sorted_samples, first) * 1e6, per_price(sorted_samples, prices) * 1e6))
+    print('Indicators:      first 1000 {:.2f}us, all {:.2f}us per price'.format(
+        per_price(rolling, first, options.window) * 1e6, per_price(rolling, prices, options.window) * 1e6))
+
+
+if __name__ == "__main__":
+    main()
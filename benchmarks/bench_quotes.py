@@ -0,0 +1,99 @@
+#!/usr/bin/env python
+"""
+StockBot
+
+https://github.com/shirosaidev/stockbot
+
+Copyright (C) Chris Park (shirosai) 2021
+stockbot is released under the Apache 2.0 license. See
+LICENSE for the full license text.
+"""
+
+import json
+import optparse
+import time
+import tracemalloc
+
+from stockbot.fetcher import day_value, json_loads, parse_quote
+
+
+# compares parsing yahoo chart responses into full json dicts (how quotes were
+# kept before) vs parse_quote's slotted Quote records, for the time to parse
+# and read the fields stockbot uses and the memory kept per poll,
+# run from repo root with: python -m benchmarks.bench_quotes
+
+
+def chart_body(symbol, price):
+    # a range=1d yahoo chart response, with the meta fields yahoo sends
+    period = {'timezone': 'EST', 'start': 1614000600, 'end': 1614024000, 'gmtoffset': -18000}
+    return json.dumps({'chart': {'result': [{
+        'meta': {'currency': 'USD', 'symbol': symbol, 'exchangeName': 'NMS', 'instrumentType': 'EQUITY',
+                 'firstTradeDate': 345479400, 'regularMarketTime': 1614020399, 'gmtoffset': -18000,
+                 'timezone': 'EST', 'exchangeTimezoneName': 'America/New_York', 'regularMarketPrice': price,
+                 'chartPreviousClose': price * 0.99, 'previousClose': price * 0.99, 'scale': 3, 'priceHint': 2,
+                 'currentTradingPeriod': {'pre': period, 'regular': period, 'post': period},
+                 'tradingPeriods': [[period]], 'dataGranularity': '1d', 'range': '1d',
+                 'validRanges': ['1d', '5d', '1mo', '3mo', '6mo', '1y', '2y', '5y', '10y', 'ytd', 'max']},
+        'timestamp': [1614004200, 1614020399],
+        'indicators': {'quote': [{'open': [price * 0.99, price], 'high': [price * 1.01, price * 1.02],
+                                  'low': [price * 0.98, price * 0.97], 'close': [price * 0.99, price],
+                                  'volume': [1234567, 2345678]}]}
+        }], 'error': None}}).encode()
+
+
+def parse_dicts(bodies):
+    # old path, the whole decoded response is kept and dug through
+    quotes = {}
+    for symbol, body in bodies.items():
+        data = json.loads(body)
+        result = data['chart']['result'][0]
+        quote = result['indicators']['quote'][0]
+        (result['meta']['exchangeName'], result['meta']['regularMarketPrice'], day_value(quote['high']),
+         day_value(quote['low']), day_value(quote['volume']))
+        quotes[symbol] = data
+    return quotes
+
+
+def parse_records(bodies):
+    quotes = {}
+    for symbol, body in bodies.items():
+        quote = quotes[symbol] = parse_quote(symbol, body)
+        (quote.exchange, quote.price, quote.high, quote.low, quote.volume)
+    return quotes
+
+
+def measure(fn, bodies, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(bodies)
+        best = min(best, time.perf_counter() - start)
+    tracemalloc.start()
+    kept = fn(bodies)
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del kept
+    return best, size
+
+
+def main():
+    parser = optparse.OptionParser(usage="Usage: python -m benchmarks.bench_quotes [-h] [options]")
+    parser.add_option('-n', '--numstocks', type='int', default=500,
+                        help='number of quotes per poll, default "%default"')
+    parser.add_option('-r', '--repeat', type='int', default=20,
+                        help='times to repeat, the best time is shown, default "%default"')
+    options, args = parser.parse_args()
+
+    bodies = {'SYM{0:05d}'.format(i): chart_body('SYM{0:05d}'.format(i), 10 + i % 150)
+              for i in range(options.numstocks)}
+    print('{} quotes of {} bytes, json decoder {}'.format(len(bodies), len(next(iter(bodies.values()))),
+                                                         json_loads.__module__))
+    dict_secs, dict_bytes = measure(parse_dicts, bodies, options.repeat)
+    record_secs, record_bytes = measure(parse_records, bodies, options.repeat)
+    print('json dicts:     {:.2f}ms {:.0f}KB kept'.format(dict_secs * 1000, dict_bytes / 1024))
+    print('Quote records:  {:.2f}ms {:.0f}KB kept'.format(record_secs * 1000, record_bytes / 1024))
+    print('speedup: {:.1f}x, {:.1f}x less memory'.format(dict_secs / record_secs, dict_bytes / record_bytes))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+#!/usr/bin/env python
+"""
+StockBot
+
+https://github.com/shirosaidev/stockbot
+
+Copyright (C) Chris Park (shirosai) 2021
+stockbot is released under the Apache 2.0 license. See
+LICENSE for the full license text.
+"""
+
+import optparse
+import time
+import requests
+from random import randint
+
+from stockbot import standin
+from stockbot.fetcher import QuoteFetcher
+from stockbot.sessions import BROWSER_HEADERS
+
+
+# compares wall-clock time for fetching quotes of the day's candidate list
+# serially (old get_stock_info loop, with its 1-3 sec sleeps scaled by -s) vs
+# the concurrent QuoteFetcher, both measured against the same stand-in server,
+# run from repo root with: python -m benchmarks.bench_screening
+
+
+def serial_fetch(url, symbols, sleep_scale):
+    for symbol in symbols:
+        # old path staggered each request with a random 1-3 sec sleep
+        time.sleep(randint(1, 3) * sleep_scale)
+        # and opened a new connection for every request
+        requests.get(url.format(n=randint(1, 2), symbol=symbol), headers=BROWSER_HEADERS).json()
+
+
+def main():
+    parser = optparse.OptionParser(usage="Usage: python -m benchmarks.bench_screening [-h] [options]")
+    parser.add_option('-n', '--numstocks', type='int', default=100,
+                        help='number of candidate symbols, default "%default"')
+    parser.add_option('-l', '--latency', type='float', default=0.05,
+                        help='stand-in server latency per request in sec, default "%default"')
+    parser.add_option('-w', '--workers', type='int', default=8,
+                        help='fetcher thread pool size, default "%default"')
+    parser.add_option('-r', '--rate', type='float', default=10,
+                        help='fetcher requests per sec per host, default "%default"')
+    parser.add_option('-s', '--sleepscale', type='float', default=0.01,
+                        help='scale applied to the serial path 1-3 sec sleeps, default "%default"')
+    options, args = parser.parse_args()
+
+    server = standin.serve(latency=options.latency)
+    url = standin.chart_url(server)
+    symbols = ['SYM{0:05d}'.format(i) for i in range(options.numstocks)]
+
+    start = time.perf_counter()
+    serial_fetch(url, symbols, options.sleepscale)
+    serial_secs = time.perf_counter() - start
+
+    fetcher = QuoteFetcher(url=url, max_workers=options.workers, rate=options.rate)
+    start = time.perf_counter()
+    quotes = fetcher.fetch_all(symbols)
+    concurrent_secs = time.perf_counter() - start
+    assert len(quotes) == len(symbols)
+    connections = fetcher.sessions.stats()
+
+    server.shutdown()
+
+    print('symbols: {}  latency: {}s  workers: {}  rate: {}/s'.format(
+        options.numstocks, options.latency, options.workers, options.rate))
+    print('serial (sleeps x{}):   {:8.2f}s'.format(options.sleepscale, serial_secs))
+    print('concurrent:            {:8.2f}s'.format(concurrent_secs))
+    print('speedup: {:.1f}x'.format(serial_secs / concurrent_secs))
+    for host, stats in connections.items():
+        print('concurrent connections to {}: {} opened, {} reused'.format(host, stats['opened'], stats['reused']))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+#!/usr/bin/env python
+"""
+StockBot
+
+https://github.com/shirosaidev/stockbot
+
+Copyright (C) Chris Park (shirosai) 2021
+stockbot is released under the Apache 2.0 license. See
+LICENSE for the full license text.
+"""
+
+import optparse
+import subprocess
+import sys
+import time
+
+
+# checks the startup time of importing stockbot and of each python -m
+# stockbot command (shown with -h, so nothing but imports and option parsing
+# runs) against a budget, using python -X importtime. exits with 1 if a
+# command is over budget or imports a module that should only be imported
+# once it's used, run from repo root with: python -m benchmarks.bench_startup
+
+COMMANDS = [
+    ['-c', 'import stockbot'],
+    ['-c', 'import stockbot.bot'],
+    ['-m', 'stockbot', '-h'],
+    ['-m', 'stockbot', 'run', '-h'],
+    ['-m', 'stockbot', 'backtest', '-h'],
+    ['-m', 'stockbot', 'sweep', '-h'],
+    ['-m', 'stockbot', 'simulate', '-h'],
+    ['-m', 'stockbot', 'standin', '-h'],
+    ['-m', 'stockbot', 'barstore', '-h'],
+    ['-m', 'stockbot', 'report', '-h'],
+    ]
+
+# imported by the alpaca library, they take most of a second
+HEAVY_MODULES = ['alpaca_trade_api', 'pandas']
+
+
+def import_times(args):
+    # (total import secs, {top level module: cumulative secs}, wall secs)
+    start = time.perf_counter()
+    proc = subprocess.run([sys.executable, '-X', 'importtime'] + args, stdout=subprocess.DEVNULL,
+                          stderr=subprocess.PIPE, universal_newlines=True, check=True)
+    wall = time.perf_counter() - start
+    modules = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        # nested imports are indented, only count the top level ones
+        if not name.startswith('  '):
+            modules[name.strip()] = int(cumulative_us) / 1e6
+    return sum(modules.values()), modules, wall
+
+
+def main():
+    parser = optparse.OptionParser(usage="Usage: python -m benchmarks.bench_startup [-h] [options]")
+    parser.add_option('-b', '--budget', type='float', default=0.4,
+                        help='max secs of imports for each command, default "%default"')
+    parser.add_option('-r', '--repeat', type='int', default=3,
+                        help='times to run each command, the best time is shown, default "%default"')
+    parser.add_option('-v', '--verbose', action='store_true', default=False,
+                        help='show the slowest imports of each command')
+    options, args = parser.parse_args()
+
+    failed = False
+    for args in COMMANDS:
+        runs = [import_times(args) for _ in range(options.repeat)]
+        total, modules, wall = min(runs, key=lambda run: run[0])
+        heavy = [name for name in HEAVY_MODULES if name in modules]
+        ok = total <= options.budget and not heavy
+        failed |= not ok
+        print('{:<40} imports {:6.0f}ms  wall {:6.0f}ms  {}'.format(
+            ' '.join(args), total * 1000, min(run[2] for run in runs) * 1000,
+            'ok' if ok else 'OVER BUDGET' if not heavy else 'imports {}'.format(', '.join(heavy))))
+        if options.verbose:
+            for name, secs in sorted(modules.items(), key=lambda item: -item[1])[:5]:
+                print('    {:<36} {:6.0f}ms'.format(name, secs * 1000))
+    print('budget {:.0f}ms of imports per command'.format(options.budget * 1000))
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
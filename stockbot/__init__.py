@@ -0,0 +1,35 @@
+"""
+StockBot
+
+https://github.com/shirosaidev/stockbot
+
+Copyright (C) Chris Park (shirosai) 2021
+stockbot is released under the Apache 2.0 license. See
+LICENSE for the full license text.
+"""
+
+# the bot and its tools are run with python -m stockbot <command> (see
+# __main__.py). importing stockbot doesn't import the alpaca library or
+# read the config, the names below are imported from their modules the first
+# time they're used
+
+STOCKBOT_VERSION = '0.1-b.3'
+__version__ = STOCKBOT_VERSION
+
+# name -> module it's in
+LAZY_NAMES = {
+    'StockBot': 'bot',
+    'Context': 'bot',
+    'Config': 'config',
+    'MarketData': 'marketdata',
+    'QuoteFetcher': 'fetcher',
+    'Backtest': 'backtest',
+    'TradeHistory': 'history',
+    }
+
+
+def __getattr__(name):
+    if name in LAZY_NAMES:
+        from importlib import import_module
+        return getattr(import_module('.' + LAZY_NAMES[name], __name__), name)
+    raise AttributeError('module {} has no attribute {}'.format(__name__, name))
@@ -0,0 +1,61 @@
+"""
+StockBot
+
+https://github.com/shirosaidev/stockbot
+
+Copyright (C) Chris Park (shirosai) 2021
+stockbot is released under the Apache 2.0 license. See
+LICENSE for the full license text.
+"""
+
+import sys
+from importlib import import_module
+
+from . import STOCKBOT_VERSION
+
+
+# command -> (module with a main(argv) to run, help), a command's module is
+# only imported when it's run so each starts without loading the others
+COMMANDS = {
+    'run': ('bot', 'trade on alpaca, the default when no command is given'),
+    'backtest': ('backtest', 'replay stored daily/minute bars through the trade algos'),
+    'sweep': ('sweep', 'backtest a grid of config settings in parallel'),
+    'simulate': ('simulate', 'replay trading days against a simulated exchange'),
+    'standin': ('standin', 'serve stand-in yahoo, nasdaq and alpaca apis for testing'),
+    'barstore': ('barstore', 'update or show the local daily bar store'),
+    'report': ('history', 'win rate and profit/loss stats from the trade history'),
+    }
+
+
+def usage():
+    commands = '\n'.join('  {:<10}{}'.format(name, help) for name, (module, help) in COMMANDS.items())
+    return """Usage: python -m stockbot [command] [-h] [options]
+
+StockBot v{0}
+Alpaca algo stock trading bot.
+
+Commands:
+{1}
+
+Run python -m stockbot <command> -h for the command's options.""".format(STOCKBOT_VERSION, commands)
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if argv and argv[0] in ('-h', '--help'):
+        print(usage())
+        return
+    if argv and not argv[0].startswith('-'):
+        name, argv = argv[0], argv[1:]
+    else:
+        name = 'run'
+    if name not in COMMANDS:
+        print(usage(), file=sys.stderr)
+        sys.exit('\nunknown command {}'.format(name))
+    # shown in the command's option errors
+    sys.argv[0] = 'stockbot {}'.format(name)
+    import_module('.' + COMMANDS[name][0], __package__).main(argv)
+
+
+if __name__ == "__main__":
+    main()
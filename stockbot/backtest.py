@@ -0,0 +1,470 @@
+"""
+StockBot
+
+https://github.com/shirosaidev/stockbot
+
+Copyright (C) Chris Park (shirosai) 2021
+stockbot is released under the Apache 2.0 license. See
+LICENSE for the full license text.
+"""
+
+import optparse
+import os
+from collections import namedtuple
+from datetime import datetime
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from pytz import timezone
+
+from .bars import moved_percents
+from .config import Config
+from .history import TradeHistory
+from .indicators import BUY_MIN_COUNT, EMA_SPAN, FLAT_SLOPE, SELL_MIN_COUNT
+from .report import CSV_HEADER, change_percents, summarize, write_csv
+from .scheduler import parse_time
+from .scoring import Candidates, score, top_k
+
+
+# replays stored daily and minute bars through the same stock selection and
+# buy/sell rules stockbot uses live
+#
+# data directory layout:
+#   <datadir>/day/<SYMBOL>.csv                  daily bars
+#   <datadir>/minute/<SYMBOL>/<YYYY-MM-DD>.csv  minute bars for one day (optional)
+#   <datadir>/symbols.csv                       symbol,company (optional)
+# bar csv columns are timestamp,open,high,low,close,volume, minute bar
+# timestamps are the bar start time with utc offset (2021-02-22T09:30:00-05:00)
+#
+# stock picks for a day are made from the bars up to the day before. buys and
+# sells are simulated at the prices the live loops would see polling every
+# PRICE_POLL_SECS, taken from the minute bars. picks without minute bars for the
+# day are bought at the open (buyatopen) or close (buyatclose) and sold at the
+# take profit price if the day's high reaches it, or else at the close.
+
+TZ = timezone('America/New_York')
+
+# config settings used by the backtest
+PARAM_NAMES = ['MOVED_DAYS', 'MOVED_DAYS_CALC', 'SELL_PERCENT_GAIN', 'MAX_NUM_STOCKS',
+               'STOCK_MIN_PRICE', 'STOCK_MAX_PRICE', 'NUM_SHARES', 'START_EQUITY', 'BUY_DAYS',
+               'BAO_BUY_START_TIME', 'BAO_BUY_END_TIME', 'BAO_SELL_START_TIME', 'BAO_SELL_END_TIME',
+               'BAC_BUY_START_TIME', 'BAC_BUY_END_TIME', 'BAC_SELL_START_TIME', 'BAC_SELL_END_TIME',
+               'PRICE_POLL_SECS', 'TREND_WINDOW']
+
+# filled order as used by report.change_percents
+Fill = namedtuple('Fill', 'symbol side filled_qty filled_avg_price')
+
+
+def config_params(config=None):
+    # the backtest settings from config, default config.py
+    return (config or Config.load()).params(PARAM_NAMES)
+
+
+class DailyBars:
+    """Daily bars for many symbols as (symbols x days) arrays, days are the
+    union of all the symbols' trading days and missing bars are nan."""
+
+    def __init__(self, symbols, days, opens, highs, lows, closes, volumes, companies=None):
+        self.symbols = list(symbols)
+        self.days = days
+        self.opens = opens
+        self.highs = highs
+        self.lows = lows
+        self.closes = closes
+        self.volumes = volumes
+        self.companies = companies or {}
+
+    @classmethod
+    def load(cls, datadir, symbols=None):
+        import pandas as pd
+        daydir = os.path.join(datadir, 'day')
+        if symbols is None:
+            symbols = sorted(f[:-4] for f in os.listdir(daydir) if f.endswith('.csv'))
+        frames = []
+        for symbol in symbols:
+            df = pd.read_csv(os.path.join(daydir, symbol + '.csv'))
+            frames.append((df['timestamp'].astype(str).str[:10].to_numpy().astype('datetime64[D]'), df))
+        days = np.unique(np.concatenate([d for d, _ in frames])) if frames else np.array([], 'datetime64[D]')
+        arrays = {col: np.full((len(symbols), len(days)), np.nan) for col in ('open', 'high', 'low', 'close', 'volume')}
+        for i, (d, df) in enumerate(frames):
+            idx = np.searchsorted(days, d)
+            for col, arr in arrays.items():
+                arr[i, idx] = df[col].to_numpy(float)
+        companies = {}
+        symbols_file = os.path.join(datadir, 'symbols.csv')
+        if os.path.exists(symbols_file):
+            companies = dict(pd.read_csv(symbols_file, usecols=[0, 1]).itertuples(index=False))
+        return cls(symbols, days, arrays['open'], arrays['high'], arrays['low'],
+                   arrays['close'], arrays['volume'], companies)
+
+    @classmethod
+    def from_store(cls, store, symbols=None):
+        # daily bars from a barstore.BarStore instead of csv files
+        import pandas as pd
+        symbols = store.symbols() if symbols is None else symbols
+        records = [store.read(symbol) for symbol in symbols]
+        # bar times are midnight EST, convert to the day in EST
+        to_days = lambda t: (pd.to_datetime(t, unit='s', utc=True).tz_convert(TZ).tz_localize(None)
+                             .to_numpy().astype('datetime64[D]'))
+        bar_days = [to_days(r['t']) for r in records]
+        days = np.unique(np.concatenate(bar_days)) if bar_days else np.array([], 'datetime64[D]')
+        arrays = {field: np.full((len(symbols), len(days)), np.nan) for field in 'ohlcv'}
+        for i, (r, d) in enumerate(zip(records, bar_days)):
+            idx = np.searchsorted(days, d)
+            for field, arr in arrays.items():
+                arr[i, idx] = r[field]
+        return cls(symbols, days, arrays['o'], arrays['h'], arrays['l'], arrays['c'], arrays['v'])
+
+
+class MinuteBars:
+    """Minute bars for a symbol and day, read on demand since only the day's
+    picks need them."""
+
+    def __init__(self, datadir):
+        self.minutedir = os.path.join(datadir, 'minute')
+
+    def get(self, symbol, day):
+        # returns (minute of day the bar starts in EST, close) arrays or None
+        import pandas as pd
+        path = os.path.join(self.minutedir, symbol, '{}.csv'.format(day))
+        if not os.path.exists(path):
+            return None
+        df = pd.read_csv(path, usecols=['timestamp', 'close'])
+        if df.empty:
+            return None
+        ts = pd.to_datetime(df['timestamp'], utc=True).dt.tz_convert(TZ)
+        return (ts.dt.hour * 60 + ts.dt.minute).to_numpy(float), df['close'].to_numpy(float)
+
+
+def load_daily(datadir, barstore=None):
+    if barstore:
+        from .barstore import BarStore
+        return DailyBars.from_store(BarStore(barstore, 'day', ttl_days=None, max_bytes=None))
+    return DailyBars.load(datadir)
+
+
+def minute_of_day(hhmm):
+    t = parse_time(hhmm)
+    return t.hour * 60 + t.minute
+
+
+def sample_times(start, end, step):
+    # the live loops check prices at start and then every step minutes, the
+    # last check is the first one at or after end
+    n = max(int(np.ceil((end - start) / step)), 0)
+    return start + step * np.arange(n + 1)
+
+
+def sample_prices(bars, samples):
+    # price at each sample time, the close of the last minute bar that ended
+    # by then (or the first bar before the first one ends)
+    minutes, closes = bars
+    idx = np.searchsorted(minutes + 1, samples, side='right') - 1
+    return closes[np.clip(idx, 0, None)]
+
+
+def trend_counts(prices, window):
+    # for (symbols x samples) prices returns at each sample the number of
+    # prices so far and how many of the changes between the last window
+    # prices went up or down, the same counts as the live buy/sell loops'
+    # indicators.Indicators
+    k = prices.shape[1]
+    changes = np.diff(prices, axis=1)
+    zeros = np.zeros((prices.shape[0], 1), int)
+    # ups/downs of the changes up to each sample
+    ups = np.concatenate([zeros, np.cumsum(changes > 0, axis=1)], axis=1)
+    downs = np.concatenate([zeros, np.cumsum(changes < 0, axis=1)], axis=1)
+    start = np.maximum(np.arange(k) - max(window, 2) + 1, 0)
+    num_prices = np.broadcast_to(np.arange(1, k + 1), ups.shape)
+    return num_prices, ups - ups[:, start], downs - downs[:, start]
+
+
+def trend_indicators(prices, window, ema_span=EMA_SPAN):
+    # for (symbols x samples) prices returns at each sample the EMA of the
+    # prices so far and the high, low and least squares slope of the last
+    # window prices, the same as the live loops' indicators.Indicators
+    num_symbols, k = prices.shape
+    window = max(window, 2)
+    alpha = 2 / (ema_span + 1)
+    ema = np.empty(prices.shape)
+    if k:
+        ema[:, 0] = prices[:, 0]
+    for j in range(1, k):
+        ema[:, j] = ema[:, j - 1] + alpha * (prices[:, j] - ema[:, j - 1])
+    # high/low over each sample's window, padded so the first samples' windows
+    # only have the prices so far
+    pad = np.full((num_symbols, window - 1), np.inf)
+    high = sliding_window_view(np.concatenate([-pad, prices], axis=1), window, axis=1).max(axis=2)
+    low = sliding_window_view(np.concatenate([pad, prices], axis=1), window, axis=1).min(axis=2)
+    # slope from the sums of the window's prices and of each price times its
+    # position in the window
+    zeros = np.zeros((num_symbols, 1))
+    sums = np.concatenate([zeros, np.cumsum(prices, axis=1)], axis=1)
+    weighted = np.concatenate([zeros, np.cumsum(prices * np.arange(k), axis=1)], axis=1)
+    end = np.arange(1, k + 1)
+    start = np.maximum(end - window, 0)
+    sum_prices = sums[:, end] - sums[:, start]
+    sum_positions = weighted[:, end] - weighted[:, start] - start * sum_prices
+    n = end - start
+    sum_x = n * (n - 1) / 2
+    sum_xx = (n - 1) * n * (2 * n - 1) / 6
+    with np.errstate(invalid='ignore', divide='ignore'):
+        slope = np.where(n > 1, (n * sum_positions - sum_x * sum_prices) / (n * sum_xx - sum_x * sum_x), 0.0)
+    return ema, high, low, slope
+
+
+def buy_signals(prices, window):
+    # Indicators.buy_signal at each sample, there are no traded volumes in
+    # the backtest so no VWAP
+    num_prices, ups, downs = trend_counts(prices, window)
+    ema, high, low, slope = trend_indicators(prices, window)
+    return (num_prices > BUY_MIN_COUNT) & (ups > downs) & (slope > FLAT_SLOPE) & (prices >= ema)
+
+
+def sell_signals(prices, window, drawdown_percent):
+    # Indicators.sell_signal at each sample
+    num_prices, ups, downs = trend_counts(prices, window)
+    ema, high, low, slope = trend_indicators(prices, window)
+    return (num_prices > SELL_MIN_COUNT) & (
+        (downs > ups) | ((slope < -FLAT_SLOPE) & ((prices <= low) | (prices < ema))) |
+        (prices <= high * (1 - drawdown_percent / 100)))
+
+
+def daily_scores(daily, params, tradealgo):
+    # (symbols x days) score used to rank stocks on each day, from the bars
+    # up to the day before, nan where the stock can't be picked
+    num_symbols, num_days = daily.closes.shape
+    scores = np.full((num_symbols, num_days), np.nan)
+    if num_days < 2:
+        return scores
+
+    def moved():
+        # percent moved over the MOVED_DAYS days before each day
+        m = params['MOVED_DAYS']
+        out = np.full((num_symbols, num_days - 1), np.nan)
+        if num_days > m:
+            opens = sliding_window_view(daily.opens[:, :-1], m, axis=1).reshape(-1, m)
+            closes = sliding_window_view(daily.closes[:, :-1], m, axis=1).reshape(-1, m)
+            out[:, m - 1:] = moved_percents(opens, closes, params['MOVED_DAYS_CALC']).reshape(num_symbols,
+                                                                                               num_days - m)
+        return out
+
+    # the day before's bars are what stockbot sees when getting stocks
+    candidates = Candidates(daily.symbols, price=daily.closes[:, :-1], low=daily.lows[:, :-1],
+                            high=daily.highs[:, :-1], volume=daily.volumes[:, :-1], moved=moved)
+    scores[:, 1:] = score(candidates, tradealgo, params)
+    return scores
+
+
+def time_str(day, minute):
+    dt = datetime.combine(np.datetime64(day, 'D').item(), datetime.min.time())
+    return TZ.localize(dt.replace(hour=int(minute // 60), minute=int(minute % 60))).isoformat()
+
+
+class Backtest:
+    """Runs one trade algo / buy time over the daily bars with the given
+    config params, results are per report day and per trade."""
+
+    def __init__(self, daily, minutes, params, tradealgo='moved', startbuytime='buyatopen'):
+        self.daily = daily
+        self.minutes = minutes
+        self.params = p = params
+        self.tradealgo = tradealgo
+        self.startbuytime = startbuytime
+        prefix = 'BAO' if startbuytime == 'buyatopen' else 'BAC'
+        step = p['PRICE_POLL_SECS'] / 60
+        self.buy_samples = sample_times(minute_of_day(p[prefix + '_BUY_START_TIME']),
+                                        minute_of_day(p[prefix + '_BUY_END_TIME']), step)
+        sell_end = minute_of_day(p[prefix + '_SELL_END_TIME'])
+        self.sell_samples = sample_times(minute_of_day(p[prefix + '_SELL_START_TIME']), sell_end, step)
+        # last sample of selling on gains, after this sell when prices go down
+        self.midday = min(int(np.searchsorted(self.sell_samples, min(13 * 60, sell_end))), len(self.sell_samples) - 1)
+        self.picks = top_k(daily_scores(daily, p, tradealgo), p['MAX_NUM_STOCKS'])
+        self.equity = p['START_EQUITY']
+        self.days = []
+        self.trades = []
+
+    def day_prices(self, symbols, d, samples):
+        prices = np.full((len(symbols), len(samples)), np.nan)
+        for i, s in enumerate(symbols):
+            bars = self.minutes.get(self.daily.symbols[s], self.daily.days[d]) if self.minutes else None
+            if bars is not None:
+                prices[i] = sample_prices(bars, samples)
+        return prices
+
+    def buy(self, d):
+        p = self.params
+        daily = self.daily
+        picks = self.picks[:, d]
+        picks = picks[picks >= 0]
+        prices = self.day_prices(picks, d, self.buy_samples)
+        if self.startbuytime == 'buyatclose':
+            # buying at end of day ignores price records to force it to buy
+            signal = np.ones(prices.shape, bool)
+        else:
+            signal = buy_signals(prices, p['TREND_WINDOW'])
+        # no minute bars, buy at the open/close
+        no_bars = np.isnan(prices).all(axis=1)
+        fallback = daily.opens[picks, d] if self.startbuytime == 'buyatopen' else daily.closes[picks, d]
+        prices[no_bars, 0] = fallback[no_bars]
+        signal[no_bars] = False
+        signal[no_bars, 0] = True
+        signal &= ~np.isnan(prices)
+
+        # buy in the same order as the live loop, by sample time then pick rank
+        positions = {}
+        for j, i in np.argwhere(signal.T):
+            if i in positions:
+                continue
+            buy_price = prices[i, j] * p['NUM_SHARES']
+            if self.equity >= buy_price:
+                s = picks[i]
+                positions[i] = {'index': s, 'symbol': daily.symbols[s],
+                                'company': daily.companies.get(daily.symbols[s], daily.symbols[s]),
+                                'buy': float(prices[i, j]), 'buy_time': time_str(daily.days[d], self.buy_samples[j]),
+                                'vol_sod': daily.volumes[s, d - 1] if d else np.nan}
+                self.equity -= buy_price
+        return list(positions.values())
+
+    def sell(self, positions, d):
+        p = self.params
+        daily = self.daily
+        index = np.array([pos['index'] for pos in positions])
+        buy = np.array([pos['buy'] for pos in positions])
+        prices = self.day_prices(index, d, self.sell_samples)
+        sell_at = np.full(len(positions), -1)
+
+        # sell if it's gone up by x percent until 1:00pm EST
+        gains = np.round((prices[:, :self.midday + 1] - buy[:, None]) / buy[:, None] * 100, 2) >= p['SELL_PERCENT_GAIN']
+        hit = gains.any(axis=1)
+        sell_at[hit] = gains[hit].argmax(axis=1)
+
+        # then sell if there are 15 records of it and it's gone down, or at end of day,
+        # prices from before 1:00pm count too
+        if prices.shape[1] > self.midday + 1:
+            down = sell_signals(prices, p['TREND_WINDOW'], p['SELL_PERCENT_GAIN'])[:, self.midday + 1:]
+            down[:, -1] = True
+            sell_at[~hit] = self.midday + 1 + down[~hit].argmax(axis=1)
+        else:
+            sell_at[~hit] = self.midday
+
+        sells = prices[np.arange(len(positions)), sell_at]
+        sell_minutes = self.sell_samples[sell_at]
+        # no minute bars, sell at the take profit price if the high got there or else the close
+        no_bars = np.isnan(prices).all(axis=1)
+        take_profit = np.round(buy * (1 + p['SELL_PERCENT_GAIN'] / 100), 2)
+        reached = daily.highs[index, d] >= take_profit
+        sells[no_bars] = np.where(reached, take_profit, daily.closes[index, d])[no_bars]
+        sell_minutes[no_bars] = np.where(reached, self.sell_samples[0], self.sell_samples[-1])[no_bars]
+
+        trade_rows = []
+        fills = []
+        for pos, price, minute in zip(positions, sells, sell_minutes):
+            price = float(price)
+            diff = round(price - pos['buy'], 2)
+            change_perc = round((price - pos['buy']) / pos['buy'] * 100, 2)
+            sell_time = time_str(daily.days[d], minute)
+            trade_rows.append([pos['symbol'], pos['company'], pos['buy'], pos['buy_time'], price, sell_time,
+                               diff, change_perc, pos['vol_sod'], daily.volumes[pos['index'], d], p['NUM_SHARES']])
+            fills.append(Fill(pos['symbol'], 'buy', p['NUM_SHARES'], pos['buy']))
+            fills.append(Fill(pos['symbol'], 'sell', p['NUM_SHARES'], price))
+            self.equity += price * p['NUM_SHARES']
+        return trade_rows, fills
+
+    def report(self, d, trade_rows, fills, csvdir=None, verbose=False, history=None):
+        p = self.params
+        day = str(self.daily.days[d])
+        percent = round((self.equity - p['START_EQUITY']) / p['START_EQUITY'] * 100, 2)
+        self.equity = round(self.equity, 2)
+        if verbose:
+            print(day)
+        summary = summarize(change_percents(fills), verbose=verbose)
+        if csvdir:
+            write_csv(os.path.join(csvdir, 'stocks_{0}_{1}.csv'.format(self.tradealgo, day)),
+                      [CSV_HEADER] + trade_rows, summary, percent, self.equity)
+        if history:
+            history.record_day(day, 'backtest_{}_{}'.format(self.tradealgo, self.startbuytime), self.tradealgo,
+                               self.startbuytime, trade_rows, summary, percent, self.equity)
+        self.trades.extend([day] + row for row in trade_rows)
+        self.days.append({'date': day, 'trades': len(trade_rows),
+                          'wins': sum(1 for row in trade_rows if row[6] > 0),
+                          'buy': round(summary['total_buy'], 2), 'sell': round(summary['total_sell'], 2),
+                          'profit': round(summary['total_sell'] - summary['total_buy'], 2),
+                          'percent': percent, 'equity': self.equity})
+        # set equity back to start value to not reinvest any gains
+        if self.equity > p['START_EQUITY']:
+            self.equity = p['START_EQUITY']
+
+    def run(self, start=None, end=None, csvdir=None, verbose=False, history=None):
+        days = self.daily.days
+        first = np.searchsorted(days, np.datetime64(start, 'D')) if start else 0
+        last = np.searchsorted(days, np.datetime64(end, 'D'), side='right') if end else len(days)
+        held = None
+        for d in range(max(first, 1), last):
+            if held:
+                # bought at close the day before
+                self.report(d, *self.sell(held, d), csvdir=csvdir, verbose=verbose, history=history)
+                held = None
+            if days[d].item().weekday() not in self.params['BUY_DAYS']:
+                continue
+            positions = self.buy(d)
+            if not positions:
+                continue
+            if self.startbuytime == 'buyatclose':
+                held = positions
+            else:
+                self.report(d, *self.sell(positions, d), csvdir=csvdir, verbose=verbose, history=history)
+        return self
+
+    def totals(self):
+        trades = sum(day['trades'] for day in self.days)
+        wins = sum(day['wins'] for day in self.days)
+        return {'days': len(self.days), 'trades': trades,
+                'win_rate': round(wins / trades * 100, 2) if trades else 0,
+                'profit': round(sum(day['profit'] for day in self.days), 2),
+                'avg_percent': round(float(np.mean([row[8] for row in self.trades])), 3) if trades else 0,
+                'equity': round(self.equity, 2)}
+
+
+def main(argv=None):
+    usage = """Usage: python -m stockbot backtest [-h] -d datadir [-S barstore] [-t tradealgo] [-b startbuytime] [-s startdate] [-e enddate] [-o csvdir] [-H historyfile] [-v]
+
+Replay stored daily/minute bars through stockbot's trade algos."""
+    parser = optparse.OptionParser(usage=usage)
+    parser.add_option('-d', '--datadir', default='data',
+                        help='directory with day/ and minute/ bar csvs, default "%default"')
+    parser.add_option('-t', '--tradealgo', default='moved',
+                        help='algo to use for trading, options are moved, lowtomarket or lowtohigh, default "%default"')
+    parser.add_option('-b', '--startbuytime', default='buyatopen',
+                        help='when to starting buying stocks, options are buyatopen, and buyatclose, default "%default"')
+    parser.add_option('-s', '--startdate', help='first day to trade (YYYY-MM-DD), default first day of data')
+    parser.add_option('-e', '--enddate', help='last day to trade (YYYY-MM-DD), default last day of data')
+    parser.add_option('-S', '--barstore',
+                        help='read daily bars from this bar store directory (barstore.py) instead of datadir/day')
+    parser.add_option('-o', '--csvdir', help='write the daily stocks_<algo>_<date>.csv files to this directory')
+    parser.add_option('-H', '--history',
+                        help='add the trades to this trade history file (see python -m stockbot report), as '
+                        'strategy backtest_<algo>_<startbuytime>')
+    parser.add_option('-v', '--verbose', action='store_true', default=False,
+                        help='print each day\'s profit/loss')
+    options, args = parser.parse_args(argv)
+
+    if options.csvdir:
+        os.makedirs(options.csvdir, exist_ok=True)
+
+    daily = load_daily(options.datadir, options.barstore)
+    print('loaded daily bars for {} symbols over {} days'.format(len(daily.symbols), len(daily.days)))
+    bt = Backtest(daily, MinuteBars(options.datadir), config_params(), options.tradealgo, options.startbuytime)
+    history = TradeHistory(options.history) if options.history else None
+    bt.run(options.startdate, options.enddate, csvdir=options.csvdir, verbose=options.verbose, history=history)
+    totals = bt.totals()
+    print('*** DAYS {}'.format(totals['days']))
+    print('*** TRADES {}'.format(totals['trades']))
+    print('*** WIN RATE {}%'.format(totals['win_rate']))
+    print('*** AVG {}%'.format(totals['avg_percent']))
+    print('*** PROFIT/LOSS ${}'.format(totals['profit']))
+    print('*** EQUITY ${}'.format(totals['equity']))
+
+
+if __name__ == "__main__":
+    main()
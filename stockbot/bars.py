@@ -0,0 +1,110 @@
+"""
+StockBot
+
+https://github.com/shirosaidev/stockbot
+
+Copyright (C) Chris Park (shirosai) 2021
+stockbot is released under the Apache 2.0 license. See
+LICENSE for the full license text.
+"""
+
+from datetime import timedelta
+
+import numpy as np
+
+from .metrics import REQUEST_SECONDS
+
+
+# max number of symbols alpaca accepts in a single bars request
+BARSET_MAX_SYMBOLS = 200
+
+# max number of bars alpaca returns per symbol in a bars request
+BARSET_MAX_LIMIT = 1000
+
+# v1 bars timeframe -> v2 timeframe and bars per trading day
+V2_TIMEFRAMES = {
+    'day': ('1Day', 1),
+    '1D': ('1Day', 1),
+    'minute': ('1Min', 390),
+    '1Min': ('1Min', 390),
+    '5Min': ('5Min', 78),
+    '15Min': ('15Min', 26),
+    }
+
+
+def get_barsets(api, symbols, timeframe='day', limit=None, chunk_size=BARSET_MAX_SYMBOLS, start=None, **kwargs):
+    # get bars for all symbols using comma separated multi-symbol requests,
+    # returns dict of symbol -> list of bars (empty list if symbol not found)
+    # with at most the last limit bars since start, kwargs (end, ...) are
+    # passed to get_barset/get_bars. get_barset (v1 market data) in older
+    # alpaca_trade_api versions, get_bars (v2) in newer ones
+    get_barset = getattr(api, 'get_barset', None)
+    if get_barset is None:
+        return get_bars_v2(api, symbols, timeframe, limit, chunk_size, start, **kwargs)
+    if start is not None:
+        kwargs['start'] = start
+    barsets = {}
+    for i in range(0, len(symbols), chunk_size):
+        chunk = symbols[i:i + chunk_size]
+        with REQUEST_SECONDS.labels('alpaca', 'get_barset').time():
+            barset = get_barset(','.join(chunk), timeframe, limit=limit, **kwargs)
+        for symbol in chunk:
+            barsets[symbol] = barset.get(symbol) or []
+    return barsets
+
+
+def get_bars_v2(api, symbols, timeframe, limit, chunk_size, start, **kwargs):
+    # v2 bars are from start (the start of today if not given) and their
+    # limit is of all symbols' bars together, so without a start go back far
+    # enough from the exchange's clock for limit bars (weekends and holidays
+    # included) and keep each symbol's last limit bars
+    v2_timeframe, per_day = V2_TIMEFRAMES.get(timeframe, (timeframe, 1))
+    limit = limit or 100
+    if start is None:
+        with REQUEST_SECONDS.labels('alpaca', 'get_clock').time():
+            now = api.get_clock().timestamp
+        days = -(-limit // per_day) * 7 // 5 + 10
+        start = (now - timedelta(days=days)).isoformat()
+    barsets = {}
+    for i in range(0, len(symbols), chunk_size):
+        chunk = symbols[i:i + chunk_size]
+        with REQUEST_SECONDS.labels('alpaca', 'get_bars').time():
+            bars = api.get_bars(chunk, v2_timeframe, start=start, **kwargs)
+        barset = {}
+        for bar in bars:
+            barset.setdefault(bar.S, []).append(bar)
+        for symbol in chunk:
+            barsets[symbol] = barset.get(symbol, [])[-limit:]
+    return barsets
+
+
+def bars_to_arrays(barsets, symbols, limit):
+    # open and close prices as (symbols x limit) arrays, right aligned so the
+    # last column is the latest bar, missing bars are nan
+    opens = np.full((len(symbols), limit), np.nan)
+    closes = np.full((len(symbols), limit), np.nan)
+    for i, symbol in enumerate(symbols):
+        bars = barsets.get(symbol, [])[-limit:]
+        if bars:
+            opens[i, limit - len(bars):] = [bar.o for bar in bars]
+            closes[i, limit - len(bars):] = [bar.c for bar in bars]
+    return opens, closes
+
+
+def moved_percents(opens, closes, calc=0):
+    # percent each symbol moved over the bars, either start open to end
+    # close (calc 0) or the average daily open to close change (calc 1),
+    # symbols without any bars get nan
+    valid = ~np.isnan(opens)
+    count = valid.sum(axis=1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        if calc == 0:
+            first = valid.argmax(axis=1)
+            price_open = opens[np.arange(len(opens)), first]
+            price_close = closes[:, -1]
+            percent_change = np.round((price_close - price_open) / price_open * 100, 3)
+        else:
+            daily = np.round((closes - opens) / opens * 100, 3)
+            percent_change = np.round(np.nansum(daily, axis=1) / count, 3)
+    percent_change[count == 0] = np.nan
+    return percent_change
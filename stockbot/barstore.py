@@ -0,0 +1,192 @@
+"""
+StockBot
+
+https://github.com/shirosaidev/stockbot
+
+Copyright (C) Chris Park (shirosai) 2021
+stockbot is released under the Apache 2.0 license. See
+LICENSE for the full license text.
+"""
+
+import optparse
+import os
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+
+from .bars import BARSET_MAX_LIMIT, get_barsets
+
+
+# local store of bars, one file of fixed size records per symbol and timeframe
+# (<path>/<timeframe>/<SYMBOL>.bin) sorted by bar time, so reading is a memory
+# map and a binary search on time, and updating only appends the bars since
+# the last stored one. a file's mtime is when it was last used, files unused
+# for ttl_days are deleted and the least recently used ones are deleted when
+# the store is over max_bytes
+
+# t is the bar start time in epoch seconds
+BAR_DTYPE = np.dtype([('t', '<i8'), ('o', '<f8'), ('h', '<f8'), ('l', '<f8'), ('c', '<f8'), ('v', '<f8')])
+
+
+def bar_time(t):
+    # alpaca bar times are Timestamps, stored bars are epoch seconds
+    return int(t.timestamp()) if hasattr(t, 'timestamp') else int(t)
+
+
+def bars_to_records(bars):
+    return np.array([(bar_time(bar.t), bar.o, bar.h, bar.l, bar.c, bar.v) for bar in bars], dtype=BAR_DTYPE)
+
+
+class BarStore:
+    """Per-symbol bar files with incremental updates from Alpaca and
+    TTL/size bounded eviction."""
+
+    def __init__(self, path, timeframe='day', ttl_days=30, max_bytes=500 * 1024 * 1024):
+        self.path = path
+        self.timeframe = timeframe
+        self.dir = os.path.join(path, timeframe)
+        self.ttl = ttl_days * 86400 if ttl_days else None
+        self.max_bytes = max_bytes
+        os.makedirs(self.dir, exist_ok=True)
+
+    def file(self, symbol):
+        return os.path.join(self.dir, symbol + '.bin')
+
+    def symbols(self):
+        return sorted(f[:-4] for f in os.listdir(self.dir) if f.endswith('.bin'))
+
+    def touch(self, path):
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+
+    def read(self, symbol, start=None, end=None):
+        # bars with start <= t < end (epoch seconds or datetimes), read only
+        # memory map so only the pages in the range are read
+        path = self.file(symbol)
+        if not os.path.exists(path) or not os.path.getsize(path):
+            return np.empty(0, BAR_DTYPE)
+        records = np.memmap(path, dtype=BAR_DTYPE, mode='r')
+        self.touch(path)
+        lo = np.searchsorted(records['t'], bar_time(start)) if start is not None else 0
+        hi = np.searchsorted(records['t'], bar_time(end)) if end is not None else len(records)
+        return records[lo:hi]
+
+    def last(self, symbol, n):
+        path = self.file(symbol)
+        if not os.path.exists(path) or not os.path.getsize(path):
+            return np.empty(0, BAR_DTYPE)
+        self.touch(path)
+        return np.memmap(path, dtype=BAR_DTYPE, mode='r')[-n:]
+
+    def last_time(self, symbol):
+        path = self.file(symbol)
+        size = os.path.getsize(path) if os.path.exists(path) else 0
+        if size < BAR_DTYPE.itemsize:
+            return None
+        with open(path, 'rb') as f:
+            f.seek(size - BAR_DTYPE.itemsize)
+            return int(np.frombuffer(f.read(BAR_DTYPE.itemsize), BAR_DTYPE)['t'][0])
+
+    def append(self, symbol, records):
+        # stored bars at or after the first new bar are replaced, so the last
+        # bar can be refetched when it wasn't complete yet
+        if not len(records):
+            return 0
+        records = np.sort(np.asarray(records, BAR_DTYPE), order='t')
+        path = self.file(symbol)
+        if os.path.exists(path):
+            stored = np.memmap(path, dtype=BAR_DTYPE, mode='r') if os.path.getsize(path) else np.empty(0, BAR_DTYPE)
+            keep = int(np.searchsorted(stored['t'], records['t'][0]))
+            del stored
+            os.truncate(path, keep * BAR_DTYPE.itemsize)
+        with open(path, 'ab') as f:
+            f.write(records.tobytes())
+        return len(records)
+
+    def update(self, api, symbols, limit):
+        # get the bars missing since each symbol's last stored bar (including
+        # that bar again), or the last limit bars for symbols not stored yet.
+        # symbols with the same last bar time are fetched in the same
+        # multi-symbol requests
+        groups = {}
+        for symbol in symbols:
+            groups.setdefault(self.last_time(symbol), []).append(symbol)
+        num_bars = 0
+        for last, group in groups.items():
+            if last is None:
+                barsets = get_barsets(api, group, self.timeframe, limit=limit)
+            else:
+                start = datetime.fromtimestamp(last, tz=timezone.utc).isoformat()
+                barsets = get_barsets(api, group, self.timeframe, limit=BARSET_MAX_LIMIT, start=start)
+            for symbol, bars in barsets.items():
+                num_bars += self.append(symbol, bars_to_records(bars))
+        self.evict()
+        return num_bars
+
+    def arrays(self, symbols, limit, fields=('o', 'c')):
+        # (symbols x limit) arrays of each field from the last limit stored
+        # bars, right aligned like bars.bars_to_arrays, missing bars are nan
+        out = [np.full((len(symbols), limit), np.nan) for _ in fields]
+        for i, symbol in enumerate(symbols):
+            records = self.last(symbol, limit)
+            for arr, field in zip(out, fields):
+                arr[i, limit - len(records):] = records[field]
+        return out
+
+    def evict(self, now=None):
+        now = now or time.time()
+        files = []
+        for f in os.listdir(self.dir):
+            path = os.path.join(self.dir, f)
+            st = os.stat(path)
+            if self.ttl and now - st.st_mtime > self.ttl:
+                os.remove(path)
+            else:
+                files.append((st.st_mtime, st.st_size, path))
+        total = sum(size for _, size, _ in files)
+        if self.max_bytes:
+            for _, size, path in sorted(files):
+                if total <= self.max_bytes:
+                    break
+                os.remove(path)
+                total -= size
+        return total
+
+
+def main(argv=None):
+    usage = """Usage: python -m stockbot barstore [-h] [-d path] [-n limit] [-e] [SYMBOL ...]
+
+Update the local bar store from Alpaca for the given symbols, or show what's stored."""
+    parser = optparse.OptionParser(usage=usage)
+    parser.add_option('-d', '--path', default='barcache', help='bar store directory, default "%default"')
+    parser.add_option('-n', '--limit', type='int', default=1000,
+                        help='number of daily bars to get for symbols not stored yet, default %default')
+    parser.add_option('-e', '--evict', action='store_true', default=False,
+                        help='delete unused and least recently used files over the size limit')
+    options, args = parser.parse_args(argv)
+
+    store = BarStore(options.path, ttl_days=None, max_bytes=None)
+    if args:
+        import alpaca_trade_api as tradeapi
+        api = tradeapi.REST(os.getenv('APCA_API_KEY_ID'), os.getenv('APCA_API_SECRET_KEY'),
+                            os.getenv('APCA_API_BASE_URL'))
+        print('stored {} bars'.format(store.update(api, args, options.limit)))
+    if options.evict:
+        from .config import Config
+        config = Config.load()
+        store.ttl = config.BAR_STORE_TTL_DAYS * 86400
+        store.max_bytes = config.BAR_STORE_MAX_MB * 1024 * 1024
+        print('{} bytes stored after evicting'.format(store.evict()))
+    for symbol in args or store.symbols():
+        records = store.read(symbol)
+        if len(records):
+            print('{} {} bars {} to {}'.format(symbol, len(records),
+                  datetime.fromtimestamp(records['t'][0], tz=timezone.utc).date(),
+                  datetime.fromtimestamp(records['t'][-1], tz=timezone.utc).date()))
+
+
+if __name__ == "__main__":
+    main()
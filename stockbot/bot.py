@@ -0,0 +1,951 @@
+"""
+StockBot
+
+https://github.com/shirosaidev/stockbot
+
+Copyright (C) Chris Park (shirosai) 2021
+stockbot is released under the Apache 2.0 license. See
+LICENSE for the full license text.
+"""
+
+import os, sys
+import csv
+import logging
+import threading
+import shutil
+import urllib.request
+import time
+import optparse
+import sqlite3
+from requests import RequestException
+from datetime import datetime, timedelta
+import numpy as np
+from pytz import timezone
+from collections import namedtuple
+from functools import cached_property
+
+from . import STOCKBOT_VERSION
+from .bars import moved_percents
+from .barstore import BarStore
+from .config import Config
+from .fetcher import AlpacaQuotes, QuoteFetcher
+from .history import TradeHistory
+from .marketdata import MarketData
+from .orders import OrderExecutor, OrderLedger, list_open_orders
+from .sessions import CircuitOpenError, SessionPool
+from .journal import Journal, reconcile
+from .logs import StrategyLogger, setup_logging
+from .metrics import (ERRORS, FEED_WAIT_SECONDS, LOOP_SECONDS, PHASE_SECONDS, REGISTRY,
+                     REQUEST_SECONDS)
+from .positions import PositionBook
+from .report import CSV_HEADER, summarize, write_csv
+from .scheduler import Clock, MarketScheduler
+from .scoring import Candidates, score, top_k
+from .streaming import PollingFeed, StreamFeed
+
+
+TZ = timezone('America/New_York')
+
+log = logging.getLogger('stockbot')
+
+# config settings each strategy in STRATEGIES can override
+STRATEGY_PARAMS = ['STOCK_MAX_PRICE', 'STOCK_MIN_PRICE', 'MAX_NUM_STOCKS', 'NUM_SHARES', 'SELL_PERCENT_GAIN',
+                   'START_EQUITY', 'MOVED_DAYS', 'MOVED_DAYS_CALC', 'BUY_DAYS',
+                   'BAO_GET_STOCKS_TIME', 'BAO_BUY_START_TIME', 'BAO_BUY_END_TIME', 'BAO_SELL_START_TIME',
+                   'BAO_SELL_END_TIME', 'BAC_GET_STOCKS_TIME', 'BAC_BUY_START_TIME', 'BAC_BUY_END_TIME',
+                   'BAC_SELL_START_TIME', 'BAC_SELL_END_TIME', 'ORDER_FILL_TIMEOUT', 'STOCK_UNIVERSE', 'TREND_WINDOW']
+
+# alpaca rest client and order executor of an account, shared by the
+# strategies trading in it
+Account = namedtuple('Account', 'name api orders key_id secret_key base_url')
+
+# when screening all listed stocks, stocks whose last close is within this
+# fraction outside of STOCK_MIN_PRICE - STOCK_MAX_PRICE still get a quote
+PREFILTER_MARGIN = 0.1
+
+# headers sent to nasdaq.com in addition to the session's browser headers
+NASDAQ_HEADERS = {
+    'cache-control': 'no-cache',
+    'pragma': 'no-cache',
+    'sec-fetch-user': None
+    }
+
+
+class Context:
+    """Config, clients and market data shared by all the strategies run in
+    one process. Clients are made the first time they're used, so importing
+    stockbot or running commands that don't trade doesn't import the alpaca
+    library or connect to anything. Any of them can be set before its first
+    use to replace it (simulate.py points them at the stand-in exchange)."""
+
+    def __init__(self, config, data_account=None):
+        self.config = config
+        # account name -> Account, None is the account in the APCA_API_* env vars
+        self.accounts = {}
+        # account whose client gets daily bars and alpaca quotes for all strategies
+        self.data_account = data_account
+        self.lock = threading.Lock()
+
+    @cached_property
+    def sessions(self):
+        # keep-alive http sessions shared by all yahoo and nasdaq requests,
+        # with retries and a circuit breaker per host
+        c = self.config
+        return SessionPool(connect_timeout=c.HTTP_CONNECT_TIMEOUT, read_timeout=c.HTTP_READ_TIMEOUT,
+                           pool_maxsize=c.QUOTE_FETCH_WORKERS, max_retries=c.HTTP_MAX_RETRIES,
+                           backoff=c.HTTP_BACKOFF, max_backoff=c.HTTP_MAX_BACKOFF,
+                           breaker_failures=c.BREAKER_FAILURES, breaker_reset_secs=c.BREAKER_RESET_SECS)
+
+    @cached_property
+    def fetcher(self):
+        # quotes come from alpaca's latest trade while yahoo is failing
+        c = self.config
+        return QuoteFetcher(max_workers=c.QUOTE_FETCH_WORKERS, rate=c.QUOTE_FETCH_RATE, session_pool=self.sessions,
+                            fallback=AlpacaQuotes(self.account(self.data_account).api)
+                            if c.QUOTE_FALLBACK == 'alpaca' else None)
+
+    @cached_property
+    def barstore(self):
+        # local daily bar store, only bars since the last stored ones are downloaded
+        c = self.config
+        return BarStore(c.BAR_STORE_DIR, 'day', ttl_days=c.BAR_STORE_TTL_DAYS,
+                        max_bytes=c.BAR_STORE_MAX_MB * 1024 * 1024) if c.BAR_STORE_DIR else None
+
+    @cached_property
+    def market(self):
+        # screener, daily bars and quotes shared by all strategies
+        return MarketData(self.fetcher, self.account(self.data_account).api, self.get_nasdaq_buystocks, self.barstore,
+                          quote_ttl=self.config.QUOTE_CACHE_SECS, listed_fn=self.get_nasdaq_listed)
+
+    def account(self, name=None):
+        # the default account's keys are in the APCA_API_* env vars, other
+        # accounts' in <NAME>_APCA_API_* env vars
+        with self.lock:
+            if name not in self.accounts:
+                import alpaca_trade_api as tradeapi
+                prefix = '{}_'.format(name.upper()) if name else ''
+                key_id = os.getenv(prefix + 'APCA_API_KEY_ID')
+                secret_key = os.getenv(prefix + 'APCA_API_SECRET_KEY')
+                base_url = os.getenv(prefix + 'APCA_API_BASE_URL')
+                rest = tradeapi.REST(key_id, secret_key, base_url)
+                # orders are sent from a thread pool and their fills tracked
+                orders = OrderExecutor(rest, max_workers=self.config.ORDER_WORKERS,
+                                       max_retries=self.config.ORDER_MAX_RETRIES,
+                                       max_backoff=self.config.ORDER_MAX_BACKOFF)
+                self.accounts[name] = Account(name, rest, orders, key_id, secret_key, base_url)
+            return self.accounts[name]
+
+    def strategy_params(self, overrides=None):
+        # config settings for a strategy, with its overrides
+        return self.config.params(STRATEGY_PARAMS, overrides)
+
+    def poll_stock_price(self, stock):
+        # None if there's no quote for now
+        quote = self.market.quote(stock)
+        return quote.price if quote else None
+
+    def price_feed(self, pricefeed, account, clock=None):
+        # the feed waits on clock, so it runs on simulate's virtual clock
+        c = self.config
+        clock = clock or Clock(TZ)
+        if pricefeed == 'stream':
+            return StreamFeed(self.poll_stock_price, account.key_id, account.secret_key, account.base_url,
+                              data_feed=c.STREAM_DATA_FEED, data_stream_url=c.STREAM_DATA_URL,
+                              interval=c.PRICE_POLL_SECS, clock=clock)
+        return PollingFeed(self.poll_stock_price, interval=c.PRICE_POLL_SECS, sleep=clock.sleep)
+
+    def get_nasdaq_listed(self):
+        # (symbol, company) of every stock listed on nasdaq from nasdaq's symbol
+        # directory, downloaded once a week, test issues and etfs are skipped
+        nasdaqlist_file = "nasdaqlisted.txt"
+        if not os.path.exists(nasdaqlist_file) or time.time() - os.path.getmtime(nasdaqlist_file) > 604800:  # 1 week
+            try:
+                with REQUEST_SECONDS.labels('nasdaq', 'symbol_directory').time():
+                    with urllib.request.urlopen(self.config.NASDAQ_LISTED_URL,
+                                                timeout=self.config.HTTP_READ_TIMEOUT) as response, \
+                            open(nasdaqlist_file + '.tmp', 'wb') as f:
+                        shutil.copyfileobj(response, f)
+                os.replace(nasdaqlist_file + '.tmp', nasdaqlist_file)
+            except OSError as e:
+                ERRORS.labels('nasdaq', 'symbol_directory').inc()
+                if not os.path.exists(nasdaqlist_file):
+                    raise
+                log.warning('CONNECTION ERROR: {}, using the last downloaded {}'.format(e, nasdaqlist_file),
+                            extra={'service': 'nasdaq'})
+        listed = []
+        with open(nasdaqlist_file, 'r', newline='') as csvfile:
+            # read a row at a time, the last line is the file creation time
+            for row in csv.DictReader(csvfile, delimiter='|'):
+                if row['Symbol'].startswith('File Creation Time') or row['Test Issue'] == 'Y' or row['ETF'] == 'Y':
+                    continue
+                listed.append((row['Symbol'], row['Security Name']))
+        return listed
+
+    def get_nasdaq_buystocks(self):
+        # api used by https://www.nasdaq.com/market-activity/stocks/screener
+        return self.sessions.request(self.config.NASDAQ_API_URL, 'nasdaq', 'screener', headers=NASDAQ_HEADERS).json()
+
+    def close(self):
+        for account in self.accounts.values():
+            account.orders.close()
+
+
+def stock_row(candidates, i, companies):
+    # stock dict of the ith candidate, as kept in the picks and journal
+    symbol = candidates.symbols[i]
+    price, low, high = (float(candidates[name][i]) for name in ('price', 'low', 'high'))
+    volume = candidates['volume'][i]
+    return {'symbol': symbol, 'company': companies[symbol],
+            'market_price': price, 'low': low,
+            'high': high, 'volume': None if np.isnan(volume) else int(volume),
+            'change_low_to_high': round(high - low, 3),
+            'change_low_to_market': round(price - low, 3),
+            'moved': float(candidates['moved'][i])}
+
+
+def get_report_start(startbuytime, day):
+    # the day's report includes the orders since the start of the day, or the
+    # day before when buying at close
+    if startbuytime == 'buyatclose':
+        day = day - timedelta(days=1)
+    return TZ.localize(datetime.combine(day, datetime.min.time()))
+
+
+def get_phase_times(startbuytime, params):
+    # times to buy/sell
+    if startbuytime == 'buyatopen':
+        keys = ('BAO_GET_STOCKS_TIME', 'BAO_BUY_START_TIME', 'BAO_BUY_END_TIME', 'BAO_SELL_START_TIME',
+                'BAO_SELL_END_TIME')
+    else:
+        # buy at close
+        keys = ('BAC_GET_STOCKS_TIME', 'BAC_BUY_START_TIME', 'BAC_BUY_END_TIME', 'BAC_SELL_START_TIME',
+                'BAC_SELL_END_TIME')
+    return dict(zip(('get_stocks', 'buy_start', 'buy_end', 'sell_start', 'sell_end'), (params[k] for k in keys)))
+
+
+class StockBot:
+    """Runs one trade algo / buy time combination, each trading phase of the
+    day (get_stocks, buy, sell, report) is a method called by the scheduler
+    when the phase starts. Several StockBots (strategies) can run in one
+    process, each in its own thread with its own settings (params) and
+    account, sharing the market data of the context. Each day's trades are
+    added to the history (history.TradeHistory) if given."""
+
+    def __init__(self, context, tradealgo, startbuytime, pricefeed, clock=None, journal=None, name=None,
+                 account=None, params=None, history=None):
+        self.context = context
+        self.market = context.market
+        self.tradealgo = tradealgo
+        self.startbuytime = startbuytime
+        self.name = name or tradealgo
+        self.account = account or context.account()
+        self.api = self.account.api
+        self.orders = self.account.orders
+        # client order id prefix of the strategy's orders, the account's
+        # orders of other strategies are left out of its report
+        self.order_prefix = 'stockbot-{}'.format(self.name)
+        self.params = params or context.strategy_params()
+        self.log = StrategyLogger(log, {'strategy': self.name})
+        self.clock = clock or Clock(TZ)
+        self.scheduler = MarketScheduler(self.api, get_phase_times(startbuytime, self.params),
+                                         self.params['BUY_DAYS'], self.clock)
+        self.feed = context.price_feed(pricefeed, self.account, clock=self.clock)
+        self.equity = self.params['START_EQUITY']
+        self.stock_picks = []
+        self.book = None
+        self.stock_data_csv = None
+        self.journal = journal
+        self.history = history
+        self.ledger = None
+        self.ledger_day = None
+        # journal positions with an open order when recovering, checked again
+        # when the next sell phase starts
+        self.pending = []
+
+    def recover(self):
+        # restore equity, today's picks and held stocks from the journal after
+        # a restart, checked against alpaca's positions and open orders
+        journal = self.journal
+        equity = journal.equity()
+        if equity is not None:
+            self.equity = equity
+        picks = journal.last_event(self.clock.now().date().isoformat(), 'picks')
+        if picks:
+            self.stock_picks = picks
+        holding, pending, closed, untracked = reconcile(journal, self.api.list_positions(),
+                                                      list_open_orders(self.api))
+        self.restore(holding, closed)
+        self.pending = pending
+        for position in pending:
+            self.log.warning('journal position {} has an open order, checking it again before selling'.format(
+                position['symbol']), extra={'phase': 'recover', 'symbol': position['symbol']})
+        if untracked:
+            self.log.warning('alpaca positions not bought by stockbot {}'.format(untracked),
+                             extra={'phase': 'recover'})
+        journal.set_equity(self.equity)
+        self.log.info('equity ${}'.format(self.equity), extra={'phase': 'recover', 'equity': self.equity})
+
+    def recheck_pending(self):
+        # the recovered positions whose orders were open are held or closed
+        # once their orders are done
+        journal = self.journal
+        symbols = {position['symbol'] for position in self.pending}
+        holding, pending, closed, untracked = reconcile(journal, self.api.list_positions(),
+                                                      list_open_orders(self.api))
+        self.pending = [position for position in pending if position['symbol'] in symbols]
+        self.restore([position for position in holding if position['symbol'] in symbols],
+                     [position for position in closed if position['symbol'] in symbols])
+        for position in self.pending:
+            self.log.warning('journal position {} still has an open order, not trading it'.format(
+                position['symbol']), extra={'phase': 'recover', 'symbol': position['symbol']})
+        journal.set_equity(self.equity)
+
+    def restore(self, holding, closed):
+        # add the journal's positions still held to the book and close the
+        # ones no longer held
+        journal = self.journal
+        for position in closed:
+            if position['status'] != 'selling':
+                # buy never filled, or sold outside of stockbot
+                self.log.info('journal position {} is no longer held'.format(position['symbol']),
+                              extra={'phase': 'recover', 'symbol': position['symbol']})
+                journal.closed(position['symbol'], 'not held')
+                continue
+            # sold while stockbot wasn't running
+            try:
+                order = self.api.get_order_by_client_order_id(position['sell_order'])
+                sell_price = float(order.filled_avg_price)
+                qty = int(float(order.filled_qty)) if order.filled_qty else position['qty']
+            except Exception as e:
+                self.log.warning('journal position {} sold, sell order not found ({})'.format(position['symbol'], e),
+                                 extra={'phase': 'recover', 'symbol': position['symbol']})
+                journal.closed(position['symbol'], 'sold')
+                continue
+            buy_price = position['buy_price']
+            stock = position['stock']
+            trade_row = [position['symbol'], stock.get('company'), buy_price, position['buy_time'], sell_price,
+                         position['sell_time'], round(sell_price - buy_price, 2),
+                         round((sell_price - buy_price) / buy_price * 100, 2), stock.get('volume'), None, qty]
+            journal.closed(position['symbol'], 'sold', trade_row)
+            self.equity += sell_price * qty
+
+        if holding:
+            if self.book is None:
+                self.book = PositionBook(window=self.params['TREND_WINDOW'])
+            book = self.book
+            for position in holding:
+                state = book.get(position['symbol']) or book.add(position['stock'])
+                if state.bought:
+                    self.log.warning('journal position {} bought again today, not adding it'.format(state.symbol),
+                                     extra={'phase': 'recover', 'symbol': state.symbol})
+                    continue
+                if 'fill_price' in position:
+                    # bought while stockbot wasn't running
+                    position['buy_price'] = position['fill_price']
+                    self.equity -= position['fill_price'] * position['qty']
+                book.mark_bought(state, position['buy_price'], position['buy_time'], position['qty'])
+                journal.held(state.symbol, state.buy_price)
+            self.log.info('recovered {} held stocks from journal {}'.format(len(holding),
+                                                                            [p['symbol'] for p in holding]),
+                     extra={'phase': 'recover'})
+
+    def run(self, until=None):
+        # run each phase as it comes, if until is set stop at the first phase
+        # starting at or after it (replaying days with simulate.py)
+        from alpaca_trade_api.rest import APIError
+        for phase in self.scheduler:
+            if until is not None and phase.start >= until:
+                return
+            with PHASE_SECONDS.labels(phase.name).time():
+                try:
+                    getattr(self, phase.name)(phase)
+                except (RequestException, CircuitOpenError, APIError) as e:
+                    # a data source or alpaca is down, carry on with the next phase
+                    self.log.error('{} failed: {}'.format(phase.name, e), extra={'phase': phase.name})
+
+    def get_stocks(self, phase):
+        # get the best buy and strong buy stock from Nasdaq.com, or all
+        # stocks listed on nasdaq, and rank them using the chosen trade algo
+        # (scoring.py)
+
+        start_time = time.perf_counter()
+        universe = self.params['STOCK_UNIVERSE']
+        if universe == 'listed':
+            self.log.info('getting stocks listed on Nasdaq...', extra={'phase': 'get_stocks'})
+            companies = dict(self.market.listed())
+            symbols = list(companies)
+        else:
+            self.log.info('getting buy and strong buy stocks from Nasdaq.com...', extra={'phase': 'get_stocks'})
+            rows = self.market.screener()['data']['table']['rows']
+            symbols = [d['symbol'] for d in rows]
+            companies = {d['symbol']: d['name'] for d in rows}
+
+        # Get daily price data for all stock symbols over the last n trading days
+        # and see how much each stock ticker moved in that timeframe.
+        opens, closes = self.market.daily(symbols, self.params['MOVED_DAYS'])
+        moved = moved_percents(opens, closes, self.params['MOVED_DAYS_CALC'])
+        found = ~np.isnan(moved)
+        if universe == 'listed':
+            # only get quotes for stocks whose last close is around the
+            # price range, the quotes decide if they're in it
+            last_close = closes[:, -1]
+            with np.errstate(invalid='ignore'):
+                found &= ((last_close >= self.params['STOCK_MIN_PRICE'] * (1 - PREFILTER_MARGIN)) &
+                          (last_close <= self.params['STOCK_MAX_PRICE'] * (1 + PREFILTER_MARGIN)))
+
+        if self.log.isEnabledFor(logging.DEBUG):
+            for symbol, percent_change in zip(symbols, moved):
+                if np.isnan(percent_change):
+                    self.log.debug('stock symbol {} not found'.format(symbol),
+                                   extra={'phase': 'get_stocks', 'symbol': symbol})
+                else:
+                    self.log.debug('{} moved {}% over the last {} days'.format(symbol, percent_change,
+                                                                               self.params['MOVED_DAYS']),
+                                   extra={'phase': 'get_stocks', 'symbol': symbol})
+
+        # get quotes for all the candidates in one go
+        symbols = [symbol for symbol, ok in zip(symbols, found) if ok]
+        candidates = self.quote_table(symbols, self.market.quotes(symbols), moved[found])
+
+        # score all candidates at once and pick the best without sorting them all
+        scores = score(candidates, self.tradealgo, self.params)
+        picks = top_k(scores, self.params['MAX_NUM_STOCKS'])
+        self.stock_picks = [stock_row(candidates, i, companies) for i in picks]
+        if self.journal:
+            self.journal.picks(self.stock_picks)
+
+        num_stocks = int(np.count_nonzero(~np.isnan(scores)))
+        self.log.info('screened {} symbols, got quotes for {}, in {}s'.format(
+            len(companies), len(symbols), round(time.perf_counter() - start_time, 2)), extra={'phase': 'get_stocks'})
+        if self.log.isEnabledFor(logging.DEBUG):
+            stock_info = [stock_row(candidates, i, companies) for i in np.flatnonzero(~np.isnan(scores))]
+            self.log.debug('today\'s stocks {}'.format(stock_info), extra={'phase': 'get_stocks'})
+        self.log.debug('today\'s picks {}'.format(self.stock_picks), extra={'phase': 'get_stocks'})
+        self.log.info('found {} stocks, picked {}'.format(num_stocks, [s['symbol'] for s in self.stock_picks]),
+                      extra={'phase': 'get_stocks'})
+        self.log.debug('http connections {}'.format(self.context.sessions.stats()), extra={'phase': 'get_stocks'})
+
+    def quote_table(self, symbols, quotes, moved):
+        # candidates table with the price, day low/high and volume of each
+        # stock from its yahoo quote, nan for stocks not found in yahoo
+        # finance or not in NYSE or NASDAQ
+        n = len(symbols)
+        price, low, high, volume = (np.full(n, np.nan) for _ in range(4))
+        for i, symbol in enumerate(symbols):
+            quote = quotes.get(symbol)
+            if not quote:
+                self.log.debug('stock symbol {} not found in yahoo finance'.format(symbol),
+                               extra={'phase': 'get_stocks', 'symbol': symbol})
+                continue
+            # check which market it's in, quotes from alpaca (yahoo down) don't say
+            if quote.exchange is not None and quote.exchange not in ['NYQ', 'NMS']:
+                self.log.debug('stock symbol {} in different exchange {}'.format(symbol, quote.exchange),
+                               extra={'phase': 'get_stocks', 'symbol': symbol})
+                continue
+            price[i] = quote.price
+            if quote.high is not None:
+                high[i] = round(quote.high, 2)
+            if quote.low is not None:
+                low[i] = round(quote.low, 2)
+            if quote.volume is not None:
+                volume[i] = quote.volume
+        return Candidates(symbols, price=price, low=low, high=high, volume=volume, moved=moved)
+
+    def buy(self, phase):
+        # buy stocks
+
+        # buy at open
+        # check stock prices at 9:30am EST (market open) and continue to check for the next 1.5 hours
+        # to see if stock is going down or going up, when the stock starts to go up, buy
+
+        # buy at close
+        # buy stocks at 3:00pm EST and hold until next day
+
+        if not self.stock_picks:
+            self.log.info('no stocks picked to buy', extra={'phase': 'buy'})
+            return
+
+        prev_book = self.book
+
+        self.log.info('starting to buy stocks...', extra={'phase': 'buy'})
+
+        self.book = book = PositionBook(self.stock_picks, self.params['TREND_WINDOW'])
+        # keep any stocks still held from before (sell orders that didn't fill
+        # or positions recovered from the journal)
+        if prev_book:
+            book.carry_over(prev_book)
+        carried = {state.symbol for state in book.bought()}
+
+        total_buy_price = 0
+        self.feed.start([state.symbol for state in book])
+        while True:
+            # wait for new prices, every 2 min when polling or on each trade when streaming
+            with FEED_WAIT_SECONDS.labels('buy').time():
+                prices = self.feed.next_prices(book.not_bought_symbols())
+            loop_start = time.perf_counter()
+            for symbol, stock_price_buy in prices.items():
+                state = book.get(symbol)
+                if state.bought:
+                    continue
+                stock = state.stock
+
+                # update the stock's indicators over the last TREND_WINDOW prices
+                indicators = state.add_price(stock_price_buy, *self.feed.traded(symbol))
+
+                # buy the stock if there are 5 records of it before this one and it's trending
+                # up above its EMA and VWAP and if we have enough equity left to buy
+                # if buying at end of day, ignore record checking to force it to buy
+
+                if self.startbuytime == 'buyatclose':
+                    went_up = True
+                else:
+                    went_up = indicators.buy_signal()
+                buy_price = stock_price_buy * self.params['NUM_SHARES']
+                if went_up and self.equity >= buy_price:
+                    buy_time = self.clock.now().isoformat()
+                    state.buy_order = self.orders.submit(symbol, self.params['NUM_SHARES'], 'buy',
+                                                         prefix=self.order_prefix)
+                    self.log.info('placed buy order of stock {} ({}) for ${} (vol {})'.format(
+                        symbol, stock['company'], stock_price_buy, stock['volume']),
+                        extra={'phase': 'buy', 'symbol': symbol, 'price': stock_price_buy,
+                               'latency': round(time.perf_counter() - loop_start, 6)})
+                    total_buy_price += buy_price
+                    book.mark_bought(state, stock_price_buy, buy_time, self.params['NUM_SHARES'])
+                    if self.journal:
+                        self.journal.buying(state, state.buy_order)
+                    self.equity -= buy_price
+
+            LOOP_SECONDS.labels('buy').observe(time.perf_counter() - loop_start)
+
+            # check prices again if time is before 11:00am EST / 4:00pm EST (market close)
+            if book.num_bought >= self.params['MAX_NUM_STOCKS'] or \
+                book.num_bought == len(book) or \
+                self.equity == 0 or \
+                self.clock.now() >= phase.end:
+                break
+
+        # done buying, don't stay subscribed to the picks' trades until the
+        # sell phase (overnight when buying at close)
+        self.feed.stop()
+        self.log.info('sent buy orders for {} stocks, market price ${}'.format(book.num_bought,
+                                                                               round(total_buy_price, 2)),
+                 extra={'phase': 'buy'})
+        self.settle_buys([state for state in book.bought() if state.symbol not in carried])
+        if self.startbuytime == 'buyatclose':
+            self.log.info('holding these stocks and selling them the next market open day...', extra={'phase': 'buy'})
+
+    def settle_buys(self, bought):
+        # wait for the buy orders to fill and use the fill prices as the buy
+        # prices and the filled shares as the shares held, stocks whose buy
+        # orders didn't fill aren't held. orders not filled in time are
+        # canceled first so no shares are bought after they're counted
+        book = self.book
+        pending = self.orders.wait([state.buy_order for state in bought], timeout=self.params['ORDER_FILL_TIMEOUT'])
+        self.orders.cancel(pending)
+        total_fill_price = 0
+        num_filled = 0
+        for state in bought:
+            order = state.buy_order
+            # equity was taken off at the market price when ordering
+            self.equity += state.buy_price * order.qty
+            if order.fill_price is None or not order.fill_qty:
+                self.log.warning('buy order of stock {} not filled ({})'.format(state.symbol,
+                                                                                order.error or order.status),
+                            extra={'phase': 'buy', 'symbol': state.symbol})
+                if self.journal:
+                    self.journal.unfilled(state, order)
+                book.unmark_bought(state)
+                continue
+            if order.fill_qty < order.qty:
+                self.log.warning('buy order of stock {} partially filled ({} of {} shares)'.format(
+                    state.symbol, order.fill_qty, order.qty), extra={'phase': 'buy', 'symbol': state.symbol})
+            book.mark_bought(state, order.fill_price, state.buy_time, order.fill_qty)
+            if self.journal:
+                self.journal.bought(state)
+            self.equity -= order.fill_price * state.qty
+            total_fill_price += order.fill_price * state.qty
+            num_filled += 1
+            self.log.debug('filled buy order of stock {} for ${}'.format(state.symbol, order.fill_price),
+                           extra={'phase': 'buy', 'symbol': state.symbol, 'price': order.fill_price})
+        if self.journal:
+            self.journal.set_equity(self.equity)
+        self.log.info('filled buy orders for {} stocks, fill price ${}'.format(num_filled,
+                                                                               round(total_fill_price, 2)),
+                 extra={'phase': 'buy'})
+
+    def sell_stock(self, state, stock_price_sell, loop_start):
+        stock_price_buy = state.buy_price
+        diff = round(stock_price_sell - stock_price_buy, 2)
+        change_perc = round((stock_price_sell - stock_price_buy) / stock_price_buy * 100, 2)
+        sell_time = self.clock.now().isoformat()
+        state.sell_order = self.orders.submit(state.symbol, state.qty, 'sell', prefix=self.order_prefix)
+        self.log.info('placed sell order of stock {} ({}) for ${} (diff ${} {}%)'.format(
+            state.symbol, state.stock['company'], stock_price_sell, diff, change_perc),
+            extra={'phase': 'sell', 'symbol': state.symbol, 'price': stock_price_sell,
+                   'latency': round(time.perf_counter() - loop_start, 6)})
+        self.book.mark_sold(state, stock_price_sell, sell_time)
+        if self.journal:
+            self.journal.selling(state, state.sell_order)
+        self.equity += stock_price_sell * state.qty
+
+    def settle_sells(self, stock_data_csv):
+        # wait for the sell orders to fill and add the trades with their fill
+        # prices to the csv rows. orders not filled in time are canceled
+        # first, the shares of a canceled (partially filled) sell order that
+        # weren't sold are still held, an order that couldn't be canceled may
+        # still sell them so they aren't sold again
+        book = self.book
+        sold = [state for state in book.bought() if state.sold and state.sell_order is not None]
+        pending = self.orders.wait([state.sell_order for state in sold], timeout=self.params['ORDER_FILL_TIMEOUT'])
+        self.orders.cancel(pending)
+        quotes = self.market.quotes([state.symbol for state in sold])
+        for state in sold:
+            order = state.sell_order
+            # equity was added at the market price when ordering
+            self.equity -= state.sell_price * order.qty
+            if not order.done:
+                self.log.error('sell order of stock {} still open ({} of {} shares filled), not selling it '
+                               'again'.format(state.symbol, order.fill_qty, order.qty),
+                               extra={'phase': 'sell', 'symbol': state.symbol})
+                if not order.fill_qty:
+                    continue
+            elif order.fill_price is None or not order.fill_qty:
+                self.log.warning('sell order of stock {} not filled ({}), still holding it'.format(
+                    state.symbol, order.error or order.status), extra={'phase': 'sell', 'symbol': state.symbol})
+                if self.journal:
+                    self.journal.unfilled(state, order)
+                book.unmark_sold(state)
+                state.sell_order = None
+                continue
+            stock = state.stock
+            stock_price_buy = state.buy_price
+            stock_price_sell = order.fill_price
+            diff = round(stock_price_sell - stock_price_buy, 2)
+            change_perc = round((stock_price_sell - stock_price_buy) / stock_price_buy * 100, 2)
+            quote = quotes.get(state.symbol)
+            stock_vol_now = quote.volume if quote else None
+            self.log.info('sold stock {} ({}) for ${} (diff ${} {}%) (vol {})'.format(
+                state.symbol, stock['company'], stock_price_sell, diff, change_perc, stock_vol_now),
+                extra={'phase': 'sell', 'symbol': state.symbol, 'price': stock_price_sell})
+            trade_row = [state.symbol, stock['company'], stock_price_buy, state.buy_time,
+                         stock_price_sell, state.sell_time, diff, change_perc, stock['volume'], stock_vol_now,
+                         order.fill_qty]
+            stock_data_csv.append(trade_row)
+            self.equity += stock_price_sell * order.fill_qty
+            if order.fill_qty < order.qty and order.done:
+                self.log.warning('sell order of stock {} partially filled ({} of {} shares), still holding {}'.format(
+                    state.symbol, order.fill_qty, order.qty, order.qty - order.fill_qty),
+                    extra={'phase': 'sell', 'symbol': state.symbol})
+                state.qty = order.qty - order.fill_qty
+                book.unmark_sold(state)
+                state.sell_order = None
+            else:
+                book.mark_sold(state, stock_price_sell, state.sell_time)
+            if self.journal:
+                self.journal.sold(state, order, trade_row)
+        if self.journal:
+            self.journal.set_equity(self.equity)
+
+    def sell(self, phase):
+        # sell stocks
+
+        # check stock prices at 9:30am EST (buy at close) / 11:00am EST and continue to check until 1:00pm EST to
+        # see if it goes up by x percent, sell it if it does
+        # when the stock starts to go down starting at 1:00pm EST, sell or 
+        # sell at end of day 2:00pm EST (buy at close) / 3:30pm EST
+
+        if self.pending:
+            self.recheck_pending()
+        book = self.book
+        if book is None or not book.num_bought:
+            self.log.info('no bought stocks to sell', extra={'phase': 'sell'})
+            return
+
+        for state in book.bought():
+            state.reset_prices()
+
+        self.stock_data_csv = stock_data_csv = [CSV_HEADER]
+        if self.journal:
+            # trades already made today before a restart
+            stock_data_csv.extend(self.journal.trades(self.clock.now().date().isoformat()))
+
+        midday = self.scheduler.midday_time(phase)
+
+        self.log.info('selling stock if it goes up by {}%...'.format(self.params['SELL_PERCENT_GAIN']),
+                      extra={'phase': 'sell'})
+
+        self.feed.start(book.unsold_symbols())
+        while True:
+            with FEED_WAIT_SECONDS.labels('sell').time():
+                prices = self.feed.next_prices(book.unsold_symbols())
+            loop_start = time.perf_counter()
+            for symbol, stock_price_sell in prices.items():
+                state = book.get(symbol)
+                if state.sold:
+                    continue
+
+                # sell the stock if it's gone up by x percent
+                indicators = state.add_price(stock_price_sell, *self.feed.traded(symbol))
+                change_perc = indicators.change_percent(state.buy_price)
+                if change_perc >= self.params['SELL_PERCENT_GAIN']:
+                    self.sell_stock(state, stock_price_sell, loop_start)
+                elif self.log.isEnabledFor(logging.DEBUG):
+                    diff = round(stock_price_sell - state.buy_price, 2)
+                    self.log.debug('stock {} ({}) hasn\'t gone up enough to sell ${} (diff ${} {}%) {}'.format(
+                        symbol, state.stock['company'], stock_price_sell, diff, change_perc, indicators),
+                        extra={'phase': 'sell', 'symbol': symbol, 'price': stock_price_sell})
+
+            LOOP_SECONDS.labels('sell').observe(time.perf_counter() - loop_start)
+
+            # check prices again if time is before 1:00pm EST
+            if book.all_sold() or self.clock.now() >= midday:  # 1:00pm EST
+                break
+
+        if not book.all_sold():
+        
+            self.log.info('selling any remaining stocks if they go down, or else sell at end of day...',
+                          extra={'phase': 'sell'})
+
+            while True:
+                with FEED_WAIT_SECONDS.labels('sell').time():
+                    prices = self.feed.next_prices(book.unsold_symbols())
+                loop_start = time.perf_counter()
+                for symbol, stock_price_sell in prices.items():
+                    state = book.get(symbol)
+                    if state.sold:
+                        continue
+
+                    # update the stock's indicators over the last TREND_WINDOW prices
+                    indicators = state.add_price(stock_price_sell, *self.feed.traded(symbol))
+
+                    # sell the stock if there are 15 records of it before this one and it's trending
+                    # down or fell SELL_PERCENT_GAIN from its high, or sell if it's the end of the day
+                    if indicators.sell_signal(self.params['SELL_PERCENT_GAIN']) or \
+                            self.clock.now() >= phase.end:
+                        self.sell_stock(state, stock_price_sell, loop_start)
+
+                LOOP_SECONDS.labels('sell').observe(time.perf_counter() - loop_start)
+
+                # check prices again if time is before # 3:30pm EST / 2:30pm EST (buy at close)
+                if book.all_sold() or self.clock.now() >= phase.end:
+                    break
+
+            # the feed only has prices of the stocks that ticked or could be
+            # quoted, sell the rest at a fresh quote or their last price
+            loop_start = time.perf_counter()
+            for symbol in book.unsold_symbols():
+                state = book.get(symbol)
+                stock_price_sell = self.context.poll_stock_price(symbol) or state.indicators.last or \
+                    state.buy_price
+                self.sell_stock(state, stock_price_sell, loop_start)
+
+        # sold all stocks or market close
+        self.feed.stop()
+        self.settle_sells(stock_data_csv)
+
+        percent = round((self.equity - self.params['START_EQUITY']) / self.params['START_EQUITY'] * 100, 2)
+        self.equity = round(self.equity, 2)
+        self.log.info('*** PERCENT {}%'.format(percent), extra={'phase': 'sell', 'percent': percent})
+        self.log.info('*** EQUITY ${}'.format(self.equity), extra={'phase': 'sell', 'equity': self.equity})
+
+        # Alpaca stock summary is available a few min after the final sells
+        self.log.info('waiting for Alpaca report...', extra={'phase': 'sell'})
+
+    def eod_change_percents(self):
+        # buy/sell totals and percent change per symbol of the strategy's
+        # orders of the day, only orders closed since the last call are
+        # downloaded
+        day = self.clock.now().date()
+        if self.ledger is None or self.ledger_day != day:
+            self.ledger = OrderLedger(self.api, get_report_start(self.startbuytime, day),
+                                      prefix=self.order_prefix + '-')
+            self.ledger_day = day
+        self.ledger.update()
+        return self.ledger.change_percents()
+
+    def report(self, phase):
+        # log summary of today's buy/sells on alpaca
+
+        stock_data_csv = self.stock_data_csv
+        if stock_data_csv is None:
+            return
+        self.stock_data_csv = None
+
+        percent = round((self.equity - self.params['START_EQUITY']) / self.params['START_EQUITY'] * 100, 2)
+        equity = self.equity
+
+        todays_buy_sell = self.eod_change_percents()
+        summary = summarize(todays_buy_sell, verbose=False)
+        for symbol, buy, sell, change in summary['rows']:
+            self.log.info('{} {}{}%'.format(symbol, '+' if change > 0 else '', change),
+                          extra={'phase': 'report', 'symbol': symbol, 'price': sell})
+        self.log.info('*** SUM {} AVG {} BUY {} SELL {} PROFIT/LOSS {}'.format(
+            summary['sum'], summary['avg'], summary['buy'], summary['sell'], summary['profit']),
+            extra={'phase': 'report'})
+        quote_stats = self.market.quote_cache.stats()
+        self.log.info('quote cache {} hits, {} misses, {} coalesced'.format(
+            quote_stats['hits'], quote_stats['misses'], quote_stats['coalesced']),
+            extra=dict(quote_stats, phase='report'))
+
+        # add the day's trades to the history, and write the csv
+
+        now = self.clock.now().date().isoformat()
+        if self.history:
+            try:
+                self.history.record_day(now, self.name, self.tradealgo, self.startbuytime, stock_data_csv[1:],
+                                        summary, percent, equity)
+            except sqlite3.Error as e:
+                self.log.error('HISTORY ERROR: {}'.format(e), extra={'phase': 'report'})
+        if self.context.config.CSV_EXPORT:
+            csv_file = 'stocks_{0}_{1}.csv'.format(self.name, now)
+            write_csv(csv_file, stock_data_csv, summary, percent, equity)
+        
+        # set equity back to start value to not reinvest any gains
+        if self.equity > self.params['START_EQUITY']:
+            self.equity = self.params['START_EQUITY']
+        if self.journal:
+            self.journal.set_equity(self.equity)
+
+
+def strategy_journal_file(journal_file, name):
+    # each strategy run with -s gets its own journal, JOURNAL_FILE with the
+    # strategy name added
+    if not journal_file:
+        return None
+    root, ext = os.path.splitext(journal_file)
+    return '{}_{}{}'.format(root, name, ext)
+
+
+def run_strategies(bots):
+    # run each strategy's phases in its own thread, a strategy that fails
+    # doesn't stop the others
+    def run(bot):
+        try:
+            bot.run()
+        except Exception:
+            bot.log.exception('strategy {} stopped'.format(bot.name))
+
+    threads = [threading.Thread(target=run, args=(bot,), name=bot.name, daemon=True) for bot in bots]
+    for thread in threads:
+        thread.start()
+    # join with a timeout so ctrl+c gets through
+    while any(thread.is_alive() for thread in threads):
+        for thread in threads:
+            thread.join(timeout=1)
+
+
+def main(argv=None):
+    usage = """Usage: python -m stockbot [run] [-h] [-t tradealgo] [-b startbuytime] [-f pricefeed] [-s strategies] [-l loglevel]
+
+StockBot v{0}
+Alpaca algo stock trading bot.""".format(STOCKBOT_VERSION)
+    parser = optparse.OptionParser(usage=usage)
+    parser.add_option('-t', '--tradealgo', default='moved', 
+                        help='algo to use for trading, options are moved, lowtomarket or lowtohigh, default "%default"')
+    parser.add_option('-b', '--startbuytime', default='buyatopen', 
+                        help='when to starting buying stocks, options are buyatopen, and buyatclose, default "%default"')
+    parser.add_option('-f', '--pricefeed',
+                        help='how to get stock prices when buying/selling, options are poll (yahoo finance every PRICE_POLL_SECS) '
+                        'or stream (alpaca market data websocket), default PRICE_FEED in config')
+    parser.add_option('-s', '--strategies',
+                        help='comma separated names of strategies in STRATEGIES in config to run together, or all, '
+                        'instead of the -t/-b strategy')
+    parser.add_option('-l', '--loglevel',
+                        help='log level, DEBUG logs every price check, options are DEBUG, INFO, WARNING or ERROR, '
+                        'default LOG_LEVEL in config')
+    options, args = parser.parse_args(argv)
+
+    try:
+        config = Config.load()
+    except (FileNotFoundError, ValueError) as e:
+        parser.error(e)
+    context = Context(config)
+    
+    # print banner
+    banner = """\033[32m                                
+    _____ _           _   _____     _   
+    |   __| |_ ___ ___| |_| __  |___| |_ 
+    |__   |  _| . |  _| '_| __ -| . |  _|
+    |_____|_| |___|___|_,_|_____|___|_|  
+    StockBot v{0}    +$ = :)  -$ = ;(\n
+    https://github.com/shirosaidev/stockbot\033[0m\n\n""".format(STOCKBOT_VERSION)
+
+    print(banner)
+
+    # log records are written by a background thread, to stdout and LOG_FILE
+    log_listener = setup_logging((options.loglevel or config.LOG_LEVEL).upper(), config.LOG_FORMAT, config.LOG_FILE,
+                                 max_bytes=config.LOG_MAX_MB * 1024 * 1024, backup_count=config.LOG_BACKUPS,
+                                 when=config.LOG_ROTATE_WHEN, queue_size=config.LOG_QUEUE_SIZE)
+
+    if options.strategies:
+        # several strategies from STRATEGIES in config in this process
+        names = options.strategies.split(',')
+        strategies = [s for s in config.STRATEGIES or [] if options.strategies == 'all' or s['name'] in names]
+        if not strategies:
+            log.error('no strategies named {} in STRATEGIES'.format(options.strategies))
+            log_listener.stop()
+            sys.exit(1)
+    else:
+        strategies = [{'name': options.tradealgo, 'tradealgo': options.tradealgo,
+                       'startbuytime': options.startbuytime, 'journal': config.JOURNAL_FILE}]
+
+    # check each account once, strategies of accounts restricted from trading aren't run
+    blocked = set()
+    for name in {strategy.get('account') for strategy in strategies}:
+        account = context.account(name)
+        info = account.api.get_account()
+        log.info('Account {} info: {}'.format(name or 'default', info))
+        if info.trading_blocked:
+            log.error('Account {} is currently restricted from trading.'.format(name or 'default'))
+            blocked.add(name)
+            continue
+        log.info('Account {} current positions: {}'.format(name or 'default', account.api.list_positions()))
+        # get order fills pushed from alpaca's trade updates stream
+        if config.ORDER_FILL_STREAM:
+            account.orders.start_stream(account.key_id, account.secret_key, account.base_url)
+    strategies = [strategy for strategy in strategies if strategy.get('account') not in blocked]
+    if not strategies:
+        log_listener.stop()
+        sys.exit(0)
+    # market data comes through the first strategy's account, there may be no
+    # default account when all of them name one
+    context.data_account = strategies[0].get('account')
+
+    # latency metrics, prometheus text at http://127.0.0.1:METRICS_PORT/metrics
+    if config.METRICS_PORT:
+        REGISTRY.serve(config.METRICS_PORT)
+        log.info('Metrics: http://127.0.0.1:{}/metrics'.format(config.METRICS_PORT))
+    if config.METRICS_JSON_FILE:
+        REGISTRY.dump_every(config.METRICS_JSON_FILE, config.METRICS_JSON_SECS)
+
+    clock = Clock(TZ)
+    bots = []
+    # all strategies add their trades to the same history
+    history = TradeHistory(config.HISTORY_FILE) if config.HISTORY_FILE else None
+
+    try:
+        for strategy in strategies:
+            pricefeed = strategy.get('pricefeed', options.pricefeed or config.PRICE_FEED)
+            log.info('Strategy {}: trade algo {}, buy time {}, price feed {}'.format(
+                strategy['name'], strategy['tradealgo'], strategy['startbuytime'], pricefeed))
+            journal_file = strategy.get('journal', strategy_journal_file(config.JOURNAL_FILE, strategy['name']))
+            journal = Journal(journal_file, clock) if journal_file else None
+            bot = StockBot(context, strategy['tradealgo'], strategy['startbuytime'], pricefeed, clock=clock,
+                           journal=journal, name=strategy['name'], account=context.account(strategy.get('account')),
+                           params=context.strategy_params(strategy.get('params')), history=history)
+            bots.append(bot)
+            if journal:
+                bot.recover()
+        if len(bots) == 1:
+            bots[0].run()
+        else:
+            run_strategies(bots)
+    except KeyboardInterrupt:
+        log.info('Ctrl+c pressed, exiting')
+    finally:
+        context.close()
+        for bot in bots:
+            if bot.journal:
+                bot.journal.close()
+        # write out the queued log records
+        log_listener.stop()
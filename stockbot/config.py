@@ -0,0 +1,65 @@
+"""
+StockBot
+
+https://github.com/shirosaidev/stockbot
+
+Copyright (C) Chris Park (shirosai) 2021
+stockbot is released under the Apache 2.0 license. See
+LICENSE for the full license text.
+"""
+
+import os
+import re
+import runpy
+
+
+# a strategy's name is in its orders' client order ids,
+# stockbot-<name>-<side>-<symbol>-<12 hex chars>, which alpaca allows 48 chars
+# in with symbols of up to 5, and its orders are told apart by the
+# stockbot-<name>- prefix so names can't have a - in them
+STRATEGY_NAME = re.compile(r'[A-Za-z0-9_]{1,15}')
+
+
+def check_strategies(strategies):
+    # raises ValueError for a strategy name that can't be in a client order id
+    for strategy in strategies or []:
+        name = strategy.get('name')
+        if not isinstance(name, str) or not STRATEGY_NAME.fullmatch(name):
+            raise ValueError('strategy name {!r} in STRATEGIES must be 1-15 letters, digits or _'.format(name))
+
+
+class Config:
+    """Stockbot settings read from a config file (config.py.sample copied to
+    config.py), the uppercase names in it are attributes, e.g.
+    config.MAX_NUM_STOCKS. A setting missing from the file raises an
+    AttributeError saying which one, so a config older than the sample is
+    easy to fix. Settings can also be given or changed as keyword args.
+    Loading a config with a bad STRATEGIES name raises a ValueError."""
+
+    def __init__(self, path=None, **settings):
+        self.path = path
+        self.__dict__.update(settings)
+
+    @classmethod
+    def load(cls, path=None, **overrides):
+        # settings from path, default the STOCKBOT_CONFIG env var or config.py
+        # in the current directory
+        path = path or os.getenv('STOCKBOT_CONFIG', 'config.py')
+        if not os.path.exists(path):
+            raise FileNotFoundError('config file {} not found, copy config.py.sample to it'.format(path))
+        settings = {name: value for name, value in runpy.run_path(path).items() if name.isupper()}
+        settings.update(overrides)
+        check_strategies(settings.get('STRATEGIES'))
+        return cls(path, **settings)
+
+    def __getattr__(self, name):
+        # only called for names that aren't set
+        if name.isupper():
+            raise AttributeError('setting {} not in {}, copy it from config.py.sample'.format(name, self.path))
+        raise AttributeError(name)
+
+    def params(self, names, overrides=None):
+        # dict of the named settings, with overrides
+        params = {name: getattr(self, name) for name in names}
+        params.update(overrides or {})
+        return params
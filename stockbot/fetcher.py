@@ -0,0 +1,190 @@
+"""
+StockBot
+
+https://github.com/shirosaidev/stockbot
+
+Copyright (C) Chris Park (shirosai) 2021
+stockbot is released under the Apache 2.0 license. See
+LICENSE for the full license text.
+"""
+
+import logging
+import threading
+import time
+from requests import RequestException
+from concurrent.futures import ThreadPoolExecutor
+from random import randint
+from urllib.parse import urlparse
+
+from .metrics import ERRORS, QUOTE_FALLBACKS, REQUEST_SECONDS
+from .sessions import CircuitBreaker, CircuitOpenError, SessionPool
+
+try:
+    # decodes yahoo responses a few times faster than json, if installed
+    from orjson import loads as json_loads
+except ImportError:
+    from json import loads as json_loads
+
+
+log = logging.getLogger('stockbot.fetcher')
+
+
+YAHOO_CHART_URL = "https://query{n}.finance.yahoo.com/v8/finance/chart/{symbol}?region=US&lang=en-US&includePrePost=false&interval=1d&range=1d&corsDomain=finance.yahoo.com&.tsrc=finance"
+
+
+class Quote:
+    """The fields of a yahoo chart response stockbot uses, the rest of the
+    response is dropped after parsing. high, low and volume are today's."""
+
+    __slots__ = ('symbol', 'exchange', 'price', 'high', 'low', 'volume')
+
+    def __init__(self, symbol, exchange, price, high, low, volume):
+        self.symbol = symbol
+        self.exchange = exchange
+        self.price = price
+        self.high = high
+        self.low = low
+        self.volume = volume
+
+    def __repr__(self):
+        return 'Quote({} {} price={} high={} low={} volume={})'.format(self.symbol, self.exchange, self.price,
+                                                                      self.high, self.low, self.volume)
+
+
+def day_value(values):
+    # yahoo quotes have yesterday's and today's value, or only today's
+    if not values:
+        return None
+    if len(values) > 1 and values[1] is not None:
+        return values[1]
+    return values[0]
+
+
+def parse_quote(symbol, body):
+    # Quote from a yahoo chart response body, None if the symbol wasn't found
+    result = json_loads(body)['chart']['result']
+    if not result:
+        return None
+    result = result[0]
+    quote = result['indicators']['quote'][0]
+    return Quote(symbol, result['meta']['exchangeName'], result['meta']['regularMarketPrice'],
+                 day_value(quote.get('high')), day_value(quote.get('low')), day_value(quote.get('volume')))
+
+
+class AlpacaQuotes:
+    """Quotes from alpaca's latest trade, used when yahoo is failing so
+    buying and selling can carry on. Only the price is known, exchange, high,
+    low and volume are None. Requests go through their own circuit
+    breaker."""
+
+    def __init__(self, api, breaker=None):
+        self.api = api
+        self.breaker = breaker or CircuitBreaker('alpaca latest trade')
+
+    def __call__(self, symbol):
+        if not self.breaker.allow():
+            raise CircuitOpenError('{} circuit breaker is open'.format(self.breaker.name))
+        # get_latest_trade (v2 market data) in newer alpaca_trade_api versions,
+        # get_last_trade in older ones
+        get_trade = getattr(self.api, 'get_latest_trade', None) or self.api.get_last_trade
+        try:
+            with REQUEST_SECONDS.labels('alpaca', 'latest_trade').time():
+                trade = get_trade(symbol)
+        except Exception as e:
+            status_code = getattr(e, 'status_code', None)
+            if status_code is not None and 400 <= status_code < 500 and status_code != 429:
+                # no trades for the symbol, alpaca itself is fine
+                self.breaker.success()
+                return None
+            self.breaker.failure()
+            ERRORS.labels('alpaca', 'latest_trade').inc()
+            raise
+        self.breaker.success()
+        return Quote(symbol, None, float(trade.price), None, None, None)
+
+
+class RateLimiter:
+    """Token bucket allowing rate requests per second (with bursts of up to
+    burst requests) to a single host, shared by all fetcher threads."""
+
+    def __init__(self, rate, burst=1):
+        self.rate = float(rate)
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def wait(self):
+        if self.rate <= 0:
+            return
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                delay = (1 - self.tokens) / self.rate
+            time.sleep(delay)
+
+
+class QuoteFetcher:
+    """Fetches Yahoo Finance quotes for many symbols at once using a
+    bounded thread pool. Requests are spread over the query1/query2 hosts and
+    paced by a per-host rate limiter instead of random sleeps. Failed
+    requests are retried a few times (SessionPool.request), after that or
+    while yahoo's circuit breaker is open the quote comes from fallback
+    (AlpacaQuotes) if set."""
+
+    def __init__(self, url=YAHOO_CHART_URL, max_workers=8, rate=4, burst=2, session_pool=None, fallback=None):
+        self.url = url
+        self.sessions = session_pool or SessionPool(pool_maxsize=max_workers)
+        self.fallback = fallback
+        self.max_workers = max_workers
+        self.rate = rate
+        self.burst = burst
+        self.limiters = {}
+        self.lock = threading.Lock()
+
+    def limiter(self, host):
+        with self.lock:
+            if host not in self.limiters:
+                self.limiters[host] = RateLimiter(self.rate, self.burst)
+            return self.limiters[host]
+
+    def fetch_yahoo(self, symbol):
+        url = self.url.format(n=randint(1, 2), symbol=symbol)
+        limiter = self.limiter(urlparse(url).netloc)
+        r = self.sessions.request(url, 'yahoo', 'chart', wait=limiter.wait)
+        return parse_quote(symbol, r.content)
+
+    def fetch(self, symbol):
+        # Quote for the symbol, None if it's not found or yahoo and the
+        # fallback both failed, a response that isn't the expected chart json
+        # counts as failed
+        try:
+            return self.fetch_yahoo(symbol)
+        except (RequestException, CircuitOpenError, ValueError, KeyError, IndexError, TypeError) as e:
+            error = e
+        if self.fallback is not None:
+            try:
+                quote = self.fallback(symbol)
+                QUOTE_FALLBACKS.labels('ok').inc()
+                return quote
+            except Exception as e:
+                QUOTE_FALLBACKS.labels('failed').inc()
+                error = '{}, fallback failed: {}'.format(error, e)
+        log.warning('QUOTE ERROR: {}: {}'.format(symbol, error), extra={'service': 'yahoo', 'symbol': symbol})
+        return None
+
+    def fetch_all(self, symbols):
+        # returns dict of symbol -> Quote (None if not found) for all symbols
+        symbols = list(symbols)
+        if not symbols:
+            return {}
+        if len(symbols) == 1:
+            # a single price poll, no need for a thread pool
+            return {symbols[0]: self.fetch(symbols[0])}
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(symbols))) as executor:
+            return dict(zip(symbols, executor.map(self.fetch, symbols)))
@@ -0,0 +1,249 @@
+"""
+StockBot
+
+https://github.com/shirosaidev/stockbot
+
+Copyright (C) Chris Park (shirosai) 2021
+stockbot is released under the Apache 2.0 license. See
+LICENSE for the full license text.
+"""
+
+import csv
+import optparse
+import os
+import sqlite3
+
+
+# profit is $ per share (sell - buy) like the csv's, qty is the shares traded
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS trades (
+    id INTEGER PRIMARY KEY,
+    day TEXT NOT NULL,
+    strategy TEXT NOT NULL,
+    tradealgo TEXT NOT NULL,
+    startbuytime TEXT NOT NULL,
+    symbol TEXT NOT NULL,
+    company TEXT,
+    qty INTEGER,
+    buy_price REAL,
+    buy_time TEXT,
+    sell_price REAL,
+    sell_time TEXT,
+    profit REAL,
+    percent REAL,
+    vol_sod INTEGER,
+    vol_sell INTEGER
+);
+CREATE INDEX IF NOT EXISTS trades_day ON trades (day);
+CREATE INDEX IF NOT EXISTS trades_symbol_day ON trades (symbol, day);
+CREATE INDEX IF NOT EXISTS trades_algo_day ON trades (tradealgo, startbuytime, day);
+CREATE INDEX IF NOT EXISTS trades_strategy_day ON trades (strategy, day);
+CREATE TABLE IF NOT EXISTS days (
+    day TEXT NOT NULL,
+    strategy TEXT NOT NULL,
+    tradealgo TEXT NOT NULL,
+    startbuytime TEXT NOT NULL,
+    trades INTEGER,
+    wins INTEGER,
+    buy REAL,
+    sell REAL,
+    profit REAL,
+    percent REAL,
+    equity REAL,
+    PRIMARY KEY (day, strategy)
+);
+CREATE INDEX IF NOT EXISTS days_algo_day ON days (tradealgo, startbuytime, day);
+"""
+
+TRADE_COLUMNS = ('day', 'strategy', 'tradealgo', 'startbuytime', 'symbol', 'company', 'qty', 'buy_price', 'buy_time',
+                 'sell_price', 'sell_time', 'profit', 'percent', 'vol_sod', 'vol_sell')
+
+# filter name -> where clause
+FILTERS = {
+    'start': 'day >= ?',
+    'end': 'day <= ?',
+    'strategy': 'strategy = ?',
+    'tradealgo': 'tradealgo = ?',
+    'startbuytime': 'startbuytime = ?',
+    'symbol': 'symbol = ?',
+    }
+
+
+def where(filters, allowed=FILTERS):
+    # where clause and params of the filters that are set
+    clauses, params = [], []
+    for name, value in filters.items():
+        if value is not None and name in allowed:
+            clauses.append(allowed[name])
+            params.append(value)
+    return (' WHERE ' + ' AND '.join(clauses) if clauses else ''), params
+
+
+def win_rate(wins, trades):
+    return round(wins / trades * 100, 2) if trades else 0
+
+
+class TradeHistory:
+    """Every day's trades and profit/loss summary of all strategies (live and
+    backtests) in one SQLite file, indexed on day, symbol and trade algo/buy
+    time, for the report command's stats over months of trading instead of
+    parsing each day's csv. Recording a strategy's day again (the report
+    run again after a restart) replaces it. Each call uses its own
+    connection so strategies in different threads can record at once."""
+
+    def __init__(self, path):
+        self.path = path
+        conn = self.connect()
+        try:
+            conn.executescript(SCHEMA)
+        finally:
+            conn.close()
+
+    def connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.execute('PRAGMA journal_mode=WAL')
+        return conn
+
+    def record_day(self, day, strategy, tradealgo, startbuytime, trade_rows, summary, percent, equity):
+        # trade_rows are the csv rows (report.CSV_HEADER columns) with the
+        # shares each trade filled, summary is report.summarize()'s of the
+        # strategy's own orders of the day (its OrderLedger only counts its
+        # client order ids), not the account's
+        trades = [(day, strategy, tradealgo, startbuytime) + tuple(row[:2]) + (row[10],) + tuple(row[2:10])
+                  for row in trade_rows]
+        conn = self.connect()
+        try:
+            with conn:
+                conn.execute('DELETE FROM trades WHERE strategy = ? AND day = ?', (strategy, day))
+                conn.executemany('INSERT INTO trades ({}) VALUES ({})'.format(
+                    ', '.join(TRADE_COLUMNS), ', '.join('?' * len(TRADE_COLUMNS))), trades)
+                conn.execute('INSERT OR REPLACE INTO days (day, strategy, tradealgo, startbuytime, trades, wins, buy, '
+                             'sell, profit, percent, equity) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                             (day, strategy, tradealgo, startbuytime, len(trades),
+                              sum(1 for row in trade_rows if row[6] > 0), round(summary['total_buy'], 2),
+                              round(summary['total_sell'], 2),
+                              round(summary['total_sell'] - summary['total_buy'], 2), percent, equity))
+        finally:
+            conn.close()
+        return len(trades)
+
+    def read(self, sql, params=()):
+        conn = self.connect()
+        try:
+            return conn.execute(sql, params).fetchall()
+        finally:
+            conn.close()
+
+    def totals(self, **filters):
+        clause, params = where(filters)
+        days, trades, wins, profit, avg_percent = self.read(
+            'SELECT COUNT(DISTINCT day), COUNT(*), SUM(profit > 0), SUM(profit * qty), AVG(percent) '
+            'FROM trades' + clause, params)[0]
+        return {'days': days, 'trades': trades, 'win_rate': win_rate(wins, trades),
+                'profit': round(profit or 0, 2), 'avg_percent': round(avg_percent or 0, 3)}
+
+    def by_strategy(self, **filters):
+        # win rate and profit/loss per trade algo and buy time, with the
+        # average and worst day's percent change of the strategies' equity
+        clause, params = where(filters)
+        rows = self.read(
+            'SELECT tradealgo, startbuytime, COUNT(DISTINCT day), COUNT(*), SUM(profit > 0), SUM(profit * qty), '
+            'AVG(percent) FROM trades{} GROUP BY tradealgo, startbuytime'.format(clause), params)
+        clause, params = where(filters, {name: f for name, f in FILTERS.items() if name != 'symbol'})
+        days = {(tradealgo, startbuytime): (avg_day, worst_day) for tradealgo, startbuytime, avg_day, worst_day in
+                self.read('SELECT tradealgo, startbuytime, AVG(percent), MIN(percent) FROM days{} '
+                          'GROUP BY tradealgo, startbuytime'.format(clause), params)}
+        stats = []
+        for tradealgo, startbuytime, num_days, trades, wins, profit, avg_percent in rows:
+            avg_day, worst_day = days.get((tradealgo, startbuytime), (None, None))
+            stats.append({'tradealgo': tradealgo, 'startbuytime': startbuytime, 'days': num_days, 'trades': trades,
+                          'win_rate': win_rate(wins, trades), 'profit': round(profit or 0, 2),
+                          'avg_percent': round(avg_percent or 0, 3),
+                          'avg_day_percent': None if avg_day is None else round(avg_day, 2),
+                          'worst_day_percent': worst_day})
+        return sorted(stats, key=lambda s: -s['profit'])
+
+    def by_symbol(self, **filters):
+        # per symbol trades, win rate and profit/loss, most profitable first
+        clause, params = where(filters)
+        rows = self.read(
+            'SELECT symbol, COUNT(*), SUM(profit > 0), SUM(profit * qty), AVG(percent), MAX(percent), MIN(percent) '
+            'FROM trades{} GROUP BY symbol ORDER BY SUM(profit * qty) DESC'.format(clause), params)
+        return [{'symbol': symbol, 'trades': trades, 'win_rate': win_rate(wins, trades), 'profit': round(profit, 2),
+                 'avg_percent': round(avg_percent, 3), 'best_percent': best, 'worst_percent': worst}
+                for symbol, trades, wins, profit, avg_percent, best, worst in rows]
+
+    def export_csv(self, csv_file, **filters):
+        # the trades as a csv with one header row, returns the number of trades
+        clause, params = where(filters)
+        rows = self.read('SELECT {} FROM trades{} ORDER BY day, strategy, id'.format(
+            ', '.join(TRADE_COLUMNS), clause), params)
+        with open(csv_file, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(TRADE_COLUMNS)
+            writer.writerows(rows)
+        return len(rows)
+
+
+def main(argv=None):
+    usage = """Usage: python -m stockbot report [-h] [-f file] [-s startdate] [-e enddate] [-t tradealgo] [-b startbuytime] [-n strategy] [-y symbol] [-k topsymbols] [-o csvfile]
+
+Win rate and profit/loss by trade algo/buy time and per symbol from the trade history."""
+    parser = optparse.OptionParser(usage=usage)
+    parser.add_option('-f', '--file', help='trade history file, default HISTORY_FILE in config')
+    parser.add_option('-s', '--startdate', help='first day (YYYY-MM-DD), default first day in the history')
+    parser.add_option('-e', '--enddate', help='last day (YYYY-MM-DD), default last day in the history')
+    parser.add_option('-t', '--tradealgo', help='only trades of this algo')
+    parser.add_option('-b', '--startbuytime', help='only trades of this buy time')
+    parser.add_option('-n', '--strategy', help='only trades of this strategy name')
+    parser.add_option('-y', '--symbol', help='only trades of this symbol')
+    parser.add_option('-k', '--topsymbols', type='int', default=10,
+                        help='number of best and worst symbols to show, default "%default"')
+    parser.add_option('-o', '--csvfile', help='also write the trades to this csv file')
+    options, args = parser.parse_args(argv)
+
+    path = options.file
+    if path is None:
+        from .config import Config
+        try:
+            path = Config.load().HISTORY_FILE
+        except (FileNotFoundError, AttributeError) as e:
+            parser.error(e)
+    if not path or not os.path.exists(path):
+        parser.error('trade history file {} not found'.format(path))
+
+    history = TradeHistory(path)
+    filters = {'start': options.startdate, 'end': options.enddate, 'strategy': options.strategy,
+               'tradealgo': options.tradealgo, 'startbuytime': options.startbuytime, 'symbol': options.symbol}
+    totals = history.totals(**filters)
+    print('*** DAYS {}'.format(totals['days']))
+    print('*** TRADES {}'.format(totals['trades']))
+    print('*** WIN RATE {}%'.format(totals['win_rate']))
+    print('*** AVG {}%'.format(totals['avg_percent']))
+    print('*** PROFIT/LOSS ${}'.format(totals['profit']))
+    print()
+    print('{:<12} {:<12} {:>6} {:>7} {:>9} {:>8} {:>8} {:>8} {:>11}'.format(
+        'tradealgo', 'buytime', 'days', 'trades', 'win rate', 'avg', 'avg day', 'worst', 'profit'))
+    for s in history.by_strategy(**filters):
+        print('{:<12} {:<12} {:>6} {:>7} {:>8}% {:>7}% {:>7}% {:>7}% {:>11}'.format(
+            s['tradealgo'], s['startbuytime'], s['days'], s['trades'], s['win_rate'], s['avg_percent'],
+            s['avg_day_percent'], s['worst_day_percent'], '${}'.format(s['profit'])))
+    symbols = history.by_symbol(**filters)
+    k = options.topsymbols
+    for title, rows in (('best', symbols[:k]), ('worst', symbols[::-1][:min(k, max(len(symbols) - k, 0))])):
+        if not rows:
+            continue
+        print()
+        print('{:<13} {:>7} {:>9} {:>8} {:>8} {:>8} {:>11}'.format(
+            '{} symbols'.format(title), 'trades', 'win rate', 'avg', 'best', 'worst', 'profit'))
+        for s in rows:
+            print('{:<13} {:>7} {:>8}% {:>7}% {:>7}% {:>7}% {:>11}'.format(
+                s['symbol'], s['trades'], s['win_rate'], s['avg_percent'], s['best_percent'], s['worst_percent'],
+                '${}'.format(s['profit'])))
+    if options.csvfile:
+        print()
+        print('wrote {} trades to {}'.format(history.export_csv(options.csvfile, **filters), options.csvfile))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+"""
+StockBot
+
+https://github.com/shirosaidev/stockbot
+
+Copyright (C) Chris Park (shirosai) 2021
+stockbot is released under the Apache 2.0 license. See
+LICENSE for the full license text.
+"""
+
+from collections import deque
+
+
+# number of prices the EMA is over
+EMA_SPAN = 10
+
+# slopes within this of 0 are flat, so the running sums' rounding errors
+# aren't taken for a trend
+FLAT_SLOPE = 1e-9
+
+# prices a stock needs before it's bought on its trend, and before it's sold
+# on its trend after 1:00pm
+BUY_MIN_COUNT = 5
+SELL_MIN_COUNT = 15
+
+
+class Indicators:
+    """Intraday indicators of one symbol's prices, each updated in constant
+    time per price so the buy/sell loops can check every streamed trade of
+    hundreds of symbols without the work growing over the day.
+
+    count - number of prices seen, last is the latest one
+    ema - exponential moving average of the prices over ema_span prices
+    vwap - average price weighted by the volumes traded at it, from the
+        streamed trades' sizes, prices without a volume (polled prices)
+        aren't counted, None until a price with a volume
+    high, low - highest and lowest of the last window prices
+    slope - least squares slope of the last window prices, per price
+    ups, downs - how many of the changes between the last window prices
+        went up or down
+
+    buy_signal() and sell_signal() are the buy/sell rules on these,
+    backtest.py has the same rules over arrays of prices.
+    """
+
+    __slots__ = ('window', 'alpha', 'count', 'last', 'ema', 'price_volume', 'volume', 'prices', 'ups', 'downs',
+                 'highs', 'lows', 'sum_prices', 'sum_positions')
+
+    def __init__(self, window=15, ema_span=EMA_SPAN):
+        self.window = max(window, 2)
+        self.alpha = 2 / (ema_span + 1)
+        self.reset()
+
+    def reset(self):
+        self.count = 0
+        self.last = None
+        self.ema = None
+        self.price_volume = 0.0
+        self.volume = 0.0
+        # the last window prices
+        self.prices = deque()
+        self.ups = 0
+        self.downs = 0
+        # (count, price) of the prices that can still become the window's
+        # high/low, the high/low is the first one
+        self.highs = deque()
+        self.lows = deque()
+        # sums over the window of the prices and of each price times its
+        # position in the window, for the slope
+        self.sum_prices = 0.0
+        self.sum_positions = 0.0
+
+    def update(self, price, volume=None, value=None):
+        n = self.count
+        self.count += 1
+        prices = self.prices
+        if len(prices) == self.window:
+            # the oldest price and its change to the next one leave the window,
+            # the others move down a position
+            oldest = prices.popleft()
+            self.ups -= prices[0] > oldest
+            self.downs -= prices[0] < oldest
+            self.sum_prices -= oldest
+            self.sum_positions -= self.sum_prices
+        if self.last is not None:
+            self.ups += price > self.last
+            self.downs += price < self.last
+        self.sum_positions += len(prices) * price
+        self.sum_prices += price
+        prices.append(price)
+        self.last = price
+
+        self.ema = price if self.ema is None else self.ema + self.alpha * (price - self.ema)
+
+        # value is the $ traded for the volume when it was traded at several
+        # prices, volume * price if not given
+        if volume:
+            self.price_volume += price * volume if value is None else value
+            self.volume += volume
+
+        # monotonic deques, prices that can't be the high (low) anymore while
+        # this one is in the window are dropped from the back
+        highs, lows = self.highs, self.lows
+        while highs and highs[-1][1] <= price:
+            highs.pop()
+        highs.append((n, price))
+        if highs[0][0] <= n - self.window:
+            highs.popleft()
+        while lows and lows[-1][1] >= price:
+            lows.pop()
+        lows.append((n, price))
+        if lows[0][0] <= n - self.window:
+            lows.popleft()
+
+    @property
+    def vwap(self):
+        return round(self.price_volume / self.volume, 4) if self.volume else None
+
+    @property
+    def high(self):
+        return self.highs[0][1] if self.highs else None
+
+    @property
+    def low(self):
+        return self.lows[0][1] if self.lows else None
+
+    @property
+    def slope(self):
+        k = len(self.prices)
+        if k < 2:
+            return 0.0
+        sum_x = k * (k - 1) / 2
+        sum_xx = (k - 1) * k * (2 * k - 1) / 6
+        return (k * self.sum_positions - sum_x * self.sum_prices) / (k * sum_xx - sum_x * sum_x)
+
+    def change_percent(self, price):
+        # percent the last price is up (or down) from price
+        return round((self.last - price) / price * 100, 2)
+
+    def buy_signal(self):
+        # the price went up more times than down over the window, the
+        # window's trend is up and the price is at or above its EMA (and its
+        # VWAP when there are traded volumes)
+        return (self.count > BUY_MIN_COUNT and self.ups > self.downs and self.slope > FLAT_SLOPE and
+                self.last >= self.ema and (self.vwap is None or self.last >= self.vwap))
+
+    def sell_signal(self, drawdown_percent):
+        # after 1:00pm, the price went down more times than up over the
+        # window, the window's trend is down and the price fell to the
+        # window's low or below its EMA, or it's down drawdown_percent from
+        # the window's high
+        if self.count <= SELL_MIN_COUNT:
+            return False
+        return (self.downs > self.ups or
+                (self.slope < -FLAT_SLOPE and (self.last <= self.low or self.last < self.ema)) or
+                self.last <= self.high * (1 - drawdown_percent / 100))
+
+    def __repr__(self):
+        return 'Indicators(count={} last={} ema={} vwap={} high={} low={} slope={} ups={} downs={})'.format(
+            self.count, self.last, self.ema, self.vwap, self.high, self.low, self.slope, self.ups, self.downs)
@@ -0,0 +1,240 @@
+"""
+StockBot
+
+https://github.com/shirosaidev/stockbot
+
+Copyright (C) Chris Park (shirosai) 2021
+stockbot is released under the Apache 2.0 license. See
+LICENSE for the full license text.
+"""
+
+import json
+import logging
+import queue
+import sqlite3
+import threading
+import time
+
+
+log = logging.getLogger('stockbot.journal')
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    id INTEGER PRIMARY KEY,
+    ts TEXT NOT NULL,
+    day TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    symbol TEXT,
+    data TEXT
+);
+CREATE INDEX IF NOT EXISTS events_day_kind ON events (day, kind);
+CREATE TABLE IF NOT EXISTS positions (
+    symbol TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    qty INTEGER,
+    buy_price REAL,
+    buy_time TEXT,
+    buy_order TEXT,
+    sell_price REAL,
+    sell_time TEXT,
+    sell_order TEXT,
+    stock TEXT
+);
+CREATE TABLE IF NOT EXISTS state (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+
+class Journal:
+    """Append-only log of the bot's picks, orders, fills, trades and equity in
+    SQLite (WAL mode), with a positions table of what's currently bought so a
+    restart can pick up where it left off.
+
+    Writes are put on a queue and done by a writer thread in batched
+    transactions (one fsync per batch), so journaling never blocks the
+    buy/sell loops. Reads flush the queue first."""
+
+    def __init__(self, path, clock, max_batch=500, flush_secs=0.5):
+        self.path = path
+        self.clock = clock
+        self.max_batch = max_batch
+        self.flush_secs = flush_secs
+        self.queue = queue.Queue()
+        conn = self.connect()
+        conn.executescript(SCHEMA)
+        conn.close()
+        self.thread = threading.Thread(target=self.writer, name='journal', daemon=True)
+        self.thread.start()
+
+    def connect(self):
+        conn = sqlite3.connect(self.path, check_same_thread=False)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=FULL')
+        return conn
+
+    def writer(self):
+        conn = self.connect()
+        while True:
+            item = self.queue.get()
+            if item is None:
+                self.queue.task_done()
+                break
+            batch = [item]
+            # wait a little for more writes so they share a transaction
+            deadline = time.monotonic() + self.flush_secs
+            while len(batch) < self.max_batch:
+                try:
+                    item = self.queue.get(timeout=max(deadline - time.monotonic(), 0))
+                except queue.Empty:
+                    break
+                if item is None:
+                    self.queue.put(None)
+                    self.queue.task_done()
+                    break
+                batch.append(item)
+            try:
+                with conn:
+                    for sql, params in batch:
+                        conn.execute(sql, params)
+            except sqlite3.Error as e:
+                log.error('JOURNAL ERROR: {}'.format(e))
+            for _ in batch:
+                self.queue.task_done()
+        conn.close()
+
+    def write(self, sql, params=()):
+        self.queue.put((sql, params))
+
+    def flush(self):
+        self.queue.join()
+
+    def close(self):
+        self.queue.put(None)
+        self.thread.join()
+
+    # writes
+
+    def event(self, kind, symbol=None, data=None):
+        now = self.clock.now()
+        self.write('INSERT INTO events (ts, day, kind, symbol, data) VALUES (?, ?, ?, ?, ?)',
+                   (now.isoformat(), now.date().isoformat(), kind, symbol, json.dumps(data, default=str)))
+
+    def picks(self, stocks):
+        self.event('picks', data=stocks)
+
+    def order(self, order):
+        self.event('order', order.symbol, {'side': order.side, 'qty': order.qty,
+                                           'client_order_id': order.client_order_id})
+
+    def buying(self, state, order):
+        self.order(order)
+        self.write('INSERT OR REPLACE INTO positions (symbol, status, qty, buy_price, buy_time, buy_order, stock) '
+                   'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                   (state.symbol, 'buying', order.qty, state.buy_price, state.buy_time, order.client_order_id,
+                    json.dumps(state.stock, default=str)))
+
+    def held(self, symbol, buy_price, qty=None):
+        # qty None keeps the shares held
+        self.write("UPDATE positions SET status = 'held', qty = COALESCE(?, qty), buy_price = ?, sell_price = NULL, "
+                   "sell_time = NULL, sell_order = NULL WHERE symbol = ?", (qty, buy_price, symbol))
+
+    def bought(self, state):
+        self.event('fill', state.symbol, {'side': 'buy', 'price': state.buy_price, 'qty': state.qty,
+                                          'client_order_id': state.buy_order.client_order_id})
+        self.held(state.symbol, state.buy_price, state.qty)
+
+    def selling(self, state, order):
+        self.order(order)
+        self.write("UPDATE positions SET status = 'selling', sell_price = ?, sell_time = ?, sell_order = ? "
+                   "WHERE symbol = ?", (state.sell_price, state.sell_time, order.client_order_id, state.symbol))
+
+    def sold(self, state, order, trade_row):
+        # a partially filled sell order leaves the rest of the shares held
+        self.event('fill', state.symbol, {'side': 'sell', 'price': order.fill_price, 'qty': order.fill_qty,
+                                          'client_order_id': order.client_order_id})
+        self.event('trade', state.symbol, trade_row)
+        if state.sold:
+            self.write('DELETE FROM positions WHERE symbol = ?', (state.symbol,))
+        else:
+            self.held(state.symbol, state.buy_price, state.qty)
+
+    def unfilled(self, state, order):
+        # buy that didn't fill is dropped, sell that didn't fill is still held
+        self.event('unfilled', state.symbol, {'side': order.side, 'client_order_id': order.client_order_id,
+                                              'status': order.status, 'error': str(order.error or '')})
+        if order.side == 'buy':
+            self.write('DELETE FROM positions WHERE symbol = ?', (state.symbol,))
+        else:
+            self.held(state.symbol, state.buy_price)
+
+    def closed(self, symbol, reason, trade_row=None):
+        # position found closed when reconciling
+        self.event('closed', symbol, {'reason': reason})
+        if trade_row:
+            self.event('trade', symbol, trade_row)
+        self.write('DELETE FROM positions WHERE symbol = ?', (symbol,))
+
+    def set_equity(self, equity):
+        self.event('equity', data=equity)
+        self.write('INSERT OR REPLACE INTO state (key, value) VALUES (?, ?)', ('equity', json.dumps(equity)))
+
+    # reads
+
+    def read(self, sql, params=()):
+        self.flush()
+        conn = self.connect()
+        try:
+            return conn.execute(sql, params).fetchall()
+        finally:
+            conn.close()
+
+    def positions(self):
+        cols = ('symbol', 'status', 'qty', 'buy_price', 'buy_time', 'buy_order', 'sell_price', 'sell_time',
+                'sell_order', 'stock')
+        rows = self.read('SELECT {} FROM positions'.format(', '.join(cols)))
+        positions = []
+        for row in rows:
+            position = dict(zip(cols, row))
+            position['stock'] = json.loads(position['stock']) if position['stock'] else {'symbol': position['symbol']}
+            positions.append(position)
+        return positions
+
+    def equity(self):
+        rows = self.read('SELECT value FROM state WHERE key = ?', ('equity',))
+        return json.loads(rows[0][0]) if rows else None
+
+    def last_event(self, day, kind):
+        rows = self.read('SELECT data FROM events WHERE day = ? AND kind = ? ORDER BY id DESC LIMIT 1', (day, kind))
+        return json.loads(rows[0][0]) if rows else None
+
+    def trades(self, day):
+        return [json.loads(data) for data, in self.read(
+            "SELECT data FROM events WHERE day = ? AND kind = 'trade' ORDER BY id", (day,))]
+
+
+def reconcile(journal, broker_positions, open_orders):
+    # match the journal's positions against alpaca's positions and open
+    # orders, each is a dict lookup so this is O(positions). returns the
+    # positions still held (buy_price and qty set to the fill price and shares
+    # held if the journal didn't get the fill), positions with orders still open, positions no
+    # longer held and alpaca positions the journal doesn't know about
+    held = {p.symbol: p for p in broker_positions}
+    open_ids = {o.client_order_id for o in open_orders}
+    holding, pending, closed = [], [], []
+    for position in journal.positions():
+        symbol = position['symbol']
+        if position['buy_order'] in open_ids or position['sell_order'] in open_ids:
+            pending.append(position)
+        elif symbol in held:
+            if position['status'] == 'buying' or position['buy_price'] is None:
+                position['fill_price'] = float(held[symbol].avg_entry_price)
+                position['qty'] = int(float(held[symbol].qty))
+            holding.append(position)
+        else:
+            closed.append(position)
+    known = {position['symbol'] for position in holding + pending}
+    untracked = [symbol for symbol in held if symbol not in known]
+    return holding, pending, closed, untracked
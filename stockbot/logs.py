@@ -0,0 +1,110 @@
+"""
+StockBot
+
+https://github.com/shirosaidev/stockbot
+
+Copyright (C) Chris Park (shirosai) 2021
+stockbot is released under the Apache 2.0 license. See
+LICENSE for the full license text.
+"""
+
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+from datetime import datetime, timezone
+
+from .metrics import REGISTRY
+
+
+LOG_DROPPED = REGISTRY.counter('stockbot_log_dropped_total', 'Log records dropped because the log queue was full.')
+
+# attributes every LogRecord has, anything else was passed in extra and is
+# written as a field
+RECORD_ATTRS = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+
+def record_fields(record):
+    return {k: v for k, v in vars(record).items() if k not in RECORD_ATTRS}
+
+
+class JsonFormatter(logging.Formatter):
+    """One json object per line with time, level, logger, message and any
+    extra fields (symbol, phase, price, latency...)."""
+
+    def format(self, record):
+        entry = {
+            'ts': datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(),
+            'level': record.levelname,
+            'logger': record.name,
+            'msg': record.getMessage()
+            }
+        entry.update(record_fields(record))
+        if record.exc_info:
+            entry['exc'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    """Readable lines for the console, extra fields are appended as key=value."""
+
+    def __init__(self):
+        super().__init__('%(asctime)s %(levelname)s %(message)s')
+
+    def format(self, record):
+        line = super().format(record)
+        fields = record_fields(record)
+        if fields:
+            line += ' ' + ' '.join('{}={}'.format(k, v) for k, v in fields.items())
+        return line
+
+
+class StrategyLogger(logging.LoggerAdapter):
+    """Adds the strategy's name to the extra fields of every record."""
+
+    def process(self, msg, kwargs):
+        kwargs['extra'] = dict(self.extra, **kwargs.get('extra', {}))
+        return msg, kwargs
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """Puts records on a bounded queue without ever blocking, records are
+    dropped (and counted) when the writer can't keep up."""
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            LOG_DROPPED.inc()
+
+
+def setup_logging(level='INFO', fmt='text', log_file=None, max_bytes=0, backup_count=5,
+                  when=None, queue_size=10000):
+    # log records from the 'stockbot' loggers go on a queue and a background
+    # thread writes them to stdout and optionally a rotating file (rotated at
+    # max_bytes, or at when, e.g. 'midnight'). returns the listener, stop it
+    # to flush on exit
+    formatter = JsonFormatter() if fmt == 'json' else TextFormatter()
+    handlers = []
+    console = logging.StreamHandler(sys.stdout)
+    console.setFormatter(formatter)
+    handlers.append(console)
+    if log_file:
+        if when:
+            file_handler = logging.handlers.TimedRotatingFileHandler(log_file, when=when, backupCount=backup_count)
+        else:
+            file_handler = logging.handlers.RotatingFileHandler(log_file, maxBytes=max_bytes,
+                                                                backupCount=backup_count)
+        # files are always json lines
+        file_handler.setFormatter(JsonFormatter())
+        handlers.append(file_handler)
+
+    log_queue = queue.Queue(maxsize=queue_size)
+    listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    logger = logging.getLogger('stockbot')
+    logger.handlers = [DroppingQueueHandler(log_queue)]
+    logger.setLevel(level)
+    logger.propagate = False
+    listener.start()
+    return listener
@@ -0,0 +1,183 @@
+"""
+StockBot
+
+https://github.com/shirosaidev/stockbot
+
+Copyright (C) Chris Park (shirosai) 2021
+stockbot is released under the Apache 2.0 license. See
+LICENSE for the full license text.
+"""
+
+import logging
+import threading
+import time
+
+from .bars import bars_to_arrays, get_barsets, moved_percents
+from .metrics import QUOTE_CACHE
+
+
+log = logging.getLogger('stockbot.marketdata')
+
+
+class QuoteCache:
+    """Quotes per symbol kept for ttl secs. Symbols another thread is already
+    fetching aren't fetched again, the caller waits for that fetch and uses
+    its quote (request coalescing), so strategies and loops asking for the
+    same symbols at the same time make one request per symbol. fetch_all
+    takes a list of symbols and returns a dict of symbol -> quote."""
+
+    def __init__(self, fetch_all, ttl=30, now=time.monotonic):
+        self.fetch_all = fetch_all
+        self.ttl = ttl
+        self.now = now
+        self.lock = threading.Lock()
+        # symbol -> (time, quote)
+        self.entries = {}
+        # symbol -> event set when its fetch is done
+        self.inflight = {}
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    def get_many(self, symbols):
+        found = {}
+        fetch = []
+        waiting = {}
+        with self.lock:
+            now = self.now()
+            for symbol in symbols:
+                entry = self.entries.get(symbol)
+                if entry and now - entry[0] <= self.ttl:
+                    found[symbol] = entry[1]
+                elif symbol in self.inflight:
+                    waiting[symbol] = self.inflight[symbol]
+                else:
+                    self.inflight[symbol] = threading.Event()
+                    fetch.append(symbol)
+            hits, misses, coalesced = len(found), len(fetch), len(waiting)
+            self.hits += hits
+            self.misses += misses
+            self.coalesced += coalesced
+        QUOTE_CACHE.labels('hit').inc(hits)
+        QUOTE_CACHE.labels('miss').inc(misses)
+        QUOTE_CACHE.labels('coalesced').inc(coalesced)
+        if fetch:
+            fetched = {}
+            try:
+                fetched = self.fetch_all(fetch)
+            finally:
+                with self.lock:
+                    now = self.now()
+                    for symbol in fetch:
+                        if symbol in fetched:
+                            self.entries[symbol] = (now, fetched[symbol])
+                        self.inflight.pop(symbol).set()
+            found.update(fetched)
+        for symbol, event in waiting.items():
+            event.wait()
+            with self.lock:
+                entry = self.entries.get(symbol)
+            if entry:
+                found[symbol] = entry[1]
+            else:
+                # the other thread's fetch failed, try again
+                found.update(self.get_many([symbol]))
+        return found
+
+    def stats(self):
+        with self.lock:
+            lookups = self.hits + self.misses + self.coalesced
+            return {'hits': self.hits, 'misses': self.misses, 'coalesced': self.coalesced,
+                    'hit_rate': round((self.hits + self.coalesced) / lookups, 3) if lookups else None}
+
+
+class MarketData:
+    """Market data shared by all the strategies run in one process. The
+    nasdaq screener, the listed stocks, daily bars and yahoo quotes are each
+    fetched once and kept for a while, so strategies getting stocks or
+    polling prices at the same time don't request the same data again.
+
+    screener_fn returns the nasdaq screener json, listed_fn the (symbol,
+    company) of every stock in nasdaq's symbol directory, api is used for daily bars
+    (any account's rest client, market data is the same for all) and
+    barstore, if set, keeps them locally. Quotes go through a QuoteCache,
+    quote_ttl is how many secs a quote is reused for, keep it below
+    PRICE_POLL_SECS so each poll gets a new price. now returns the current
+    time in secs."""
+
+    def __init__(self, fetcher, api, screener_fn, barstore=None, screener_ttl=600, quote_ttl=30,
+                 now=time.monotonic, listed_fn=None):
+        self.fetcher = fetcher
+        self.api = api
+        self.screener_fn = screener_fn
+        self.listed_fn = listed_fn
+        self.barstore = barstore
+        self.screener_ttl = screener_ttl
+        self.now = now
+        self.lock = threading.Lock()
+        self.screener_data = None
+        self.screener_time = None
+        self.listed_data = None
+        self.listed_time = None
+        # (symbols, days) -> (time, (opens, closes))
+        self.daily_cache = {}
+        self.quote_cache = QuoteCache(lambda symbols: self.fetcher.fetch_all(symbols), quote_ttl,
+                                      lambda: self.now())
+
+    def screener(self):
+        with self.lock:
+            if self.screener_time is None or self.now() - self.screener_time > self.screener_ttl:
+                data = self.refresh(self.screener_fn, self.screener_data, 'screener')
+                if data is not self.screener_data:
+                    self.screener_data = data
+                    self.screener_time = self.now()
+            return self.screener_data
+
+    def listed(self):
+        with self.lock:
+            if self.listed_time is None or self.now() - self.listed_time > self.screener_ttl:
+                data = self.refresh(self.listed_fn, self.listed_data, 'listed stocks')
+                if data is not self.listed_data:
+                    self.listed_data = data
+                    self.listed_time = self.now()
+            return self.listed_data
+
+    def refresh(self, fn, last, name):
+        # new data from fn, or the last data if getting it fails
+        try:
+            return fn()
+        except Exception as e:
+            if last is None:
+                raise
+            log.warning('getting {} failed ({}), using the last ones'.format(name, e))
+            return last
+
+    def daily(self, symbols, days):
+        # open and close prices of the last days daily bars as (symbols x
+        # days) arrays, nan where there's no bar
+        key = (tuple(symbols), days)
+        with self.lock:
+            cached = self.daily_cache.get(key)
+            if cached and self.now() - cached[0] <= self.screener_ttl:
+                return cached[1]
+            if self.barstore:
+                log.info('stored {} new bars'.format(self.barstore.update(self.api, list(symbols), days)))
+                arrays = self.barstore.arrays(list(symbols), days)
+            else:
+                barsets = get_barsets(self.api, list(symbols), 'day', limit=days)
+                arrays = bars_to_arrays(barsets, list(symbols), days)
+            self.daily_cache = {key: (self.now(), arrays)}
+            return arrays
+
+    def moved(self, symbols, days, calc=0):
+        # percent each symbol moved over the last days daily bars, nan if not found
+        opens, closes = self.daily(symbols, days)
+        return moved_percents(opens, closes, calc)
+
+    def quotes(self, symbols):
+        # dict of symbol -> yahoo fetcher.Quote (None if not found), only
+        # symbols without a quote from the last quote_ttl secs are fetched
+        return self.quote_cache.get_many(symbols)
+
+    def quote(self, symbol):
+        return self.quotes([symbol])[symbol]
@@ -0,0 +1,240 @@
+"""
+StockBot
+
+https://github.com/shirosaidev/stockbot
+
+Copyright (C) Chris Park (shirosai) 2021
+stockbot is released under the Apache 2.0 license. See
+LICENSE for the full license text.
+"""
+
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+# latency buckets in seconds, from a fast local call to a slow http request
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+
+class Counter:
+    """Counter that only goes up."""
+
+    kind = 'counter'
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.value = 0
+
+    def inc(self, amount=1):
+        with self.lock:
+            self.value += amount
+
+    def snapshot(self):
+        return self.value
+
+
+class Histogram:
+    """Histogram of observed values (secs for timers) with cumulative buckets
+    like prometheus."""
+
+    kind = 'histogram'
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.lock = threading.Lock()
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        i = bisect_left(self.buckets, value)
+        with self.lock:
+            self.counts[i] += 1
+            self.sum += value
+            self.count += 1
+
+    def time(self):
+        return Timer(self)
+
+    def snapshot(self):
+        with self.lock:
+            counts = list(self.counts)
+            total, count = self.sum, self.count
+        cumulative = []
+        n = 0
+        for le, c in zip(self.buckets + (float('inf'),), counts):
+            n += c
+            cumulative.append((le, n))
+        return {'count': count, 'sum': total, 'buckets': cumulative}
+
+
+class Timer:
+    """Context manager observing the secs spent in the block."""
+
+    __slots__ = ('histogram', 'start')
+
+    def __init__(self, histogram):
+        self.histogram = histogram
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.start)
+        return False
+
+
+class Metric:
+    """A named counter or histogram, with one child per set of label values."""
+
+    def __init__(self, name, help, cls, labelnames=(), **kwargs):
+        self.name = name
+        self.help = help
+        self.cls = cls
+        self.kind = cls.kind
+        self.labelnames = tuple(labelnames)
+        self.kwargs = kwargs
+        self.lock = threading.Lock()
+        self.children = {}
+        if not self.labelnames:
+            self.children[()] = cls(**kwargs)
+
+    def labels(self, *values):
+        child = self.children.get(values)
+        if child is None:
+            with self.lock:
+                child = self.children.setdefault(values, self.cls(**self.kwargs))
+        return child
+
+    # shortcuts for metrics without labels
+    def inc(self, amount=1):
+        self.children[()].inc(amount)
+
+    def observe(self, value):
+        self.children[()].observe(value)
+
+    def time(self):
+        return self.children[()].time()
+
+
+class Registry:
+    """All the bot's metrics, rendered as prometheus text or json."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.metrics = {}
+
+    def register(self, name, help, cls, labelnames=(), **kwargs):
+        with self.lock:
+            if name not in self.metrics:
+                self.metrics[name] = Metric(name, help, cls, labelnames, **kwargs)
+            return self.metrics[name]
+
+    def counter(self, name, help, labelnames=()):
+        return self.register(name, help, Counter, labelnames)
+
+    def histogram(self, name, help, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self.register(name, help, Histogram, labelnames, buckets=buckets)
+
+    def render(self):
+        # prometheus text exposition format
+        lines = []
+        for metric in list(self.metrics.values()):
+            lines.append('# HELP {} {}'.format(metric.name, metric.help))
+            lines.append('# TYPE {} {}'.format(metric.name, metric.kind))
+            for values, child in list(metric.children.items()):
+                labels = ','.join('{}="{}"'.format(k, v) for k, v in zip(metric.labelnames, values))
+                if metric.kind == 'counter':
+                    lines.append('{}{} {}'.format(metric.name, '{' + labels + '}' if labels else '', child.snapshot()))
+                    continue
+                snap = child.snapshot()
+                sep = ',' if labels else ''
+                for le, n in snap['buckets']:
+                    lines.append('{}_bucket{{{}{}le="{}"}} {}'.format(metric.name, labels, sep,
+                                                                     '+Inf' if le == float('inf') else le, n))
+                suffix = '{' + labels + '}' if labels else ''
+                lines.append('{}_sum{} {}'.format(metric.name, suffix, snap['sum']))
+                lines.append('{}_count{} {}'.format(metric.name, suffix, snap['count']))
+        return '\n'.join(lines) + '\n'
+
+    def to_dict(self):
+        out = {}
+        for metric in list(self.metrics.values()):
+            series = []
+            for values, child in list(metric.children.items()):
+                snap = child.snapshot()
+                if metric.kind == 'histogram':
+                    snap = {'count': snap['count'], 'sum': round(snap['sum'], 6),
+                            'avg': round(snap['sum'] / snap['count'], 6) if snap['count'] else None,
+                            'buckets': {('+Inf' if le == float('inf') else str(le)): n for le, n in snap['buckets']}}
+                series.append({'labels': dict(zip(metric.labelnames, values)), 'value': snap})
+            out[metric.name] = {'type': metric.kind, 'help': metric.help, 'series': series}
+        return out
+
+    def serve(self, port, host='127.0.0.1'):
+        # /metrics is prometheus text, /metrics.json is json
+        registry = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.startswith('/metrics.json'):
+                    body = json.dumps(registry.to_dict()).encode()
+                    ctype = 'application/json'
+                elif self.path.startswith('/metrics'):
+                    body = registry.render().encode()
+                    ctype = 'text/plain; version=0.0.4'
+                else:
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header('Content-Type', ctype)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=server.serve_forever, name='metrics', daemon=True).start()
+        return server
+
+    def dump_every(self, path, secs=60):
+        # write the metrics as json to path every secs
+        def dump():
+            while True:
+                time.sleep(secs)
+                tmp = path + '.tmp'
+                with open(tmp, 'w') as f:
+                    json.dump(self.to_dict(), f)
+                os.replace(tmp, path)
+
+        threading.Thread(target=dump, name='metrics-dump', daemon=True).start()
+
+
+# metrics shared by all the bot's modules
+REGISTRY = Registry()
+
+REQUEST_SECONDS = REGISTRY.histogram('stockbot_request_seconds', 'Latency of requests to outside services.',
+                                     ('service', 'op'))
+RETRIES = REGISTRY.counter('stockbot_retries_total', 'Requests retried after an error.', ('service', 'op'))
+ERRORS = REGISTRY.counter('stockbot_errors_total', 'Request errors.', ('service', 'op'))
+PHASE_SECONDS = REGISTRY.histogram('stockbot_phase_seconds', 'Time spent in each trading phase.', ('phase',),
+                                   buckets=(1, 10, 60, 300, 900, 1800, 3600, 7200, 14400, 28800))
+LOOP_SECONDS = REGISTRY.histogram('stockbot_loop_seconds', 'Time spent processing new prices in the buy/sell '
+                                  'loops, not counting waiting for them.', ('phase',))
+FEED_WAIT_SECONDS = REGISTRY.histogram('stockbot_feed_wait_seconds', 'Time spent waiting for new prices in the '
+                                       'buy/sell loops, polling and sleeping.', ('phase',),
+                                       buckets=DEFAULT_BUCKETS + (120, 300))
+QUOTE_CACHE = REGISTRY.counter('stockbot_quote_cache_total', 'Quote cache lookups by result, hit, miss or '
+                               'coalesced (waited for the fetch another thread was already making).', ('result',))
+BREAKER_OPENED = REGISTRY.counter('stockbot_breaker_opened_total', 'Times a host\'s circuit breaker opened after '
+                                  'failed requests.', ('host',))
+QUOTE_FALLBACKS = REGISTRY.counter('stockbot_quote_fallbacks_total', 'Quotes taken from alpaca because yahoo '
+                                   'failed.', ('result',))
+SLEEP_SECONDS = REGISTRY.counter('stockbot_sleep_seconds_total', 'Time spent sleeping.', ('where',))
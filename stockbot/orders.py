@@ -0,0 +1,331 @@
+"""
+StockBot
+
+https://github.com/shirosaidev/stockbot
+
+Copyright (C) Chris Park (shirosai) 2021
+stockbot is released under the Apache 2.0 license. See
+LICENSE for the full license text.
+"""
+
+import logging
+import random
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from requests import ConnectionError, HTTPError, Timeout
+
+from .metrics import ERRORS, REQUEST_SECONDS, RETRIES, SLEEP_SECONDS
+from .report import FillTotals
+
+
+log = logging.getLogger('stockbot.orders')
+
+# order statuses after which an order won't change anymore
+FINAL_STATUSES = {'filled', 'canceled', 'expired', 'rejected', 'replaced', 'done_for_day'}
+
+
+def order_field(order, key):
+    # orders from the rest api are entities, orders in trade updates are dicts
+    if isinstance(order, dict):
+        return order.get(key)
+    return getattr(order, key, None)
+
+
+def list_open_orders(api, page_size=500):
+    # every open order of the account, alpaca returns at most 500 at a time so
+    # they're paged through oldest first, backing off a sec like OrderLedger
+    import pandas as pd
+    one_sec = pd.Timedelta(seconds=1)
+    orders = {}
+    after = None
+    while True:
+        with REQUEST_SECONDS.labels('alpaca', 'list_orders').time():
+            page = api.list_orders(status='open', limit=page_size, after=after, direction='asc')
+        new = [order for order in page if order.id not in orders]
+        for order in new:
+            orders[order.id] = order
+        if len(page) < page_size or not new:
+            return list(orders.values())
+        after = (pd.Timestamp(page[-1].submitted_at) - one_sec).isoformat()
+
+
+class TrackedOrder:
+    """An order sent through the OrderExecutor, updated in place as it gets
+    submitted and filled."""
+
+    def __init__(self, symbol, qty, side, _type, time_in_force, client_order_id):
+        self.symbol = symbol
+        self.qty = qty
+        self.side = side
+        self.type = _type
+        self.time_in_force = time_in_force
+        self.client_order_id = client_order_id
+        self.id = None
+        self.status = None
+        self.filled_qty = None
+        self.filled_avg_price = None
+        self.error = None
+        self.future = None
+
+    @property
+    def done(self):
+        return self.status in FINAL_STATUSES or self.error is not None
+
+    @property
+    def fill_price(self):
+        # average fill price, None until (partially) filled
+        return float(self.filled_avg_price) if self.filled_avg_price else None
+
+    @property
+    def fill_qty(self):
+        # shares filled so far, less than qty if partially filled
+        return int(float(self.filled_qty)) if self.filled_qty else 0
+
+    def update(self, order):
+        self.id = order_field(order, 'id') or self.id
+        self.status = order_field(order, 'status') or self.status
+        self.filled_qty = order_field(order, 'filled_qty') or self.filled_qty
+        self.filled_avg_price = order_field(order, 'filled_avg_price') or self.filled_avg_price
+
+    def __repr__(self):
+        return '<TrackedOrder {} {} {} {} {}>'.format(self.side, self.qty, self.symbol, self.status or self.error,
+                                                     self.fill_price)
+
+
+class OrderExecutor:
+    """Submits orders on a pool of threads so a burst of orders doesn't wait
+    on one http round trip after another. Every order gets a client order id
+    that is reused when retrying, so a retry of an order that did get through
+    finds the existing order instead of placing it twice. Retries back off
+    exponentially up to max_backoff secs, with jitter, for at most
+    max_retries times. Fills come from Alpaca's trade updates stream when
+    it's started, wait() polls the rest api for orders without updates and
+    cancel() cancels the ones that didn't fill in time so their filled shares
+    won't change anymore. Orders are only tracked until they're done.
+    Client order ids start with prefix, or the prefix given to submit() so
+    strategies sharing an account can tell their orders apart."""
+
+    def __init__(self, api, max_workers=4, max_retries=5, backoff=0.5, max_backoff=30,
+                 prefix='stockbot', sleep=time.sleep):
+        self.api = api
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.prefix = prefix
+        self.sleep = sleep
+        self.pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='order')
+        self.orders = {}
+        self.cond = threading.Condition()
+        self.stream = None
+        self.thread = None
+
+    def submit(self, symbol, qty, side, _type='market', time_in_force='day', prefix=None):
+        client_order_id = '{}-{}-{}-{}'.format(prefix or self.prefix, side, symbol, uuid.uuid4().hex[:12])
+        order = TrackedOrder(symbol, qty, side, _type, time_in_force, client_order_id)
+        with self.cond:
+            self.orders[client_order_id] = order
+        order.future = self.pool.submit(self.send, order)
+        return order
+
+    def find(self, order):
+        # the order alpaca has for the client order id, None if it never got there
+        try:
+            with REQUEST_SECONDS.labels('alpaca', 'get_order').time():
+                return self.api.get_order_by_client_order_id(order.client_order_id)
+        except Exception:
+            return None
+
+    def send(self, order):
+        from alpaca_trade_api.rest import APIError
+        for attempt in range(self.max_retries + 1):
+            try:
+                with REQUEST_SECONDS.labels('alpaca', 'submit_order').time():
+                    result = self.api.submit_order(
+                        symbol=order.symbol,
+                        qty=order.qty,
+                        side=order.side,
+                        type=order.type,
+                        time_in_force=order.time_in_force,
+                        client_order_id=order.client_order_id
+                    )
+                self.updated(order, result)
+                return order
+            except APIError as e:
+                error = e
+                ERRORS.labels('alpaca', 'submit_order').inc()
+                existing = self.find(order)
+                if existing is not None:
+                    # an earlier try got through
+                    self.updated(order, existing)
+                    return order
+                # other client errors (no buying power, not tradable...) won't go away by retrying
+                if e.status_code is not None and 400 <= e.status_code < 500 and e.status_code != 429:
+                    break
+            except (ConnectionError, HTTPError, Timeout) as e:
+                error = e
+                ERRORS.labels('alpaca', 'submit_order').inc()
+                if attempt:
+                    existing = self.find(order)
+                    if existing is not None:
+                        self.updated(order, existing)
+                        return order
+            if attempt < self.max_retries:
+                delay = min(self.max_backoff, self.backoff * 2 ** attempt)
+                delay = random.uniform(delay / 2, delay)
+                log.warning('ORDER ERROR: {} {} {}: {}, retrying in {}s'.format(order.side, order.qty, order.symbol,
+                                                                                error, round(delay, 2)),
+                            extra={'symbol': order.symbol, 'client_order_id': order.client_order_id})
+                RETRIES.labels('alpaca', 'submit_order').inc()
+                SLEEP_SECONDS.labels('retry').inc(delay)
+                self.sleep(delay)
+        log.error('ORDER FAILED: {} {} {}: {}'.format(order.side, order.qty, order.symbol, error),
+                  extra={'symbol': order.symbol, 'client_order_id': order.client_order_id})
+        with self.cond:
+            order.error = error
+            self.orders.pop(order.client_order_id, None)
+            self.cond.notify_all()
+        return order
+
+    def updated(self, order, result):
+        with self.cond:
+            if result is not None:
+                order.update(result)
+            if order.done:
+                # no more trade updates to look it up for
+                self.orders.pop(order.client_order_id, None)
+            self.cond.notify_all()
+
+    async def on_trade_update(self, data):
+        order = self.orders.get(order_field(data.order, 'client_order_id'))
+        if order is not None:
+            self.updated(order, data.order)
+
+    def start_stream(self, key_id, secret_key, base_url):
+        from alpaca_trade_api.stream import Stream
+        self.stream = Stream(key_id, secret_key, base_url=base_url)
+        self.stream.subscribe_trade_updates(self.on_trade_update)
+        self.thread = threading.Thread(target=self.stream.run, daemon=True)
+        self.thread.start()
+
+    def wait(self, orders, timeout=60, poll_interval=5):
+        # wait until the orders are done or timeout secs, returns the ones not done
+        deadline = time.monotonic() + timeout
+        next_poll = time.monotonic() + poll_interval
+        while True:
+            with self.cond:
+                pending = [order for order in orders if not order.done]
+                remaining = deadline - time.monotonic()
+                if not pending or remaining <= 0:
+                    return pending
+                self.cond.wait(min(remaining, max(next_poll - time.monotonic(), 0)))
+            if time.monotonic() >= next_poll:
+                # no trade update for these yet, ask the rest api
+                for order in pending:
+                    if order.id is not None and not order.done:
+                        self.updated(order, self.find(order))
+                next_poll = time.monotonic() + poll_interval
+
+    def cancel(self, orders, timeout=30, poll_interval=1):
+        # cancel the orders not done yet (not or partially filled) and wait
+        # for them to be canceled or filled, so their filled shares are final,
+        # returns the ones still not done
+        for order in orders:
+            if order.done:
+                continue
+            if order.id is None and order.future is not None and order.future.cancel():
+                # never sent
+                with self.cond:
+                    order.status = 'canceled'
+                    self.orders.pop(order.client_order_id, None)
+                continue
+            if order.id is None:
+                # still being sent (or retried), cancel what alpaca has for it
+                self.updated(order, self.find(order))
+                if order.id is None or order.done:
+                    continue
+            try:
+                with REQUEST_SECONDS.labels('alpaca', 'cancel_order').time():
+                    self.api.cancel_order(order.id)
+            except Exception as e:
+                # already filled or canceled, the final status is read below
+                ERRORS.labels('alpaca', 'cancel_order').inc()
+                log.warning('ORDER CANCEL ERROR: {} {} {}: {}'.format(order.side, order.qty, order.symbol, e),
+                            extra={'symbol': order.symbol, 'client_order_id': order.client_order_id})
+            self.updated(order, self.find(order))
+        pending = self.wait(orders, timeout=timeout, poll_interval=poll_interval)
+        for order in pending:
+            log.error('ORDER NOT CANCELED: {} {} {} ({} filled so far)'.format(order.side, order.qty, order.symbol,
+                                                                               order.fill_qty),
+                      extra={'symbol': order.symbol, 'client_order_id': order.client_order_id})
+        return pending
+
+    def close(self):
+        if self.stream:
+            try:
+                self.stream.stop()
+            except Exception:
+                pass
+            self.stream = None
+        self.pool.shutdown(wait=False)
+
+
+class OrderLedger:
+    """Per symbol buy/sell totals of the account's closed orders since a
+    time, for the end of day report. Each update() pages through only the
+    orders closed since the last one (oldest first, page_size at a time) so
+    it's cheap to call as often as needed and never truncated. The cursor
+    doesn't move past orders still open, they're counted once they close.
+    With a prefix only orders whose client order id starts with it (the
+    orders of one strategy) are counted."""
+
+    def __init__(self, api, after, page_size=500, prefix=None):
+        import pandas as pd
+        self.api = api
+        self.cursor = pd.Timestamp(after)
+        if self.cursor.tzinfo is None:
+            self.cursor = self.cursor.tz_localize('UTC')
+        self.page_size = page_size
+        self.prefix = prefix
+        self.seen = set()
+        self.totals = FillTotals()
+
+    def list_orders(self, status, after):
+        with REQUEST_SECONDS.labels('alpaca', 'list_orders').time():
+            return self.api.list_orders(status=status, limit=self.page_size, after=after.isoformat(),
+                                        direction='asc')
+
+    def update(self):
+        # returns the number of new closed orders counted
+        import pandas as pd
+        one_sec = pd.Timedelta(seconds=1)
+        open_orders = self.list_orders('open', self.cursor)
+        cursor = self.cursor
+        added = 0
+        while True:
+            page = self.list_orders('closed', cursor)
+            for order in page:
+                if order.id not in self.seen:
+                    self.seen.add(order.id)
+                    if self.prefix and not (order.client_order_id or '').startswith(self.prefix):
+                        continue
+                    self.totals.add(order)
+                    added += 1
+            if not page:
+                break
+            # after is exclusive, back off a sec so orders submitted in the
+            # same sec as the page's last one aren't skipped
+            next_cursor = pd.Timestamp(page[-1].submitted_at) - one_sec
+            if len(page) < self.page_size or next_cursor <= cursor:
+                cursor = max(cursor, next_cursor)
+                break
+            cursor = next_cursor
+        if open_orders:
+            cursor = min(cursor, min(pd.Timestamp(order.submitted_at) for order in open_orders) - one_sec)
+        self.cursor = max(self.cursor, cursor)
+        return added
+
+    def change_percents(self):
+        return self.totals.change_percents()
@@ -0,0 +1,125 @@
+"""
+StockBot
+
+https://github.com/shirosaidev/stockbot
+
+Copyright (C) Chris Park (shirosai) 2021
+stockbot is released under the Apache 2.0 license. See
+LICENSE for the full license text.
+"""
+
+from .indicators import Indicators
+
+
+class SymbolState:
+    """Buy/sell state and price indicators of one symbol picked for the day."""
+
+    __slots__ = ('symbol', 'stock', 'indicators', 'qty', 'buy_price', 'buy_time',
+                 'sell_price', 'sell_time', 'buy_order', 'sell_order')
+
+    def __init__(self, symbol, stock=None, window=15):
+        self.symbol = symbol
+        self.stock = stock
+        # rolling indicators of the prices checked, window is how many of
+        # the latest prices the up/down counts are over
+        self.indicators = Indicators(window)
+        # shares ordered, then held once the buy order filled
+        self.qty = None
+        self.buy_price = None
+        self.buy_time = None
+        self.sell_price = None
+        self.sell_time = None
+        # orders.TrackedOrder of the buy/sell
+        self.buy_order = None
+        self.sell_order = None
+
+    @property
+    def bought(self):
+        return self.buy_price is not None
+
+    @property
+    def sold(self):
+        return self.sell_price is not None
+
+    def add_price(self, price, volume=None, value=None):
+        # returns the indicators updated with price and the volume (and its $
+        # value) traded since the last price
+        self.indicators.update(price, volume, value)
+        return self.indicators
+
+    def reset_prices(self):
+        self.indicators.reset()
+
+
+class PositionBook:
+    """Per-symbol state of the day's picks keyed by symbol, with running
+    counts of bought and sold symbols. window is the TREND_WINDOW of the
+    symbols' indicators."""
+
+    def __init__(self, stocks=(), window=15):
+        self.states = {}
+        self.window = window
+        self.num_bought = 0
+        self.num_sold = 0
+        for stock in stocks:
+            self.add(stock)
+
+    def add(self, stock):
+        state = self.states[stock['symbol']] = SymbolState(stock['symbol'], stock, self.window)
+        return state
+
+    def carry_over(self, book):
+        # keep holding the stocks of an earlier book that weren't sold
+        for state in book.bought():
+            if not state.sold and state.symbol not in self.states:
+                self.states[state.symbol] = state
+                self.num_bought += 1
+
+    def get(self, symbol):
+        return self.states.get(symbol)
+
+    def __iter__(self):
+        return iter(self.states.values())
+
+    def __len__(self):
+        return len(self.states)
+
+    def mark_bought(self, state, price, buy_time, qty):
+        if not state.bought:
+            self.num_bought += 1
+        state.qty = qty
+        state.buy_price = price
+        state.buy_time = buy_time
+
+    def mark_sold(self, state, price, sell_time):
+        if not state.sold:
+            self.num_sold += 1
+        state.sell_price = price
+        state.sell_time = sell_time
+
+    def unmark_bought(self, state):
+        # buy order didn't fill
+        if state.bought:
+            self.num_bought -= 1
+        state.qty = None
+        state.buy_price = None
+        state.buy_time = None
+
+    def unmark_sold(self, state):
+        # sell order didn't fill, still holding the stock
+        if state.sold:
+            self.num_sold -= 1
+        state.sell_price = None
+        state.sell_time = None
+
+    def bought(self):
+        return [state for state in self.states.values() if state.bought]
+
+    def not_bought_symbols(self):
+        return [state.symbol for state in self.states.values() if not state.bought]
+
+    def unsold_symbols(self):
+        return [state.symbol for state in self.states.values() if state.bought and not state.sold]
+
+    def all_sold(self):
+        return self.num_sold == self.num_bought
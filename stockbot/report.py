@@ -0,0 +1,112 @@
+"""
+StockBot
+
+https://github.com/shirosaidev/stockbot
+
+Copyright (C) Chris Park (shirosai) 2021
+stockbot is released under the Apache 2.0 license. See
+LICENSE for the full license text.
+"""
+
+import csv
+
+
+# header of the trade rows in the daily csv
+# profit is $ per share, qty is the shares filled
+CSV_HEADER = ['symbol', 'company', 'buy', 'buy time', 'sell', 'sell time', 'profit', 'percent', 'vol sod',
+              'vol sell', 'qty']
+
+
+class FillTotals:
+    """Running total buy and sell $ per symbol of filled orders."""
+
+    def __init__(self):
+        self.totals = {}
+
+    def add(self, order):
+        if not order.filled_qty or order.filled_avg_price is None:
+            return
+        totals = self.totals.setdefault(order.symbol, {'buy': 0, 'sell': 0})
+        if order.side in totals:
+            totals[order.side] += int(order.filled_qty) * float(order.filled_avg_price)
+
+    def change_percents(self):
+        # total buy and sell $ and percent change per symbol
+        todays_buy_sell = {}
+        for ticker, totals in self.totals.items():
+            change = 0
+            if totals['buy']:
+                change = round((totals['sell'] - totals['buy']) / totals['buy'] * 100, 2)
+            todays_buy_sell[ticker] = {'buy': round(totals['buy'], 2), 'sell': round(totals['sell'], 2),
+                                       'change': change}
+        return todays_buy_sell
+
+
+def change_percents(orders):
+    # total buy and sell $ and percent change per symbol from filled orders
+    totals = FillTotals()
+    for order in orders:
+        totals.add(order)
+    return totals.change_percents()
+
+
+def summarize(todays_buy_sell, verbose=True):
+    # profit/loss summary of the day's buy/sells, printed if verbose
+    if verbose:
+        print(todays_buy_sell) 
+        print('********************')
+        print('TODAY\'S PROFIT/LOSS')
+        print('********************')
+    total_profit = 0
+    total_buy = 0
+    total_sell = 0
+    n = 0
+    rows = []
+    for k, v in todays_buy_sell.items():
+        change_str = '{}{}'.format('+' if v['change']>0 else '', v['change'])
+        if verbose:
+            print('{} {}%'.format(k, change_str))
+        rows.append([k, v['buy'], v['sell'], v['change']])
+        total_profit += v['change']
+        total_buy += v['buy']
+        total_sell += v['sell']
+        n += 1
+    summary = {
+        'rows': rows,
+        'sum': '{}{}%'.format('+' if total_profit>0 else '', round(total_profit, 2)),
+        'avg': '{}{}%'.format('+' if total_profit>0 else '', round(total_profit/n, 2) if n else 0),
+        'buy': '${}'.format(round(total_buy, 2)),
+        'sell': '${}'.format(round(total_sell, 2)),
+        'profit': '${}'.format(round(total_sell - total_buy, 2)),
+        'total_buy': total_buy,
+        'total_sell': total_sell
+        }
+    if verbose:
+        print('-------------------')
+        print('*** SUM {}'.format(summary['sum']))
+        print('*** AVG {}'.format(summary['avg']))
+        print('*** BUY {}'.format(summary['buy']))
+        print('*** SELL {}'.format(summary['sell']))
+        print('*** PROFIT/LOSS {}'.format(summary['profit']))
+    return summary
+
+
+def write_csv(csv_file, stock_data_csv, summary, percent, equity):
+    # trade rows, then per symbol buy/sell/change and the day's totals
+    with open(csv_file, 'w') as f:
+        writer = csv.writer(f)
+        for row in stock_data_csv:
+            writer.writerow(row)
+        writer.writerow([])
+        writer.writerow(['symbol', 'buy', 'sell', 'change'])
+        for row in summary['rows']:
+            writer.writerow(row)
+        writer.writerow([])
+        writer.writerow(["PERCENT", percent])
+        writer.writerow(["EQUITY", equity])
+        writer.writerow([])
+        writer.writerow(["SUM", summary['sum']])
+        writer.writerow(["AVG", summary['avg']])
+        writer.writerow([])
+        writer.writerow(["BUY", summary['buy']])
+        writer.writerow(["SELL", summary['sell']])
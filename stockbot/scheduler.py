@@ -0,0 +1,198 @@
+"""
+StockBot
+
+https://github.com/shirosaidev/stockbot
+
+Copyright (C) Chris Park (shirosai) 2021
+stockbot is released under the Apache 2.0 license. See
+LICENSE for the full license text.
+"""
+
+import heapq
+import logging
+import threading
+import time
+from collections import namedtuple
+from datetime import date, datetime, timedelta
+from datetime import time as dtime
+
+from .metrics import ERRORS, REQUEST_SECONDS, SLEEP_SECONDS
+
+
+log = logging.getLogger('stockbot.scheduler')
+
+
+# a trading phase of the day, end is None for phases that run once at start
+Phase = namedtuple('Phase', 'name start end')
+
+# normal market close, used to spot early close days in the calendar
+MARKET_CLOSE = dtime(16, 0)
+
+
+class Clock:
+    """Wall clock in the market's timezone, the scheduler and the trading
+    loops get the time and sleep through this."""
+
+    def __init__(self, tz):
+        self.tz = tz
+
+    def now(self):
+        return datetime.now(tz=self.tz)
+
+    def sleep(self, secs):
+        time.sleep(secs)
+
+    def wait(self, cond, secs):
+        # wait on the (held) condition until notified or secs are up
+        return cond.wait(timeout=secs)
+
+
+class VirtualClock(Clock):
+    """Simulated clock for replaying days against the stand-in exchange
+    (simulate.py), starting at start. With no speed the time only moves when
+    slept on, so a day runs as fast as the bot can go, this is for a single
+    strategy. With a speed the time runs that many times faster than the
+    wall clock and can be shared by several strategy threads."""
+
+    def __init__(self, tz, start, speed=None):
+        self.tz = tz
+        self.start = start
+        self.speed = speed
+        self.offset = 0.0
+        self.started = time.monotonic()
+        self.lock = threading.Lock()
+
+    def now(self):
+        if self.speed:
+            secs = (time.monotonic() - self.started) * self.speed
+        else:
+            with self.lock:
+                secs = self.offset
+        return self.tz.normalize(self.start + timedelta(seconds=secs))
+
+    def sleep(self, secs):
+        if self.speed:
+            time.sleep(secs / self.speed)
+        else:
+            with self.lock:
+                self.offset += secs
+
+    def wait(self, cond, secs):
+        if self.speed:
+            return cond.wait(timeout=secs / self.speed)
+        # jump over the wait, whatever was notified in the meantime is
+        # picked up by the caller after
+        self.sleep(secs)
+        return False
+
+
+def parse_time(hhmm):
+    # "9:30" -> time(9, 30)
+    h, m = hhmm.split(':')
+    return dtime(int(h), int(m))
+
+
+def to_time(value):
+    # calendar open/close times come back as time or as "HH:MM" strings
+    # depending on the alpaca_trade_api version
+    if isinstance(value, dtime):
+        return value
+    if hasattr(value, 'time'):
+        return value.time()
+    return parse_time(str(value)[:5])
+
+
+class MarketScheduler:
+    """Yields the bot's trading phases in time order, sleeping until each
+    one starts. Phase times are laid out on the trading days from the
+    Alpaca market calendar, so weekends and holidays are skipped and on
+    early close days any phase after the close is moved to
+    early_close_margin minutes before it.
+
+    times is a dict of "H:MM" strings (EST) with the keys get_stocks,
+    buy_start, buy_end, sell_start and sell_end. get_stocks and buy only run
+    on buy_days, sell and report run every trading day."""
+
+    def __init__(self, api, times, buy_days, clock, lookahead_days=14,
+                 early_close_margin=5, report_delay=5, midday='13:00'):
+        self.api = api
+        self.times = {k: parse_time(v) for k, v in times.items()}
+        self.buy_days = buy_days
+        self.clock = clock
+        self.lookahead_days = lookahead_days
+        self.early_close_margin = timedelta(minutes=early_close_margin)
+        self.report_delay = timedelta(minutes=report_delay)
+        self.midday = parse_time(midday)
+        self.heap = []
+        self.seq = 0
+        self.scheduled_until = None
+
+    def get_calendar(self, start, end):
+        while True:
+            try:
+                with REQUEST_SECONDS.labels('alpaca', 'get_calendar').time():
+                    return self.api.get_calendar(start=start.isoformat(), end=end.isoformat())
+            except Exception as e:
+                log.warning('CALENDAR ERROR: {}'.format(e))
+                ERRORS.labels('alpaca', 'get_calendar').inc()
+                self.clock.sleep(60)
+
+    def at(self, day, t, close):
+        when = self.clock.tz.localize(datetime.combine(day, t))
+        if close < MARKET_CLOSE:
+            latest = self.clock.tz.localize(datetime.combine(day, close)) - self.early_close_margin
+            when = min(when, latest)
+        return when
+
+    def day_phases(self, day, close):
+        t = self.times
+        phases = []
+        if day.weekday() in self.buy_days:
+            phases.append(Phase('get_stocks', self.at(day, t['get_stocks'], close), None))
+            phases.append(Phase('buy', self.at(day, t['buy_start'], close), self.at(day, t['buy_end'], close)))
+        sell_end = self.at(day, t['sell_end'], close)
+        phases.append(Phase('sell', self.at(day, t['sell_start'], close), sell_end))
+        phases.append(Phase('report', sell_end + self.report_delay, None))
+        return phases
+
+    def midday_time(self, phase):
+        # when the sell phase switches from selling on gains to selling
+        # when prices start going down, 1:00pm EST or sell end if earlier
+        return min(phase.start.replace(hour=self.midday.hour, minute=self.midday.minute), phase.end)
+
+    def fill(self):
+        start = self.scheduled_until or self.clock.now().date()
+        end = start + timedelta(days=self.lookahead_days)
+        now = self.clock.now()
+        for cal in self.get_calendar(start, end):
+            day = cal.date.date() if hasattr(cal.date, 'date') else date.fromisoformat(str(cal.date)[:10])
+            for phase in self.day_phases(day, to_time(cal.close)):
+                # skip phases that are already over
+                if (phase.end or phase.start) <= now:
+                    continue
+                heapq.heappush(self.heap, (phase.start, self.seq, phase))
+                self.seq += 1
+        self.scheduled_until = end + timedelta(days=1)
+
+    def next_phase(self):
+        while not self.heap:
+            self.fill()
+        return heapq.heappop(self.heap)[2]
+
+    def wait_until(self, when):
+        while True:
+            secs = (when - self.clock.now()).total_seconds()
+            if secs <= 0:
+                return
+            # sleep in chunks so a suspended machine or clock change doesn't oversleep
+            SLEEP_SECONDS.labels('scheduler').inc(min(secs, 3600))
+            self.clock.sleep(min(secs, 3600))
+
+    def __iter__(self):
+        while True:
+            phase = self.next_phase()
+            if phase.start > self.clock.now():
+                log.info('{} $ zzz... until {} at {}'.format(self.clock.now().isoformat(), phase.name,
+                                                            phase.start.isoformat()), extra={'phase': phase.name})
+            self.wait_until(phase.start)
+            yield phase
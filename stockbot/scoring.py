@@ -0,0 +1,121 @@
+"""
+StockBot
+
+https://github.com/shirosaidev/stockbot
+
+Copyright (C) Chris Park (shirosai) 2021
+stockbot is released under the Apache 2.0 license. See
+LICENSE for the full license text.
+"""
+
+import numpy as np
+
+
+# trade algo name -> function(candidates, params) returning a score per
+# candidate, higher is better and nan can't be picked
+ALGOS = {}
+
+
+def algo(name):
+    # decorator registering a trade algo, e.g.
+    #
+    # @algo('highvolume')
+    # def high_volume(candidates, params):
+    #     return candidates['volume']
+    def register(fn):
+        ALGOS[name] = fn
+        return fn
+    return register
+
+
+class Candidates:
+    """Columnar table of candidate stocks. Columns are numpy arrays with a
+    value per symbol (or symbols x days when backtesting), given as arrays or
+    as functions that are called the first time the column is used, so
+    columns an algo doesn't use are never computed.
+
+    Columns filled in by stockbot and backtest.py: price, low, high, volume
+    and moved (percent moved over the last MOVED_DAYS)."""
+
+    def __init__(self, symbols, **columns):
+        self.symbols = symbols
+        self.columns = columns
+
+    def __getitem__(self, name):
+        value = self.columns[name]
+        if callable(value):
+            value = self.columns[name] = value()
+        return value
+
+    def __contains__(self, name):
+        return name in self.columns
+
+    def __len__(self):
+        return len(self.symbols)
+
+
+@algo('moved')
+def moved(candidates, params):
+    # stocks that moved the most over the last MOVED_DAYS
+    return candidates['moved']
+
+
+@algo('lowtomarket')
+def low_to_market(candidates, params):
+    return np.round(candidates['price'] - candidates['low'], 3)
+
+
+@algo('lowtohigh')
+def low_to_high(candidates, params):
+    return np.round(candidates['high'] - candidates['low'], 3)
+
+
+def score(candidates, tradealgo, params):
+    # scores of the candidates for the trade algo, nan for stocks priced
+    # outside of STOCK_MIN_PRICE - STOCK_MAX_PRICE
+    try:
+        fn = ALGOS[tradealgo]
+    except KeyError:
+        raise ValueError('unknown trade algo {}'.format(tradealgo))
+    scores = np.array(fn(candidates, params), dtype=float)
+    price = candidates['price']
+    with np.errstate(invalid='ignore'):
+        price_ok = (price >= params['STOCK_MIN_PRICE']) & (price <= params['STOCK_MAX_PRICE'])
+    scores[~price_ok] = np.nan
+    return scores
+
+
+def top_k(scores, k):
+    # indices of the k best scores, best first, without sorting all of them.
+    # for scores per symbol the result has up to k indices, nan scores are
+    # never picked and ties keep symbol order like a stable sort would. for
+    # (symbols x days) scores it's (k x days), -1 where there are fewer than
+    # k stocks to pick from
+    if scores.ndim == 1:
+        valid = np.flatnonzero(~np.isnan(scores))
+        k = min(k, len(valid))
+        if k == 0:
+            return valid[:0]
+        values = scores[valid]
+        if k < len(valid):
+            # every score at least as good as the kth best, more than k if tied
+            kth = values[np.argpartition(-values, k - 1)[k - 1]]
+            keep = values >= kth
+            valid, values = valid[keep], values[keep]
+        return valid[np.argsort(-values, kind='stable')[:k]]
+    k = min(k, scores.shape[0])
+    if k == 0:
+        return np.empty((0, scores.shape[1]), int)
+    filled = np.where(np.isnan(scores), -np.inf, scores)
+    # every score better than each day's kth best, then the first of the ones
+    # tied with it in symbol order, k per day
+    kth = -np.partition(-filled, k - 1, axis=0)[k - 1]
+    better = filled > kth
+    tied = filled == kth
+    keep = better | (tied & (np.cumsum(tied, axis=0) <= k - better.sum(axis=0)))
+    picks = np.nonzero(keep.T)[1].reshape(scores.shape[1], k).T
+    values = np.take_along_axis(filled, picks, axis=0)
+    order = np.argsort(-values, axis=0, kind='stable')
+    picks = np.take_along_axis(picks, order, axis=0)
+    picks[np.take_along_axis(values, order, axis=0) == -np.inf] = -1
+    return picks
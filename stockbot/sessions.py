@@ -0,0 +1,207 @@
+"""
+StockBot
+
+https://github.com/shirosaidev/stockbot
+
+Copyright (C) Chris Park (shirosai) 2021
+stockbot is released under the Apache 2.0 license. See
+LICENSE for the full license text.
+"""
+
+import logging
+import random
+import threading
+import time
+import requests
+from requests import RequestException
+from requests.adapters import HTTPAdapter
+from urllib.parse import urlparse
+# gzip,deflate plus br when a brotli decoder (brotli or brotlicffi) is installed
+from urllib3.util.request import ACCEPT_ENCODING
+
+from .metrics import BREAKER_OPENED, ERRORS, REQUEST_SECONDS, RETRIES, SLEEP_SECONDS
+
+
+log = logging.getLogger('stockbot.sessions')
+
+
+BROWSER_HEADERS = {
+    'method': 'GET',
+    'scheme': 'https',
+    'accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,image/apng,*/*;q=0.8,application/signed-exchange;v=b3;q=0.9',
+    'accept-encoding': ACCEPT_ENCODING,
+    'accept-laguage': 'en-US,en;q=0.9',
+    'cache-control': 'max-age=0',
+    'sec-fetch-dest': 'document',
+    'sec-fetch-site': 'none',
+    'sec-fetch-user': '?1',
+    'sec-fetch-mode': 'navigate',
+    'upgrade-insecure-requests': '1',
+    'user-agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_14_6) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/80.0.3987.149 Safari/537.36'
+    }
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of sending a request to a host whose circuit breaker is
+    open."""
+
+
+class CircuitBreaker:
+    """Fails fast while a host is down. After failures failed requests in a
+    row the breaker opens and requests fail right away for reset_secs, then
+    a single trial request is let through (half open) which closes the
+    breaker again if it works or keeps it open for another reset_secs."""
+
+    def __init__(self, name, failures=5, reset_secs=60, now=time.monotonic):
+        self.name = name
+        self.failures = failures
+        self.reset_secs = reset_secs
+        self.now = now
+        self.count = 0
+        self.opened = None
+        self.trial = False
+        self.lock = threading.Lock()
+
+    @property
+    def state(self):
+        with self.lock:
+            if self.opened is None:
+                return 'closed'
+            return 'half_open' if self.trial or self.now() - self.opened >= self.reset_secs else 'open'
+
+    def allow(self):
+        with self.lock:
+            if self.opened is None:
+                return True
+            if not self.trial and self.now() - self.opened >= self.reset_secs:
+                self.trial = True
+                return True
+            return False
+
+    def success(self):
+        with self.lock:
+            if self.opened is not None:
+                log.info('{} is back, circuit breaker closed'.format(self.name), extra={'host': self.name})
+            self.count = 0
+            self.opened = None
+            self.trial = False
+
+    def failure(self):
+        with self.lock:
+            self.count += 1
+            if self.trial or (self.opened is None and self.count >= self.failures):
+                if not self.trial:
+                    log.warning('{} failed {} times in a row, circuit breaker open for {}s'.format(
+                        self.name, self.count, self.reset_secs), extra={'host': self.name})
+                    BREAKER_OPENED.labels(self.name).inc()
+                self.opened = self.now()
+                self.trial = False
+
+
+def backoff_delay(attempt, backoff, max_backoff):
+    # exponential backoff with full jitter, so threads retrying together
+    # don't hit the host again at the same time
+    return random.uniform(0, min(max_backoff, backoff * 2 ** attempt))
+
+
+class SessionPool:
+    """Keep-alive requests sessions, one per host, with the browser headers
+    built once per session instead of on every request. request() adds
+    retries and a circuit breaker per host on top of the connect/read
+    timeouts every request has."""
+
+    def __init__(self, connect_timeout=3.05, read_timeout=10, pool_maxsize=10, max_retries=3, backoff=0.5,
+                 max_backoff=8, breaker_failures=5, breaker_reset_secs=60, sleep=time.sleep):
+        self.timeout = (connect_timeout, read_timeout)
+        self.pool_maxsize = pool_maxsize
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.breaker_failures = breaker_failures
+        self.breaker_reset_secs = breaker_reset_secs
+        self.sleep = sleep
+        self.sessions = {}
+        self.breakers = {}
+        self.lock = threading.Lock()
+
+    def session(self, host):
+        with self.lock:
+            session = self.sessions.get(host)
+            if session is None:
+                session = requests.Session()
+                # a single pool per session since each session only talks to one host,
+                # sized so concurrent fetcher threads don't discard connections
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_maxsize)
+                session.mount('https://', adapter)
+                session.mount('http://', adapter)
+                session.headers.clear()
+                session.headers.update(BROWSER_HEADERS)
+                session.headers['authority'] = host
+                self.sessions[host] = session
+            return session
+
+    def get(self, url, headers=None, **kwargs):
+        kwargs.setdefault('timeout', self.timeout)
+        return self.session(urlparse(url).netloc).get(url, headers=headers, **kwargs)
+
+    def breaker(self, host):
+        with self.lock:
+            breaker = self.breakers.get(host)
+            if breaker is None:
+                breaker = self.breakers[host] = CircuitBreaker(host, self.breaker_failures, self.breaker_reset_secs)
+            return breaker
+
+    def request(self, url, service, op, headers=None, wait=None):
+        # get url, retrying connection errors, timeouts and 5xx/429 responses
+        # up to max_retries times. wait, if given, is called before each try
+        # (a rate limiter). raises the last error when out of retries, or
+        # CircuitOpenError without sending anything while the host is down
+        host = urlparse(url).netloc
+        breaker = self.breaker(host)
+        for attempt in range(self.max_retries + 1):
+            if not breaker.allow():
+                raise CircuitOpenError('{} circuit breaker is open'.format(host))
+            if wait:
+                wait()
+            try:
+                with REQUEST_SECONDS.labels(service, op).time():
+                    r = self.get(url, headers=headers)
+                if r.status_code >= 500 or r.status_code == 429:
+                    r.raise_for_status()
+            except RequestException as e:
+                breaker.failure()
+                ERRORS.labels(service, op).inc()
+                if attempt == self.max_retries:
+                    raise
+                delay = backoff_delay(attempt, self.backoff, self.max_backoff)
+                log.warning('CONNECTION ERROR: {}, retrying in {}s'.format(e, round(delay, 2)),
+                            extra={'service': service})
+                RETRIES.labels(service, op).inc()
+                SLEEP_SECONDS.labels('retry').inc(delay)
+                self.sleep(delay)
+                continue
+            breaker.success()
+            return r
+
+    def stats(self):
+        # number of requests and connections opened/reused per host
+        stats = {}
+        with self.lock:
+            sessions = list(self.sessions.items())
+        for host, session in sessions:
+            requests_made = opened = 0
+            for adapter in set(session.adapters.values()):
+                for key in adapter.poolmanager.pools.keys():
+                    pool = adapter.poolmanager.pools.get(key)
+                    if pool is not None:
+                        requests_made += pool.num_requests
+                        opened += pool.num_connections
+            stats[host] = {'requests': requests_made, 'opened': opened,
+                           'reused': max(requests_made - opened, 0)}
+        return stats
+
+    def close(self):
+        with self.lock:
+            for session in self.sessions.values():
+                session.close()
+            self.sessions.clear()
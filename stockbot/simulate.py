@@ -0,0 +1,152 @@
+"""
+StockBot
+
+https://github.com/shirosaidev/stockbot
+
+Copyright (C) Chris Park (shirosai) 2021
+stockbot is released under the Apache 2.0 license. See
+LICENSE for the full license text.
+"""
+
+import optparse
+import os
+import time
+from concurrent.futures import wait
+from datetime import datetime, timedelta
+
+import numpy as np
+from pytz import timezone
+
+from . import standin
+from .config import Config
+from .scheduler import VirtualClock
+
+
+# runs stockbot against the local stand-in exchange (standin.py) on a virtual
+# clock, so whole trading days replay in seconds. the exchange answers the
+# yahoo quotes, nasdaq screener/symbol directory and alpaca orders, positions,
+# calendar and daily bars requests with prices from random walks (or recorded
+# bars from a backtest.py data directory) at the clock's time, optionally with
+# added latency and errors for load and failure testing. runs the live code
+# paths (get stocks, buy/sell loops, orders, report) unlike backtest.py
+#
+# orders are tracked by polling (ORDER_FILL_STREAM isn't used) and prices are
+# polled every PRICE_POLL_SECS of virtual time. the trade history (HISTORY_FILE)
+# and csv reports (CSV_EXPORT) are written to the output directory
+
+TZ = timezone('America/New_York')
+
+
+def settled_sleep(orders, sleep):
+    # sleep that first waits for the orders being sent, so on the virtual
+    # clock orders fill at the prices they were placed at
+    def settled(secs):
+        with orders.cond:
+            futures = [order.future for order in orders.orders.values() if order.future is not None]
+        wait(futures)
+        sleep(secs)
+    return settled
+
+
+def main(argv=None):
+    usage = """Usage: python -m stockbot simulate [-h] [-t tradealgo] [-b startbuytime] [-n numstocks] [-d datadir] [-s startdate] [-D days] [-u universe] [-l latency] [-e errorrate] [-r seed] [-x speed] [-o outdir]
+
+Replay trading days of stockbot against a simulated exchange."""
+    parser = optparse.OptionParser(usage=usage)
+    parser.add_option('-t', '--tradealgo', default='moved',
+                        help='algo to use for trading, options are moved, lowtomarket or lowtohigh, default "%default"')
+    parser.add_option('-b', '--startbuytime', default='buyatopen',
+                        help='when to starting buying stocks, options are buyatopen, and buyatclose, default "%default"')
+    parser.add_option('-n', '--numstocks', type='int', default=1000,
+                        help='number of random walk stocks, default "%default"')
+    parser.add_option('-d', '--datadir',
+                        help='replay recorded bars from this backtest.py data directory instead of random walks')
+    parser.add_option('-s', '--startdate',
+                        help='first day to trade (YYYY-MM-DD), default 2021-03-01 or the first day of datadir with '
+                        'MOVED_DAYS days before it')
+    parser.add_option('-D', '--days', type='int', default=1,
+                        help='number of trading days to run, default "%default"')
+    parser.add_option('-u', '--universe', default='screener',
+                        help='stocks to pick from, screener (all the simulated stocks) or listed, default "%default"')
+    parser.add_option('-l', '--latency', type='float', default=0.0,
+                        help='seconds of latency to add to each response, default "%default"')
+    parser.add_option('-e', '--errorrate', type='float', default=0.0,
+                        help='fraction of requests answered with a 500 error, default "%default"')
+    parser.add_option('-r', '--seed', type='int', default=0,
+                        help='random seed of the simulated prices and errors, default "%default"')
+    parser.add_option('-x', '--speed', type='float',
+                        help='run the virtual clock this many times faster than the wall clock instead of jumping '
+                        'over sleeps')
+    parser.add_option('-o', '--outdir', default='sim',
+                        help='directory to write the csv reports to, default "%default"')
+    parser.add_option('-L', '--loglevel', default='INFO',
+                        help='log level, options are DEBUG, INFO, WARNING or ERROR, default "%default"')
+    options, args = parser.parse_args(argv)
+
+    config = Config.load()
+    if options.datadir:
+        market = standin.SimMarket.recorded(options.datadir)
+        days = market.days
+        start = np.datetime64(options.startdate) if options.startdate else days[min(config.MOVED_DAYS, len(days) - 1)]
+    else:
+        start = np.datetime64(options.startdate or '2021-03-01')
+        market = standin.SimMarket.synthetic(options.numstocks, start, options.days,
+                                             history=max(config.MOVED_DAYS, 30), seed=options.seed)
+        days = market.days
+    run_days = days[days >= start][:options.days]
+    if not len(run_days):
+        parser.error('no trading days from {}'.format(start))
+    clock = VirtualClock(TZ, TZ.localize(datetime.combine(run_days[0].item(), datetime.min.time())),
+                         options.speed)
+    until = TZ.localize(datetime.combine(run_days[-1].item() + timedelta(days=1), datetime.min.time()))
+    server = standin.serve(latency=options.latency, market=market, clock=clock, error_rate=options.errorrate,
+                           seed=options.seed)
+
+    # stockbot's alpaca clients are made from these
+    os.environ['APCA_API_BASE_URL'] = os.environ['APCA_API_DATA_URL'] = standin.base_url(server)
+    os.environ['APCA_API_KEY_ID'] = os.environ['APCA_API_SECRET_KEY'] = 'standin'
+
+    from .bot import Context, StockBot
+    from .fetcher import QuoteFetcher
+    from .history import TradeHistory
+    from .logs import setup_logging
+
+    config.NASDAQ_API_URL = standin.screener_url(server, len(market.symbols))
+    config.NASDAQ_LISTED_URL = standin.listed_url(server)
+    context = Context(config)
+    # no rate limit, and simulated bars aren't kept in BAR_STORE_DIR
+    context.fetcher = QuoteFetcher(url=standin.chart_url(server), max_workers=config.QUOTE_FETCH_WORKERS, rate=0,
+                                   session_pool=context.sessions)
+    context.barstore = None
+    context.market.now = lambda: clock.now().timestamp()
+
+    os.makedirs(options.outdir, exist_ok=True)
+    os.chdir(options.outdir)
+    if os.path.exists('nasdaqlisted.txt'):
+        os.remove('nasdaqlisted.txt')
+
+    log_listener = setup_logging(options.loglevel.upper(), config.LOG_FORMAT)
+    bot = StockBot(context, options.tradealgo, options.startbuytime, 'poll', clock=clock,
+                   params=context.strategy_params({'STOCK_UNIVERSE': options.universe}),
+                   history=TradeHistory(config.HISTORY_FILE) if config.HISTORY_FILE else None)
+    bot.feed.sleep = settled_sleep(bot.orders, clock.sleep)
+    start_time = time.perf_counter()
+    try:
+        bot.run(until=until)
+    finally:
+        context.close()
+        log_listener.stop()
+    secs = time.perf_counter() - start_time
+
+    account = server.account.account()[1]
+    print('*** DAYS {} ({} to {})'.format(len(run_days), run_days[0], run_days[-1]))
+    print('*** STOCKS {}'.format(len(market.symbols)))
+    print('*** REQUESTS {}'.format(', '.join('{} {}'.format(k, v) for k, v in sorted(server.counts.items()))))
+    print('*** EQUITY ${}'.format(round(bot.equity, 2)))
+    print('*** ACCOUNT EQUITY ${} CASH ${}'.format(account['equity'], account['cash']))
+    print('*** SECS {}'.format(round(secs, 2)))
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
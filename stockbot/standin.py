@@ -0,0 +1,680 @@
+"""
+StockBot
+
+https://github.com/shirosaidev/stockbot
+
+Copyright (C) Chris Park (shirosai) 2021
+stockbot is released under the Apache 2.0 license. See
+LICENSE for the full license text.
+"""
+
+import json
+import optparse
+import re
+import threading
+import time
+import uuid
+from datetime import datetime, timezone as dt_timezone
+from datetime import time as dtime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from random import Random
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+from pytz import timezone
+
+
+# local stand-ins for the Yahoo Finance chart endpoint and Alpaca's market
+# data websocket, used by the benchmarks and for trying out the bot without
+# hitting the real servers. with a simulated market (SimMarket) it's a whole
+# stand-in exchange, also answering the nasdaq screener and symbol directory
+# and the alpaca rest api (account, positions, orders, calendar and daily
+# bars) with prices following a clock, see simulate.py
+
+
+def chart_json(symbol):
+    # deterministic prices per symbol so runs are repeatable
+    rnd = Random(symbol)
+    price = round(rnd.uniform(10, 150), 2)
+    low = round(price * rnd.uniform(0.95, 1.0), 2)
+    high = round(price * rnd.uniform(1.0, 1.05), 2)
+    volume = rnd.randint(100000, 10000000)
+    return {'chart': {'result': [{
+        'meta': {'symbol': symbol, 'exchangeName': 'NMS', 'regularMarketPrice': price},
+        'timestamp': [int(time.time())],
+        'indicators': {'quote': [{'open': [price], 'high': [high], 'low': [low],
+                                  'close': [price], 'volume': [volume]}]}
+        }], 'error': None}}
+
+
+# minutes in a regular trading day (9:30 to 16:00 EST) and the minute of the
+# day the market opens
+DAY_MINUTES = 390
+OPEN_MINUTE = 570
+
+TZ = timezone('America/New_York')
+
+
+class SimMarket:
+    """Simulated market for the stand-in exchange. Daily bars are (symbols x
+    days) arrays like backtest.py's DailyBars and each trading day has a
+    price for every minute from 9:30 to 16:00 EST, made on demand by
+    path_fn(i, d) for the ith symbol on the dth day. Quotes, bars, fills and
+    streamed trades all take their prices from the paths at the clock's
+    time, before the open it's the day before's close."""
+
+    def __init__(self, symbols, days, opens, highs, lows, closes, volumes, path_fn, companies=None):
+        self.symbols = list(symbols)
+        self.index = {symbol: i for i, symbol in enumerate(self.symbols)}
+        self.days = days
+        self.opens = opens
+        self.highs = highs
+        self.lows = lows
+        self.closes = closes
+        self.volumes = volumes
+        self.path_fn = path_fn
+        self.companies = companies or {}
+        # bar times are midnight EST of the day
+        self.day_times = [int(TZ.localize(datetime.combine(day.item(), dtime())).timestamp()) for day in days]
+        # paths of the last day asked for, symbol index -> prices
+        self.paths = {}
+        self.paths_day = None
+        self.lock = threading.Lock()
+
+    @classmethod
+    def synthetic(cls, num_symbols, start, num_days, history=30, seed=0):
+        # random walk prices for num_days weekdays from start and history
+        # weekdays before it, the same seed gives the same prices
+        start = np.datetime64(start, 'D')
+        days = np.arange(np.busday_offset(start, -history, roll='forward'),
+                         np.busday_offset(start, num_days, roll='forward'), dtype='datetime64[D]')
+        days = days[np.is_busday(days)]
+        symbols = ['S{0:05d}'.format(i) for i in range(num_symbols)]
+
+        def walk(i):
+            rng = np.random.default_rng([seed, i])
+            price = np.exp(rng.uniform(np.log(5), np.log(300)))
+            volatility = rng.uniform(0.01, 0.04)
+            steps = rng.normal(0, volatility / np.sqrt(DAY_MINUTES), (len(days), DAY_MINUTES))
+            # overnight gaps
+            steps[:, 0] += rng.normal(0, volatility / 2, len(days))
+            return np.round(price * np.exp(np.cumsum(steps)).reshape(len(days), DAY_MINUTES), 2)
+
+        shape = (num_symbols, len(days))
+        opens, highs, lows, closes = (np.empty(shape) for _ in range(4))
+        volumes = np.empty(shape)
+        for i in range(num_symbols):
+            path = walk(i)
+            opens[i], highs[i], lows[i], closes[i] = path[:, 0], path.max(axis=1), path.min(axis=1), path[:, -1]
+            rng = np.random.default_rng([seed, i, 1])
+            volumes[i] = np.round(np.exp(rng.uniform(np.log(1e5), np.log(1e7))) * rng.lognormal(0, 0.3, len(days)))
+        companies = {symbol: 'Simulated Stock {} Inc.'.format(i) for i, symbol in enumerate(symbols)}
+        return cls(symbols, days, opens, highs, lows, closes, volumes, lambda i, d: walk(i)[d], companies)
+
+    @classmethod
+    def recorded(cls, datadir):
+        # prices from a backtest.py data directory, days without minute bars
+        # go in a straight line from the open to the close
+        from .backtest import DailyBars, MinuteBars, sample_prices
+        daily = DailyBars.load(datadir)
+        minute = MinuteBars(datadir)
+        samples = OPEN_MINUTE + 1 + np.arange(DAY_MINUTES)
+
+        def path(i, d):
+            bars = minute.get(daily.symbols[i], str(daily.days[d]))
+            if bars is None:
+                return np.round(np.linspace(daily.opens[i, d], daily.closes[i, d], DAY_MINUTES), 2)
+            return sample_prices(bars, samples)
+
+        return cls(daily.symbols, daily.days, daily.opens, daily.highs, daily.lows, daily.closes, daily.volumes,
+                   path, daily.companies)
+
+    def company(self, symbol):
+        return self.companies.get(symbol, symbol)
+
+    def minute(self, now):
+        # trading day index and minute of the day's path at now, -1 before
+        # the open and DAY_MINUTES - 1 after the close or on days without
+        # trading (which use the last trading day)
+        local = now.astimezone(TZ)
+        today = np.datetime64(local.date())
+        d = int(np.searchsorted(self.days, today, 'right')) - 1
+        if d < 0 or self.days[d] != today:
+            return d, DAY_MINUTES - 1
+        return d, min(local.hour * 60 + local.minute - OPEN_MINUTE, DAY_MINUTES - 1)
+
+    def is_open(self, now):
+        local = now.astimezone(TZ)
+        d, m = self.minute(now)
+        return d >= 0 and self.days[d] == np.datetime64(local.date()) and \
+            0 <= local.hour * 60 + local.minute - OPEN_MINUTE < DAY_MINUTES
+
+    def path(self, i, d):
+        with self.lock:
+            if d != self.paths_day:
+                self.paths = {}
+                self.paths_day = d
+            path = self.paths.get(i)
+            if path is None:
+                path = self.paths[i] = self.path_fn(i, d)
+            return path
+
+    def bar(self, i, d, m):
+        # day d's bar up to minute m, the full day's bar after the close
+        if m >= DAY_MINUTES - 1:
+            return {'t': self.day_times[d], 'o': self.opens[i, d], 'h': self.highs[i, d], 'l': self.lows[i, d],
+                    'c': self.closes[i, d], 'v': int(self.volumes[i, d])}
+        path = self.path(i, d)[:m + 1]
+        o = self.opens[i, d]
+        return {'t': self.day_times[d], 'o': o, 'h': max(o, path.max()), 'l': min(o, path.min()), 'c': path[-1],
+                'v': int(self.volumes[i, d] * (m + 1) / DAY_MINUTES)}
+
+    def latest(self, symbol, now):
+        # (symbol index, day index, minute) of the latest price, None if the
+        # symbol has no bars yet
+        i = self.index.get(symbol)
+        d, m = self.minute(now)
+        if m < 0:
+            d, m = d - 1, DAY_MINUTES - 1
+        if i is None or d < 0 or np.isnan(self.closes[i, d]):
+            return None
+        return i, d, m
+
+    def quote(self, symbol, now):
+        # today's bar so far, or the last trading day's before the open
+        latest = self.latest(symbol, now)
+        if latest is None:
+            return None
+        return self.bar(*latest)
+
+    def price(self, symbol, now):
+        quote = self.quote(symbol, now)
+        return None if quote is None else quote['c']
+
+    def bars(self, symbol, now, limit=None, start=None):
+        # daily bars up to now, today's bar so far if the market has opened
+        latest = self.latest(symbol, now)
+        if latest is None:
+            return []
+        i, d, m = latest
+        first = 0 if limit is None else max(d + 1 - limit, 0)
+        bars = [self.bar(i, j, DAY_MINUTES - 1) for j in range(first, d)] + [self.bar(i, d, m)]
+        bars = [bar for bar in bars if not np.isnan(bar['o'])]
+        if start is not None:
+            bars = [bar for bar in bars if bar['t'] >= start]
+        return bars
+
+    def calendar(self, start, end):
+        # the days with bars, and weekdays before and after them
+        days = np.arange(np.datetime64(start), np.datetime64(end) + 1)
+        outside = (days < self.days[0]) | (days > self.days[-1])
+        days = days[np.isin(days, self.days) | (outside & np.is_busday(days))]
+        return [{'date': str(day), 'open': '09:30', 'close': '16:00', 'session_open': '0400',
+                 'session_close': '2000'} for day in days]
+
+
+def utc_iso(now):
+    return now.astimezone(dt_timezone.utc).isoformat().replace('+00:00', 'Z')
+
+
+def parse_iso(value):
+    return datetime.fromisoformat(value.replace('Z', '+00:00'))
+
+
+class SimAccount:
+    """Alpaca account of the stand-in exchange. Market orders fill in full at
+    the market's price when they get there, orders sent while the market is
+    closed fill at the next open."""
+
+    def __init__(self, market, clock, cash=100000):
+        self.market = market
+        self.clock = clock
+        self.cash = cash
+        # symbol -> qty held
+        self.positions = {}
+        self.cost = {}
+        self.orders = []
+        self.by_id = {}
+        self.by_client_id = {}
+        self.waiting = []
+        self.lock = threading.Lock()
+
+    def available(self, symbol):
+        # qty not already being sold
+        selling = sum(int(order['qty']) for order in self.waiting
+                      if order['symbol'] == symbol and order['side'] == 'sell')
+        return self.positions.get(symbol, 0) - selling
+
+    def fill(self, order, price, now):
+        qty = int(order['qty'])
+        if order['side'] == 'buy':
+            self.cash -= qty * price
+            self.positions[order['symbol']] = self.positions.get(order['symbol'], 0) + qty
+            self.cost[order['symbol']] = self.cost.get(order['symbol'], 0) + qty * price
+        else:
+            held = self.positions[order['symbol']]
+            self.cash += qty * price
+            self.cost[order['symbol']] -= self.cost[order['symbol']] * qty / held
+            self.positions[order['symbol']] = held - qty
+            if not self.positions[order['symbol']]:
+                del self.positions[order['symbol']]
+                del self.cost[order['symbol']]
+        order.update(status='filled', filled_qty=str(qty), filled_avg_price=str(price),
+                     filled_at=utc_iso(now), updated_at=utc_iso(now))
+
+    def fill_waiting(self, now):
+        # fill orders sent while the market was closed once it opens
+        if self.waiting and self.market.is_open(now):
+            for order in self.waiting:
+                self.fill(order, self.market.price(order['symbol'], now), now)
+            self.waiting = []
+
+    def submit(self, body):
+        now = self.clock.now()
+        with self.lock:
+            self.fill_waiting(now)
+            client_order_id = body.get('client_order_id') or uuid.uuid4().hex
+            if client_order_id in self.by_client_id:
+                return 422, {'code': 40010001, 'message': 'client_order_id must be unique'}
+            symbol = body['symbol']
+            qty = int(float(body['qty']))
+            side = body['side']
+            price = self.market.price(symbol, now)
+            if price is None:
+                return 422, {'code': 40010001, 'message': 'asset "{}" not found'.format(symbol)}
+            if side == 'sell' and qty > self.available(symbol):
+                return 403, {'code': 40310000, 'message': 'insufficient qty available for order (requested: {}, '
+                             'available: {})'.format(qty, self.available(symbol))}
+            if side == 'buy' and qty * price > self.cash:
+                return 403, {'code': 40310000, 'message': 'insufficient buying power'}
+            order = {'id': str(uuid.uuid4()), 'client_order_id': client_order_id, 'created_at': utc_iso(now),
+                     'updated_at': utc_iso(now), 'submitted_at': utc_iso(now), 'filled_at': None,
+                     'asset_class': 'us_equity', 'symbol': symbol, 'qty': str(qty), 'filled_qty': '0',
+                     'filled_avg_price': None, 'order_class': '', 'type': body.get('type', 'market'), 'side': side,
+                     'time_in_force': body.get('time_in_force', 'day'), 'status': 'new'}
+            self.orders.append(order)
+            self.by_id[order['id']] = order
+            self.by_client_id[client_order_id] = order
+            if self.market.is_open(now):
+                self.fill(order, price, now)
+            else:
+                self.waiting.append(order)
+            return 200, order
+
+    def get_order(self, order_id=None, client_order_id=None):
+        with self.lock:
+            self.fill_waiting(self.clock.now())
+            order = self.by_client_id.get(client_order_id) if client_order_id else self.by_id.get(order_id)
+            if order is None:
+                return 404, {'code': 40410000, 'message': 'order not found'}
+            return 200, dict(order)
+
+    def cancel_order(self, order_id):
+        # only orders waiting for the open can still be canceled, the others
+        # filled when they got here
+        now = self.clock.now()
+        with self.lock:
+            self.fill_waiting(now)
+            order = self.by_id.get(order_id)
+            if order is None:
+                return 404, {'code': 40410000, 'message': 'order not found'}
+            if order['status'] != 'new':
+                return 422, {'code': 42210000, 'message': 'order is not cancelable'}
+            self.waiting.remove(order)
+            order.update(status='canceled', canceled_at=utc_iso(now), updated_at=utc_iso(now))
+            return 204, ''
+
+    def list_orders(self, query):
+        # status open, closed or all, after/until exclusive submitted times,
+        # newest first unless direction is asc
+        status = query.get('status', 'open')
+        after = parse_iso(query['after']) if 'after' in query else None
+        until = parse_iso(query['until']) if 'until' in query else None
+        limit = min(int(query.get('limit', 50)), 500)
+        with self.lock:
+            self.fill_waiting(self.clock.now())
+            orders = [order for order in self.orders
+                      if (status == 'all' or (status == 'open') == (order['status'] == 'new')) and
+                      (after is None or parse_iso(order['submitted_at']) > after) and
+                      (until is None or parse_iso(order['submitted_at']) < until)]
+            if query.get('direction', 'desc') == 'desc':
+                orders.reverse()
+            return 200, [dict(order) for order in orders[:limit]]
+
+    def account(self):
+        now = self.clock.now()
+        with self.lock:
+            self.fill_waiting(now)
+            value = sum(qty * self.market.price(symbol, now) for symbol, qty in self.positions.items())
+            cash = round(self.cash, 2)
+            return 200, {'id': 'standin', 'account_number': 'STANDIN', 'status': 'ACTIVE', 'currency': 'USD',
+                         'cash': str(cash), 'buying_power': str(cash), 'equity': str(round(cash + value, 2)),
+                         'portfolio_value': str(round(cash + value, 2)), 'trading_blocked': False,
+                         'transfers_blocked': False, 'account_blocked': False, 'pattern_day_trader': False}
+
+    def list_positions(self):
+        now = self.clock.now()
+        with self.lock:
+            self.fill_waiting(now)
+            positions = []
+            for symbol, qty in sorted(self.positions.items()):
+                price = self.market.price(symbol, now)
+                cost = self.cost[symbol]
+                positions.append({'asset_class': 'us_equity', 'symbol': symbol, 'side': 'long', 'qty': str(qty),
+                                  'avg_entry_price': str(round(cost / qty, 4)), 'cost_basis': str(round(cost, 2)),
+                                  'current_price': str(price), 'market_value': str(round(qty * price, 2)),
+                                  'unrealized_pl': str(round(qty * price - cost, 2))})
+            return 200, positions
+
+
+def yahoo_error(code, description):
+    return {'chart': {'result': None, 'error': {'code': code, 'description': description}}}
+
+
+def chart_route(server, query, body, symbol):
+    if server.market is None:
+        return 200, chart_json(symbol)
+    now = server.clock.now()
+    bar = server.market.quote(symbol, now)
+    if bar is None:
+        return 404, yahoo_error('Not Found', 'No data found, symbol may be delisted')
+    return 200, {'chart': {'result': [{
+        'meta': {'symbol': symbol, 'exchangeName': 'NMS', 'regularMarketPrice': bar['c'],
+                 'regularMarketTime': int(now.timestamp())},
+        'timestamp': [bar['t']],
+        'indicators': {'quote': [{'open': [bar['o']], 'high': [bar['h']], 'low': [bar['l']],
+                                  'close': [bar['c']], 'volume': [bar['v']]}]}
+        }], 'error': None}}
+
+
+def screener_route(server, query, body):
+    # the first limit symbols are the day's buy and strong buy stocks
+    market = server.market
+    rows = [{'symbol': symbol, 'name': market.company(symbol)}
+            for symbol in market.symbols[:int(query.get('limit', 100))]]
+    return 200, {'data': {'table': {'rows': rows}}, 'message': None, 'status': {'rCode': 200}}
+
+
+def listed_route(server, query, body):
+    # nasdaq symbol directory format, see get_nasdaq_listed()
+    lines = ['Symbol|Security Name|Market Category|Test Issue|Financial Status|Round Lot Size|ETF|NextShares']
+    lines.extend('{}|{}|Q|N|N|100|N|N'.format(symbol, server.market.company(symbol))
+                 for symbol in server.market.symbols)
+    lines.append('File Creation Time: {}|||||||'.format(server.clock.now().strftime('%m%d%Y%H:%M')))
+    return 200, '\n'.join(lines) + '\n'
+
+
+def bars_route(server, query, body, timeframe):
+    if timeframe not in ('day', '1D'):
+        return 422, {'code': 42210000, 'message': 'only daily bars are simulated'}
+    now = server.clock.now()
+    limit = int(query['limit']) if 'limit' in query else None
+    start = int(parse_iso(query['start']).timestamp()) if 'start' in query else None
+    return 200, {symbol: server.market.bars(symbol, now, limit, start) for symbol in query['symbols'].split(',')}
+
+
+def bars_v2_route(server, query, body):
+    # v2 multi-symbol bars since start (the start of today if not given), at
+    # most limit bars of all symbols per page, the next page's token is the
+    # offset into them
+    if query.get('timeframe') not in ('1Day', '1D'):
+        return 422, {'code': 42210000, 'message': 'only daily bars are simulated'}
+    now = server.clock.now()
+    start = query.get('start') or now.replace(hour=0, minute=0, second=0, microsecond=0).isoformat()
+    start = int(parse_iso(start).timestamp())
+    bars = [(symbol, bar) for symbol in query['symbols'].split(',')
+            for bar in server.market.bars(symbol, now, start=start)]
+    offset = int(query.get('page_token') or 0)
+    limit = int(query.get('limit') or 1000)
+    page = {}
+    for symbol, bar in bars[offset:offset + limit]:
+        page.setdefault(symbol, []).append(dict(bar, t=utc_iso(datetime.fromtimestamp(bar['t'], dt_timezone.utc))))
+    next_token = str(offset + limit) if offset + limit < len(bars) else None
+    return 200, {'bars': page, 'next_page_token': next_token}
+
+
+def clock_route(server, query, body):
+    # only the time, the trading days come from the calendar
+    return 200, {'timestamp': server.clock.now().isoformat()}
+
+
+def calendar_route(server, query, body):
+    today = server.clock.now().date().isoformat()
+    return 200, server.market.calendar(query.get('start', today), query.get('end', today))
+
+
+# method, path, route name, handler(server, query, body, *path groups)
+ROUTES = [
+    ('GET', re.compile(r'/v8/finance/chart/([^/]+)'), 'yahoo_chart', chart_route),
+    ('GET', re.compile(r'/api/screener/stocks'), 'nasdaq_screener', screener_route),
+    ('GET', re.compile(r'/nasdaqlisted\.txt'), 'nasdaq_listed', listed_route),
+    ('GET', re.compile(r'/v1/bars/([^/]+)'), 'alpaca_bars', bars_route),
+    ('GET', re.compile(r'/v2/stocks/bars'), 'alpaca_bars', bars_v2_route),
+    ('GET', re.compile(r'/v2/clock'), 'alpaca_clock', clock_route),
+    ('GET', re.compile(r'/v2/calendar'), 'alpaca_calendar', calendar_route),
+    ('GET', re.compile(r'/v2/account'), 'alpaca_account', lambda server, query, body: server.account.account()),
+    ('GET', re.compile(r'/v2/positions'), 'alpaca_positions',
+     lambda server, query, body: server.account.list_positions()),
+    ('GET', re.compile(r'/v2/orders'), 'alpaca_orders', lambda server, query, body: server.account.list_orders(query)),
+    ('POST', re.compile(r'/v2/orders'), 'alpaca_submit', lambda server, query, body: server.account.submit(body)),
+    ('GET', re.compile(r'/v2/orders:by_client_order_id'), 'alpaca_order',
+     lambda server, query, body: server.account.get_order(client_order_id=query.get('client_order_id'))),
+    ('GET', re.compile(r'/v2/orders/([^/]+)'), 'alpaca_order',
+     lambda server, query, body, order_id: server.account.get_order(order_id)),
+    ('DELETE', re.compile(r'/v2/orders/([^/]+)'), 'alpaca_cancel',
+     lambda server, query, body, order_id: server.account.cancel_order(order_id)),
+    ]
+
+
+class StandinHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # headers and body are written separately, don't let them wait on acks
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        self.handle_route('GET')
+
+    def do_POST(self):
+        self.handle_route('POST')
+
+    def do_DELETE(self):
+        self.handle_route('DELETE')
+
+    def handle_route(self, method):
+        url = urlparse(self.path)
+        query = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        body = None
+        if method == 'POST':
+            body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+        server = self.server
+        if server.latency:
+            time.sleep(server.latency)
+        for route_method, pattern, name, handler in ROUTES:
+            match = pattern.fullmatch(url.path)
+            if route_method != method or not match:
+                continue
+            if name != 'yahoo_chart' and server.market is None:
+                break
+            server.count(name)
+            if server.error_rate and server.rnd.random() < server.error_rate:
+                # injected server error, in the shape each service sends them
+                server.count('injected_errors')
+                if name == 'yahoo_chart':
+                    return self.send_json(yahoo_error('Internal Server Error', 'injected error'), 500)
+                return self.send_json({'code': 50010000, 'message': 'injected error'}, 500)
+            status, data = handler(server, query, body, *match.groups())
+            return self.send_json(data, status)
+        self.send_json({'error': 'not found'}, status=404)
+
+    def send_json(self, data, status=200):
+        if isinstance(data, str):
+            body, content_type = data.encode(), 'text/plain'
+        else:
+            body, content_type = json.dumps(data, default=float).encode(), 'application/json'
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class StandinServer(ThreadingHTTPServer):
+    """Stand-in http server, with a market (and clock) it's a simulated
+    exchange answering the yahoo, nasdaq and alpaca requests stockbot makes,
+    otherwise only yahoo charts with fixed prices. latency secs are added to
+    every response and error_rate of the requests get a 500 error."""
+
+    daemon_threads = True
+
+    def __init__(self, address, latency=0.0, market=None, clock=None, error_rate=0.0, seed=None, cash=100000):
+        super().__init__(address, StandinHandler)
+        self.latency = latency
+        self.market = market
+        self.clock = clock
+        self.account = SimAccount(market, clock, cash) if market is not None else None
+        self.error_rate = error_rate
+        self.rnd = Random(seed)
+        # route name -> number of requests
+        self.counts = {}
+        self.counts_lock = threading.Lock()
+
+    def count(self, name):
+        with self.counts_lock:
+            self.counts[name] = self.counts.get(name, 0) + 1
+
+
+def serve(host='127.0.0.1', port=0, latency=0.0, market=None, clock=None, error_rate=0.0, seed=None):
+    # start stand-in server in a background thread, port 0 picks a free port
+    server = StandinServer((host, port), latency, market, clock, error_rate, seed)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
+
+
+def base_url(server):
+    # url to use for APCA_API_BASE_URL and APCA_API_DATA_URL
+    host, port = server.server_address[:2]
+    return "http://{0}:{1}".format(host, port)
+
+
+def chart_url(server):
+    return base_url(server) + "/v8/finance/chart/{symbol}?region=US&lang=en-US&includePrePost=false&interval=1d&range=1d"
+
+
+def screener_url(server, limit=100):
+    return base_url(server) + "/api/screener/stocks?tableonly=true&limit={}".format(limit)
+
+
+def listed_url(server):
+    return base_url(server) + "/nasdaqlisted.txt"
+
+
+def trade_msg(symbol, price):
+    import msgpack
+    return {'T': 't', 'S': symbol, 'i': 0, 'x': 'V', 'p': price, 's': 100,
+            't': msgpack.Timestamp.from_unix(time.time()), 'c': ['@'], 'z': 'C'}
+
+
+async def stream_handler(ws, path=None, interval=1.0, price_fn=None):
+    # speaks enough of the alpaca v2 market data protocol (msgpack) for
+    # alpaca_trade_api.Stream, sends a random walk trade for every
+    # subscribed symbol each interval, or the price from price_fn(symbol)
+    # (the simulated market's price at the clock's time)
+    import asyncio
+    import msgpack
+    import websockets
+    rnd = Random()
+    prices = {}
+    await ws.send(msgpack.packb([{'T': 'success', 'msg': 'connected'}]))
+    while True:
+        try:
+            msg = msgpack.unpackb(await asyncio.wait_for(ws.recv(), interval))
+        except asyncio.TimeoutError:
+            if prices:
+                for symbol in prices:
+                    if price_fn:
+                        prices[symbol] = price_fn(symbol) or prices[symbol]
+                    else:
+                        prices[symbol] = round(prices[symbol] * (1 + rnd.gauss(0, 0.002)), 2)
+                await ws.send(msgpack.packb([trade_msg(s, p) for s, p in prices.items()]))
+            continue
+        except websockets.ConnectionClosed:
+            return
+        if msg.get('action') == 'auth':
+            await ws.send(msgpack.packb([{'T': 'success', 'msg': 'authenticated'}]))
+        elif msg.get('action') == 'subscribe':
+            for symbol in msg.get('trades', []):
+                prices.setdefault(symbol, (price_fn and price_fn(symbol)) or
+                                  chart_json(symbol)['chart']['result'][0]['meta']['regularMarketPrice'])
+            await ws.send(msgpack.packb([{'T': 'subscription', 'trades': sorted(prices),
+                                          'quotes': [], 'bars': []}]))
+
+
+def serve_stream(host='127.0.0.1', port=0, interval=1.0, price_fn=None):
+    # start stand-in market data websocket in a background thread, returns
+    # the url to use for the stream's data_stream_url
+    import asyncio
+    import websockets
+    started = threading.Event()
+    address = []
+
+    def run():
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        server = loop.run_until_complete(websockets.serve(
+            lambda ws, path=None: stream_handler(ws, path, interval, price_fn), host, port))
+        address.append(server.sockets[0].getsockname()[:2])
+        started.set()
+        loop.run_forever()
+
+    threading.Thread(target=run, daemon=True).start()
+    started.wait()
+    return "http://{0}:{1}".format(*address[0])
+
+
+def main(argv=None):
+    parser = optparse.OptionParser(usage="Usage: python -m stockbot standin [-h] [-p port] [-l latency] "
+                                         "[-s streamport] [-n numstocks] [-e errorrate]")
+    parser.add_option('-p', '--port', type='int', default=8000,
+                        help='port to listen on, default "%default"')
+    parser.add_option('-l', '--latency', type='float', default=0.0,
+                        help='seconds of latency to add to each response, default "%default"')
+    parser.add_option('-s', '--streamport', type='int', default=8001,
+                        help='port for the market data websocket, default "%default"')
+    parser.add_option('-i', '--tradeinterval', type='float', default=1.0,
+                        help='seconds between streamed trades for each symbol, default "%default"')
+    parser.add_option('-n', '--numstocks', type='int',
+                        help='simulate an exchange with this many random walk stocks on the wall clock, for '
+                        'pointing a running stockbot at (see simulate to replay days on a virtual clock)')
+    parser.add_option('-e', '--errorrate', type='float', default=0.0,
+                        help='fraction of requests answered with a 500 error, default "%default"')
+    parser.add_option('-r', '--seed', type='int', default=0,
+                        help='random seed of the simulated prices and errors, default "%default"')
+    options, args = parser.parse_args(argv)
+    market = clock = price_fn = None
+    if options.numstocks:
+        from datetime import date
+        from .scheduler import Clock
+        clock = Clock(TZ)
+        market = SimMarket.synthetic(options.numstocks, date.today(), 30, seed=options.seed)
+        price_fn = lambda symbol: market.price(symbol, clock.now())
+    server = serve(port=options.port, latency=options.latency, market=market, clock=clock,
+                   error_rate=options.errorrate, seed=options.seed)
+    print('stand-in listening on {}'.format(chart_url(server)))
+    if market is not None:
+        print('simulated exchange with {} stocks on {} (alpaca api and data url), nasdaq screener on {}'.format(
+            options.numstocks, base_url(server), screener_url(server, options.numstocks)))
+    stream_url = serve_stream(port=options.streamport, interval=options.tradeinterval, price_fn=price_fn)
+    print('stand-in market data stream on {} (set STREAM_DATA_URL in config)'.format(stream_url))
+    try:
+        while True:
+            time.sleep(60)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
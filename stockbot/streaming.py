@@ -0,0 +1,171 @@
+"""
+StockBot
+
+https://github.com/shirosaidev/stockbot
+
+Copyright (C) Chris Park (shirosai) 2021
+stockbot is released under the Apache 2.0 license. See
+LICENSE for the full license text.
+"""
+
+import logging
+import threading
+import time
+from collections import deque
+
+from .metrics import SLEEP_SECONDS
+from .scheduler import Clock
+
+
+log = logging.getLogger('stockbot.streaming')
+
+
+class PollingFeed:
+    """Price feed that polls every symbol each interval seconds, this is how
+    stockbot has always got prices."""
+
+    def __init__(self, poll_fn, interval=120, sleep=time.sleep):
+        self.poll_fn = poll_fn
+        self.interval = interval
+        self.sleep = sleep
+        self.first = True
+
+    def start(self, symbols):
+        self.first = True
+
+    def stop(self):
+        pass
+
+    def traded(self, symbol):
+        # polled prices come without the volume traded
+        return None, None
+
+    def next_prices(self, symbols):
+        # first call returns right away, after that sleep between polls
+        if not self.first:
+            SLEEP_SECONDS.labels('feed').inc(self.interval)
+            self.sleep(self.interval)
+        self.first = False
+        prices = {}
+        for symbol in symbols:
+            price = self.poll_fn(symbol)
+            # no quote for now, try again next poll
+            if price is not None:
+                prices[symbol] = price
+        return prices
+
+
+class StreamFeed:
+    """Price feed that pushes trades from Alpaca's market data websocket into
+    an in-memory buffer of recent prices per symbol. next_prices() blocks
+    until new trades arrive, symbols without any trades for interval seconds
+    fall back to polling. traded() has the volume of the trades behind each
+    streamed price. The times and waits are on clock (a
+    scheduler.Clock), the wall clock by default."""
+
+    def __init__(self, poll_fn, key_id, secret_key, base_url, data_feed='iex',
+                 data_stream_url=None, interval=120, buffer_size=1000, clock=None):
+        self.poll_fn = poll_fn
+        self.key_id = key_id
+        self.secret_key = secret_key
+        self.base_url = base_url
+        self.data_feed = data_feed
+        self.data_stream_url = data_stream_url
+        self.interval = interval
+        self.buffer_size = buffer_size
+        self.clock = clock or Clock(None)
+        self.prices = {}
+        self.ticked = set()
+        self.last_seen = {}
+        # symbol -> (volume, $ value) of the trades since the last price
+        # returned, and of the ones behind the prices last returned
+        self.volumes = {}
+        self.returned = {}
+        self.cond = threading.Condition()
+        self.stream = None
+        self.thread = None
+        self.symbols = set()
+
+    def start(self, symbols):
+        symbols = set(symbols)
+        if self.stream and symbols == self.symbols:
+            return
+        self.stop()
+        from alpaca_trade_api.stream import Stream
+        with self.cond:
+            self.symbols = symbols
+            self.prices = {symbol: deque(maxlen=self.buffer_size) for symbol in symbols}
+            self.ticked = set()
+            self.last_seen = {}
+            self.volumes = {}
+            self.returned = {}
+        if not symbols:
+            return
+        self.stream = Stream(self.key_id, self.secret_key, base_url=self.base_url,
+                             data_stream_url=self.data_stream_url, data_feed=self.data_feed)
+        self.stream.subscribe_trades(self.on_trade, *symbols)
+        self.thread = threading.Thread(target=self.stream.run, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        if self.stream:
+            try:
+                self.stream.stop()
+            except Exception as e:
+                log.warning('STREAM ERROR: {}'.format(e))
+            self.thread.join(timeout=10)
+        self.stream = None
+        self.thread = None
+
+    async def on_trade(self, trade):
+        with self.cond:
+            buf = self.prices.get(trade.symbol)
+            if buf is None:
+                return
+            buf.append((self.clock.now().timestamp(), trade.price))
+            volume, value = self.volumes.get(trade.symbol, (0, 0.0))
+            self.volumes[trade.symbol] = (volume + trade.size, value + trade.price * trade.size)
+            self.ticked.add(trade.symbol)
+            self.cond.notify_all()
+
+    def traded(self, symbol):
+        # (volume, $ value) of the trades since the previous price of the
+        # symbol from next_prices(), (None, None) if the price was polled
+        return self.returned.get(symbol, (None, None))
+
+    def latest(self, symbol):
+        with self.cond:
+            buf = self.prices.get(symbol)
+            return buf[-1][1] if buf else None
+
+    def next_prices(self, symbols):
+        # wait for trades on any of the symbols or until the next symbol is due
+        # for a poll, returns dict of symbol -> price for the symbols with new prices
+        symbols = set(symbols)
+        prices = {}
+        self.returned = {}
+        if not symbols:
+            self.clock.sleep(self.interval)
+            return prices
+        with self.cond:
+            while True:
+                now = self.clock.now().timestamp()
+                ticked = self.ticked & symbols
+                due = [s for s in symbols if now - self.last_seen.get(s, 0) >= self.interval]
+                if ticked or due:
+                    break
+                next_due = min(self.last_seen.get(s, 0) for s in symbols) + self.interval
+                self.clock.wait(self.cond, max(next_due - now, 0.01))
+            self.ticked -= ticked
+            for symbol in ticked:
+                prices[symbol] = self.prices[symbol][-1][1]
+                self.returned[symbol] = self.volumes.pop(symbol, (None, None))
+                self.last_seen[symbol] = now
+        # no trades streamed recently, poll instead
+        for symbol in due:
+            if symbol not in prices:
+                price = self.poll_fn(symbol)
+                if price is not None:
+                    prices[symbol] = price
+                self.last_seen[symbol] = now
+        return prices
@@ -0,0 +1,178 @@
+"""
+StockBot
+
+https://github.com/shirosaidev/stockbot
+
+Copyright (C) Chris Park (shirosai) 2021
+stockbot is released under the Apache 2.0 license. See
+LICENSE for the full license text.
+"""
+
+import ast
+import csv
+import itertools
+import optparse
+import os
+import random
+import shutil
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+
+import numpy as np
+
+from .backtest import Backtest, DailyBars, MinuteBars, config_params, load_daily
+
+
+# runs the backtest over a grid or random sample of config settings on a
+# process pool. the daily bars are loaded once and saved to a .npy file that
+# every worker memory maps, so all workers read the same pages from the os
+# cache and no bar data is pickled per task
+
+# daily bars of the worker process, set by init_worker
+_daily = None
+_minutes = None
+
+# fields of the (5 x symbols x days) shared bars array
+BAR_FIELDS = ('opens', 'highs', 'lows', 'closes', 'volumes')
+
+
+def parse_value(value):
+    # numbers and lists are python literals, anything else (like "10:30") is a string
+    try:
+        return ast.literal_eval(value)
+    except (ValueError, SyntaxError):
+        return value
+
+
+def parse_grid(specs):
+    # ["SELL_PERCENT_GAIN=1,2,3", ...] -> {'SELL_PERCENT_GAIN': [1, 2, 3], ...}
+    grid = {}
+    for spec in specs:
+        name, _, values = spec.partition('=')
+        if not values:
+            raise ValueError('bad param "{}", use NAME=value1,value2,...'.format(spec))
+        grid[name.strip()] = [parse_value(v.strip()) for v in values.split(';' if '[' in values else ',')]
+    return grid
+
+
+def param_sets(grid, samples=None, seed=None):
+    names = list(grid)
+    combos = list(itertools.product(*(grid[name] for name in names)))
+    if samples and samples < len(combos):
+        combos = random.Random(seed).sample(combos, samples)
+    return [dict(zip(names, combo)) for combo in combos]
+
+
+def share_bars(daily, tmpdir):
+    path = os.path.join(tmpdir, 'bars.npy')
+    np.save(path, np.stack([getattr(daily, field) for field in BAR_FIELDS]))
+    return path
+
+
+def init_worker(bars_file, symbols, days, companies, datadir, minute_cache):
+    global _daily, _minutes
+    bars = np.load(bars_file, mmap_mode='r')
+    _daily = DailyBars(symbols, days, *bars, companies=companies)
+    _minutes = MinuteBars(datadir)
+    # the same pick/day minute bars get replayed by many param sets
+    _minutes.get = lru_cache(maxsize=minute_cache)(_minutes.get)
+
+
+def run_one(task):
+    base, overrides, start, end = task
+    params = dict(base)
+    params.update(overrides)
+    tradealgo = params.pop('tradealgo')
+    startbuytime = params.pop('startbuytime')
+    bt = Backtest(_daily, _minutes, params, tradealgo, startbuytime).run(start, end)
+    result = dict(overrides)
+    result.update(bt.totals())
+    return result
+
+
+def sweep(datadir, grid, base=None, start=None, end=None, samples=None, seed=None,
+          workers=None, minute_cache=4096, barstore=None):
+    base = dict(base or config_params())
+    base.setdefault('tradealgo', 'moved')
+    base.setdefault('startbuytime', 'buyatopen')
+    daily = load_daily(datadir, barstore)
+    tasks = [(base, overrides, start, end) for overrides in param_sets(grid, samples, seed)]
+    workers = workers or os.cpu_count()
+    tmpdir = tempfile.mkdtemp(prefix='stockbot_sweep_')
+    try:
+        bars_file = share_bars(daily, tmpdir)
+        initargs = (bars_file, daily.symbols, daily.days, daily.companies, datadir, minute_cache)
+        with ProcessPoolExecutor(max_workers=workers, initializer=init_worker, initargs=initargs) as pool:
+            chunksize = max(1, len(tasks) // (workers * 4))
+            return list(pool.map(run_one, tasks, chunksize=chunksize))
+    finally:
+        shutil.rmtree(tmpdir, ignore_errors=True)
+
+
+def rank(results, sort_by='profit'):
+    return sorted(results, key=lambda r: r[sort_by], reverse=True)
+
+
+def write_results(csv_file, results):
+    with open(csv_file, 'w') as f:
+        writer = csv.DictWriter(f, fieldnames=['rank'] + list(results[0]))
+        writer.writeheader()
+        for i, result in enumerate(results, 1):
+            writer.writerow(dict(result, rank=i))
+
+
+def print_table(results, top=10):
+    cols = list(results[0])
+    rows = [[str(i)] + [str(r[c]) for c in cols] for i, r in enumerate(results[:top], 1)]
+    widths = [max(len(x) for x in col) for col in zip(['rank'] + cols, *rows)]
+    for row in [['rank'] + cols] + rows:
+        print('  '.join(x.ljust(w) for x, w in zip(row, widths)))
+
+
+def main(argv=None):
+    usage = """Usage: python -m stockbot sweep [-h] -d datadir [-S barstore] -p NAME=v1,v2,... [-p ...] [-t algos] [-b buytimes] [-n samples] [-w workers] [-o results.csv]
+
+Backtest stockbot over a grid of config settings in parallel and rank the results.
+
+Example: python -m stockbot sweep -d data -p SELL_PERCENT_GAIN=1,2,3 -p MOVED_DAYS=3,5 -p BAO_BUY_END_TIME=10:30,11:00 -t moved,lowtohigh"""
+    parser = optparse.OptionParser(usage=usage)
+    parser.add_option('-d', '--datadir', default='data',
+                        help='directory with day/ and minute/ bar csvs, default "%default"')
+    parser.add_option('-S', '--barstore',
+                        help='read daily bars from this bar store directory (barstore.py) instead of datadir/day')
+    parser.add_option('-p', '--param', action='append', default=[],
+                        help='config setting and values to sweep, NAME=v1,v2,... (use ; to separate list values), can be repeated')
+    parser.add_option('-t', '--tradealgo', default='moved',
+                        help='comma separated algos to sweep, default "%default"')
+    parser.add_option('-b', '--startbuytime', default='buyatopen',
+                        help='comma separated buy times to sweep, default "%default"')
+    parser.add_option('-s', '--startdate', help='first day to trade (YYYY-MM-DD)')
+    parser.add_option('-e', '--enddate', help='last day to trade (YYYY-MM-DD)')
+    parser.add_option('-n', '--samples', type='int',
+                        help='run a random sample of this many param sets instead of the full grid')
+    parser.add_option('--seed', type='int', help='random seed for -n')
+    parser.add_option('-w', '--workers', type='int', help='number of worker processes, default number of cpus')
+    parser.add_option('-r', '--rankby', default='profit',
+                        help='result column to rank by, profit, win_rate, avg_percent or equity, default "%default"')
+    parser.add_option('-o', '--output', default='sweep_results.csv',
+                        help='ranked results csv file, default "%default"')
+    options, args = parser.parse_args(argv)
+
+    grid = parse_grid(options.param)
+    grid['tradealgo'] = options.tradealgo.split(',')
+    grid['startbuytime'] = options.startbuytime.split(',')
+    start_time = time.time()
+    results = sweep(options.datadir, grid, start=options.startdate, end=options.enddate,
+                    samples=options.samples, seed=options.seed, workers=options.workers,
+                    barstore=options.barstore)
+    results = rank(results, options.rankby)
+    write_results(options.output, results)
+    print_table(results)
+    print('ran {} param sets in {}s, results in {}'.format(len(results), round(time.time() - start_time, 2),
+                                                        options.output))
+
+
+if __name__ == "__main__":
+    main()
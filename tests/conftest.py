@@ -0,0 +1,63 @@
+"""
+StockBot
+
+https://github.com/shirosaidev/stockbot
+
+Copyright (C) Chris Park (shirosai) 2021
+stockbot is released under the Apache 2.0 license. See
+LICENSE for the full license text.
+"""
+
+import uuid
+from types import SimpleNamespace
+
+import pytest
+
+
+# fixtures shared by the tests, run from repo root with: python -m pytest tests
+
+PRICES = {('AAA', 'buy'): 10, ('AAA', 'sell'): 11, ('BBB', 'buy'): 20, ('BBB', 'sell'): 18, ('CCC', 'buy'): 30}
+
+
+class Account:
+    # enough of alpaca's REST for OrderExecutor and OrderLedger, orders fill
+    # right away at the symbol's price, or only fills[symbol] shares of them
+    # until they're canceled
+
+    # before the submitted time of every order
+    after = '2021-03-01T14:00:00Z'
+
+    def __init__(self, prices, fills=None):
+        self.prices = prices
+        self.fills = fills or {}
+        self.orders = []
+        self.canceled = []
+
+    def submit_order(self, symbol, qty, side, type, time_in_force, client_order_id=None):
+        filled = self.fills.get(symbol, qty)
+        status = 'filled' if filled == qty else 'partially_filled' if filled else 'new'
+        order = SimpleNamespace(id=str(uuid.uuid4()), client_order_id=client_order_id, symbol=symbol, qty=str(qty),
+                                side=side, status=status, filled_qty=str(filled),
+                                filled_avg_price=str(self.prices[symbol, side]) if filled else None,
+                                submitted_at='2021-03-01T15:{:02d}:00Z'.format(len(self.orders)))
+        self.orders.append(order)
+        return order
+
+    def get_order_by_client_order_id(self, client_order_id):
+        return next(order for order in self.orders if order.client_order_id == client_order_id)
+
+    def cancel_order(self, order_id):
+        order = next(order for order in self.orders if order.id == order_id)
+        self.canceled.append(order.symbol)
+        order.status = 'canceled'
+
+    def list_orders(self, status='open', limit=50, after=None, direction='desc'):
+        if status == 'open':
+            return []
+        return [order for order in self.orders if order.submitted_at > after][:limit]
+
+
+@pytest.fixture
+def api():
+    # a fake alpaca account trading AAA, BBB and CCC
+    return Account(PRICES)
@@ -0,0 +1,64 @@
+"""
+StockBot
+
+https://github.com/shirosaidev/stockbot
+
+Copyright (C) Chris Park (shirosai) 2021
+stockbot is released under the Apache 2.0 license. See
+LICENSE for the full license text.
+"""
+
+from datetime import datetime
+
+import numpy as np
+import pytest
+from pytz import timezone
+
+tradeapi = pytest.importorskip('alpaca_trade_api')
+
+from stockbot import standin
+from stockbot.bars import get_barsets
+from stockbot.barstore import BarStore
+from stockbot.scheduler import VirtualClock
+
+
+# daily bars through alpaca_trade_api's REST against the stand-in exchange,
+# the v1 get_barset or the v2 get_bars depending on the installed version,
+# run from repo root with: python -m pytest tests
+
+TZ = timezone('US/Eastern')
+
+
+@pytest.fixture
+def exchange(monkeypatch):
+    market = standin.SimMarket.synthetic(250, np.datetime64('2021-03-01'), 3, history=30)
+    clock = VirtualClock(TZ, TZ.localize(datetime(2021, 3, 2, 12, 0)))
+    server = standin.serve(market=market, clock=clock)
+    monkeypatch.setenv('APCA_API_DATA_URL', standin.base_url(server))
+    yield market, clock, tradeapi.REST('standin', 'standin', standin.base_url(server))
+    server.shutdown()
+
+
+def closes(market, clock, symbol, limit):
+    return [bar['c'] for bar in market.bars(symbol, clock.now(), limit)]
+
+
+def test_get_barsets(exchange):
+    market, clock, api = exchange
+    barsets = get_barsets(api, market.symbols, 'day', limit=5, chunk_size=100)
+    assert set(barsets) == set(market.symbols)
+    for symbol in market.symbols[:10]:
+        assert [bar.c for bar in barsets[symbol]] == closes(market, clock, symbol, 5)
+    assert get_barsets(api, ['NOPE'], 'day', limit=5) == {'NOPE': []}
+
+
+def test_barstore_update(exchange, tmp_path):
+    market, clock, api = exchange
+    store = BarStore(str(tmp_path))
+    assert store.update(api, market.symbols, 20) == len(market.symbols) * 20
+    # a day later only the last stored bar and the new one are fetched
+    clock.sleep(86400)
+    assert store.update(api, market.symbols, 20) == len(market.symbols) * 2
+    opens, stored = store.arrays(market.symbols[:5], 5)
+    for symbol, row in zip(market.symbols[:5], stored):
+        assert row.tolist() == closes(market, clock, symbol, 5)
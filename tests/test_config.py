@@ -0,0 +1,57 @@
+"""
+StockBot
+
+https://github.com/shirosaidev/stockbot
+
+Copyright (C) Chris Park (shirosai) 2021
+stockbot is released under the Apache 2.0 license. See
+LICENSE for the full license text.
+"""
+
+import os
+
+import pytest
+
+from stockbot.config import Config
+
+
+# strategy names that can't be in a client order id are rejected when the
+# config is loaded, and market data doesn't need the default account, run
+# from repo root with: python -m pytest tests
+
+SAMPLE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'config.py.sample')
+
+
+def config_with(tmp_path, strategies):
+    path = tmp_path / 'config.py'
+    path.write_text('STRATEGIES = {!r}\n'.format(strategies))
+    return str(path)
+
+
+@pytest.mark.parametrize('name', ['moved-open', '', 'a' * 16, None, 'open close'])
+def test_bad_strategy_names(tmp_path, name):
+    with pytest.raises(ValueError):
+        Config.load(config_with(tmp_path, [{'name': name, 'tradealgo': 'moved', 'startbuytime': 'buyatopen'}]))
+
+
+def test_strategy_names(tmp_path):
+    strategies = [{'name': 'moved_open', 'tradealgo': 'moved', 'startbuytime': 'buyatopen'},
+                  {'name': 'a' * 15, 'tradealgo': 'lowtohigh', 'startbuytime': 'buyatclose'}]
+    assert Config.load(config_with(tmp_path, strategies)).STRATEGIES == strategies
+    assert Config.load(SAMPLE).STRATEGIES
+
+
+def test_market_data_from_named_account(monkeypatch):
+    pytest.importorskip('alpaca_trade_api')
+    from stockbot.bot import Context
+    for var in ('APCA_API_KEY_ID', 'APCA_API_SECRET_KEY'):
+        monkeypatch.delenv(var, raising=False)
+        monkeypatch.setenv('PAPER_' + var, 'paper')
+    monkeypatch.setenv('PAPER_APCA_API_BASE_URL', 'http://127.0.0.1:1')
+    context = Context(Config.load(SAMPLE, BAR_STORE_DIR=None))
+    context.data_account = 'paper'
+    try:
+        assert context.market.api is context.account('paper').api
+        assert list(context.accounts) == ['paper']
+    finally:
+        context.close()
@@ -0,0 +1,51 @@
+"""
+StockBot
+
+https://github.com/shirosaidev/stockbot
+
+Copyright (C) Chris Park (shirosai) 2021
+stockbot is released under the Apache 2.0 license. See
+LICENSE for the full license text.
+"""
+
+import json
+
+import pytest
+
+from stockbot.fetcher import Quote, QuoteFetcher, parse_quote
+
+
+# a yahoo chart response that isn't the expected json is a failed quote, the
+# fallback's quote is used if there is one, run from repo root with:
+# python -m pytest tests
+
+BAD_BODIES = [
+    b'not json',
+    b'{"chart": {}}',
+    b'{"chart": {"result": [{"meta": {}, "indicators": {"quote": []}}]}}',
+    b'{"chart": {"result": [null]}}',
+    b'{"chart": {"result": [{"meta": {"exchangeName": "NMS", "regularMarketPrice": 1.0}, "indicators": null}]}}',
+    ]
+
+
+class BadYahoo(QuoteFetcher):
+    def __init__(self, body, fallback=None):
+        super().__init__(rate=0, fallback=fallback)
+        self.body = body
+
+    def fetch_yahoo(self, symbol):
+        return parse_quote(symbol, self.body)
+
+
+@pytest.mark.parametrize('body', BAD_BODIES)
+def test_bad_chart(body):
+    assert BadYahoo(body).fetch('AAA') is None
+    fallback = Quote('AAA', None, 9.0, None, None, None)
+    assert BadYahoo(body, fallback=lambda symbol: fallback).fetch('AAA') is fallback
+
+
+def test_chart():
+    body = json.dumps({'chart': {'result': [{'meta': {'exchangeName': 'NMS', 'regularMarketPrice': 10.5},
+                                             'indicators': {'quote': [{'high': [11], 'low': [10], 'volume': [100]}]}}]}})
+    quote = BadYahoo(body.encode()).fetch('AAA')
+    assert (quote.symbol, quote.exchange, quote.price) == ('AAA', 'NMS', 10.5)
@@ -0,0 +1,62 @@
+"""
+StockBot
+
+https://github.com/shirosaidev/stockbot
+
+Copyright (C) Chris Park (shirosai) 2021
+stockbot is released under the Apache 2.0 license. See
+LICENSE for the full license text.
+"""
+
+import pytest
+
+pytest.importorskip('alpaca_trade_api')
+pytest.importorskip('pandas')
+
+from stockbot.history import TradeHistory
+from stockbot.orders import OrderExecutor, OrderLedger
+from stockbot.report import summarize
+
+
+# two strategies trading in one account record their own day's profit/loss
+# in the trade history, run from repo root with: python -m pytest tests
+
+DAY = '2021-03-01'
+
+
+def trade_row(symbol, buy, sell, qty):
+    return [symbol, symbol + ' Inc.', buy, DAY + 'T09:42:00-05:00', sell, DAY + 'T13:10:00-05:00',
+            round(sell - buy, 2), round((sell - buy) / buy * 100, 2), 100000, 200000, qty]
+
+
+def test_days_of_strategies_in_one_account(api, tmp_path):
+    orders = OrderExecutor(api)
+    try:
+        for side in ('buy', 'sell'):
+            sent = [orders.submit('AAA', 5, side, prefix='stockbot-open'),
+                    orders.submit('BBB', 2, side, prefix='stockbot-close')]
+            assert orders.wait(sent, timeout=10) == []
+    finally:
+        orders.close()
+
+    history = TradeHistory(str(tmp_path / 'history.db'))
+    for name, symbol, qty in (('open', 'AAA', 5), ('close', 'BBB', 2)):
+        ledger = OrderLedger(api, api.after, prefix='stockbot-{}-'.format(name))
+        ledger.update()
+        summary = summarize(ledger.change_percents(), verbose=False)
+        buy, sell = api.prices[symbol, 'buy'], api.prices[symbol, 'sell']
+        history.record_day(DAY, name, 'moved', 'buyatopen', [trade_row(symbol, buy, sell, qty)], summary, 0.1, 5000)
+    days = {row[0]: row[1:] for row in history.read('SELECT strategy, trades, buy, sell, profit FROM days')}
+    assert days == {'open': (1, 50, 55, 5), 'close': (1, 40, 36, -4)}
+    assert history.totals(strategy='open')['profit'] == 5
+    assert history.totals(strategy='close')['profit'] == -4
+
+
+def test_trades_keep_their_filled_shares(tmp_path):
+    # a partially filled trade's profit is only of the shares it filled
+    history = TradeHistory(str(tmp_path / 'history.db'))
+    summary = {'total_buy': 70, 'total_sell': 76}
+    history.record_day(DAY, 'open', 'moved', 'buyatopen', [trade_row('AAA', 10, 11, 5), trade_row('BBB', 10, 11, 1)],
+                       summary, 0.1, 5000)
+    assert history.read('SELECT symbol, qty FROM trades ORDER BY symbol') == [('AAA', 5), ('BBB', 1)]
+    assert history.totals()['profit'] == 6
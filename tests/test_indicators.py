@@ -0,0 +1,126 @@
+"""
+StockBot
+
+https://github.com/shirosaidev/stockbot
+
+Copyright (C) Chris Park (shirosai) 2021
+stockbot is released under the Apache 2.0 license. See
+LICENSE for the full license text.
+"""
+
+import numpy as np
+import pytest
+
+from stockbot.backtest import buy_signals, sell_signals, trend_counts, trend_indicators
+from stockbot.indicators import Indicators
+
+
+# the rolling indicators against recomputing every window, and the same
+# values and signals as backtest's arrays, run from repo root with:
+# python -m pytest tests
+
+WINDOW = 15
+
+
+def random_prices(n=500, seed=0):
+    return np.round(50 + np.cumsum(np.random.default_rng(seed).normal(0, 0.05, n)), 2)
+
+def test_ups_downs_match_backtest():
+    prices = random_prices()
+    window = WINDOW
+    num_prices, ups, downs = trend_counts(prices[None, :], window)
+    indicators = Indicators(window)
+    for i, price in enumerate(prices):
+        indicators.update(price)
+        changes = np.diff(prices[max(i - window + 1, 0):i + 1])
+        assert (indicators.ups, indicators.downs) == ((changes > 0).sum(), (changes < 0).sum())
+        assert (indicators.count, indicators.ups, indicators.downs) == (num_prices[0, i], ups[0, i], downs[0, i])
+
+
+def test_vwap():
+    indicators = Indicators()
+    # polled prices have no volume
+    indicators.update(10.0)
+    assert indicators.vwap is None
+    indicators.update(11.0, 100)
+    indicators.update(12.0, 300, 300 * 11.5)
+    assert indicators.vwap == round((11.0 * 100 + 300 * 11.5) / 400, 4)
+    assert indicators.change_percent(10.0) == 20.0
+    indicators.reset()
+    assert (indicators.count, indicators.last, indicators.vwap) == (0, None, None)
+
+
+def test_ema():
+    prices = random_prices()
+    alpha = 2 / (10 + 1)
+    ema, _, _, _ = trend_indicators(prices[None, :], WINDOW, ema_span=10)
+    indicators = Indicators(WINDOW, ema_span=10)
+    expected = prices[0]
+    for i, price in enumerate(prices):
+        indicators.update(price)
+        expected = expected + alpha * (price - expected)
+        assert indicators.ema == pytest.approx(expected)
+        assert ema[0, i] == pytest.approx(expected)
+
+
+def test_high_low():
+    prices = random_prices()
+    _, high, low, _ = trend_indicators(prices[None, :], WINDOW)
+    indicators = Indicators(WINDOW)
+    assert (indicators.high, indicators.low) == (None, None)
+    for i, price in enumerate(prices):
+        indicators.update(price)
+        last = prices[max(i - WINDOW + 1, 0):i + 1]
+        assert (indicators.high, indicators.low) == (last.max(), last.min())
+        assert (high[0, i], low[0, i]) == (last.max(), last.min())
+        # the deques only keep prices that can still be the high/low
+        assert len(indicators.highs) <= WINDOW and len(indicators.lows) <= WINDOW
+
+
+def test_slope():
+    prices = random_prices()
+    _, _, _, slope = trend_indicators(prices[None, :], WINDOW)
+    indicators = Indicators(WINDOW)
+    indicators.update(prices[0])
+    assert indicators.slope == 0.0
+    for i, price in enumerate(prices[1:], 1):
+        indicators.update(price)
+        last = prices[max(i - WINDOW + 1, 0):i + 1]
+        expected = np.polyfit(np.arange(len(last)), last, 1)[0]
+        assert indicators.slope == pytest.approx(expected, abs=1e-9)
+        assert slope[0, i] == pytest.approx(expected, abs=1e-9)
+    # a straight line's slope
+    indicators.reset()
+    for price in range(20):
+        indicators.update(10 + 0.5 * price)
+    assert indicators.slope == pytest.approx(0.5)
+
+
+def test_signals_match_backtest():
+    for seed in range(5):
+        prices = random_prices(seed=seed)
+        buys = buy_signals(prices[None, :], WINDOW)[0]
+        sells = sell_signals(prices[None, :], WINDOW, 1.0)[0]
+        indicators = Indicators(WINDOW)
+        for i, price in enumerate(prices):
+            indicators.update(price)
+            assert indicators.buy_signal() == buys[i]
+            assert indicators.sell_signal(1.0) == sells[i]
+        assert buys.any() and sells.any()
+
+
+def test_signals():
+    indicators = Indicators(WINDOW)
+    for price in np.linspace(10, 11, 10):
+        indicators.update(price)
+    assert indicators.buy_signal()
+    # below the VWAP of the traded volumes it isn't bought
+    indicators.update(11.1, 100, 100 * 12.0)
+    assert not indicators.buy_signal()
+    # sold after falling SELL_PERCENT_GAIN from the high even while it went
+    # up more than down
+    for price in np.linspace(11.2, 12, 10):
+        indicators.update(price)
+    assert not indicators.sell_signal(5)
+    indicators.update(11.3)
+    assert indicators.ups > indicators.downs and indicators.sell_signal(5)
@@ -0,0 +1,177 @@
+"""
+StockBot
+
+https://github.com/shirosaidev/stockbot
+
+Copyright (C) Chris Park (shirosai) 2021
+stockbot is released under the Apache 2.0 license. See
+LICENSE for the full license text.
+"""
+
+import os
+from datetime import datetime
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+from pytz import timezone
+
+tradeapi = pytest.importorskip('alpaca_trade_api')
+pytest.importorskip('pandas')
+
+from stockbot import standin
+from stockbot.bot import Context, StockBot
+from stockbot.config import Config
+from stockbot.journal import Journal
+from stockbot.orders import list_open_orders
+from stockbot.positions import PositionBook
+from stockbot.scheduler import VirtualClock
+
+
+# a strategy restarted after crashing mid-buy or mid-sell recovers its
+# positions from the journal against the stand-in exchange, run from repo
+# root with: python -m pytest tests
+
+TZ = timezone('US/Eastern')
+SAMPLE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'config.py.sample')
+
+
+@pytest.fixture
+def exchange(monkeypatch, tmp_path):
+    # on 2021-03-01 at 3:00pm with the market open
+    market = standin.SimMarket.synthetic(20, np.datetime64('2021-03-01'), 3, history=30)
+    clock = VirtualClock(TZ, TZ.localize(datetime(2021, 3, 1, 15, 0)))
+    server = standin.serve(market=market, clock=clock)
+    for var in ('APCA_API_BASE_URL', 'APCA_API_DATA_URL'):
+        monkeypatch.setenv(var, standin.base_url(server))
+    for var in ('APCA_API_KEY_ID', 'APCA_API_SECRET_KEY'):
+        monkeypatch.setenv(var, 'standin')
+    journal = Journal(str(tmp_path / 'journal.db'), clock)
+    yield market, clock, journal
+    journal.close()
+    server.shutdown()
+
+
+def start_bot(clock, journal):
+    # a strategy (re)started with the journal, as the run command does
+    context = Context(Config.load(SAMPLE, BAR_STORE_DIR=None))
+    bot = StockBot(context, 'moved', 'buyatopen', 'poll', clock=clock, journal=journal, name='open')
+    bot.recover()
+    return bot
+
+
+def send_order(bot, symbol, side, price, qty=5):
+    # the order sent and journaled by the bot before it crashed
+    book = bot.book or PositionBook()
+    state = book.get(symbol) or book.add({'symbol': symbol, 'company': symbol + ' Inc.', 'volume': 1000})
+    if side == 'buy':
+        book.mark_bought(state, price, bot.clock.now().isoformat(), qty)
+    else:
+        book.mark_sold(state, price, bot.clock.now().isoformat())
+    order = bot.api.submit_order(symbol=symbol, qty=qty, side=side, type='market', time_in_force='day',
+                                 client_order_id='stockbot-open-{}-{}-{}'.format(side, symbol, side))
+    if side == 'buy':
+        bot.journal.buying(state, order)
+    else:
+        bot.journal.selling(state, order)
+    return state
+
+
+def test_crash_mid_buy(exchange):
+    market, clock, journal = exchange
+    symbol = market.symbols[0]
+    # buying before the open, the order waits for it
+    clock.sleep(17 * 3600)
+    bot = start_bot(clock, journal)
+    send_order(bot, symbol, 'buy', market.price(symbol, clock.now()))
+    journal.set_equity(5000)
+
+    bot = start_bot(clock, journal)
+    assert [position['symbol'] for position in bot.pending] == [symbol]
+    assert bot.book is None and bot.equity == 5000
+    # the next sell phase the order has filled, the stock is held at the fill price
+    clock.sleep(2 * 3600)
+    bot.recheck_pending()
+    fill = float(bot.api.list_positions()[0].avg_entry_price)
+    assert bot.pending == []
+    state = bot.book.get(symbol)
+    assert (state.bought, state.qty, state.buy_price) == (True, 5, fill)
+    assert bot.equity == pytest.approx(5000 - 5 * fill)
+    assert [(p['symbol'], p['status'], p['qty']) for p in journal.positions()] == [(symbol, 'held', 5)]
+
+
+def test_crash_mid_sell(exchange):
+    market, clock, journal = exchange
+    symbol = market.symbols[1]
+    bot = start_bot(clock, journal)
+    send_order(bot, symbol, 'buy', market.price(symbol, clock.now()))
+    journal.set_equity(5000)
+    bot = start_bot(clock, journal)
+    state = bot.book.get(symbol)
+    assert bot.pending == [] and state.qty == 5
+    # selling before the next open, the order waits for it
+    clock.sleep(17 * 3600)
+    send_order(bot, symbol, 'sell', market.price(symbol, clock.now()))
+
+    bot = start_bot(clock, journal)
+    assert [position['symbol'] for position in bot.pending] == [symbol]
+    assert bot.book is None
+    equity = bot.equity
+    clock.sleep(2 * 3600)
+    bot.recheck_pending()
+    sell = float(bot.api.get_order_by_client_order_id('stockbot-open-sell-{}-sell'.format(symbol)).filled_avg_price)
+    assert bot.pending == [] and bot.book is None
+    assert bot.equity == pytest.approx(equity + 5 * sell)
+    assert journal.positions() == []
+    trades = journal.trades(clock.now().date().isoformat())
+    assert [(row[0], row[4], row[10]) for row in trades] == [(symbol, sell, 5)]
+
+
+def test_orders_filled_while_down(exchange):
+    market, clock, journal = exchange
+    bought, sold = market.symbols[2], market.symbols[3]
+    bot = start_bot(clock, journal)
+    send_order(bot, sold, 'buy', market.price(sold, clock.now()))
+    journal.set_equity(5000)
+    bot = start_bot(clock, journal)
+    # crashed before the open with a buy and a sell order sent, restarted
+    # after both filled
+    clock.sleep(17 * 3600)
+    send_order(bot, bought, 'buy', market.price(bought, clock.now()), qty=3)
+    send_order(bot, sold, 'sell', market.price(sold, clock.now()))
+    equity = bot.equity
+    clock.sleep(2 * 3600)
+
+    bot = start_bot(clock, journal)
+    assert bot.pending == []
+    fill = float(bot.api.get_order_by_client_order_id('stockbot-open-buy-{}-buy'.format(bought)).filled_avg_price)
+    sell = float(bot.api.get_order_by_client_order_id('stockbot-open-sell-{}-sell'.format(sold)).filled_avg_price)
+    state = bot.book.get(bought)
+    assert (state.qty, state.buy_price) == (3, fill)
+    assert bot.book.get(sold) is None
+    assert bot.equity == pytest.approx(equity - 3 * fill + 5 * sell)
+    assert [(p['symbol'], p['status']) for p in journal.positions()] == [(bought, 'held')]
+    trades = journal.trades(clock.now().date().isoformat())
+    assert [(row[0], row[4], row[10]) for row in trades] == [(sold, sell, 5)]
+
+
+class OpenOrders:
+    # alpaca's list_orders of many open orders, at most limit at a time,
+    # several submitted in the same sec
+    def __init__(self, n):
+        self.orders = [SimpleNamespace(id=str(i), submitted_at='2021-03-01T15:{:02d}:{:02d}Z'.format(i // 600,
+                                                                                                    i // 10 % 60))
+                       for i in range(n)]
+        self.calls = 0
+
+    def list_orders(self, status='open', limit=50, after=None, direction='desc'):
+        self.calls += 1
+        orders = [order for order in self.orders if after is None or order.submitted_at > after.replace('+00:00', 'Z')]
+        return orders[:limit]
+
+
+def test_list_open_orders_pages():
+    api = OpenOrders(1234)
+    assert sorted(int(order.id) for order in list_open_orders(api, page_size=500)) == list(range(1234))
+    assert api.calls > 2
+    assert len(list_open_orders(OpenOrders(3))) == 3
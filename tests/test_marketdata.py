@@ -0,0 +1,84 @@
+"""
+StockBot
+
+https://github.com/shirosaidev/stockbot
+
+Copyright (C) Chris Park (shirosai) 2021
+stockbot is released under the Apache 2.0 license. See
+LICENSE for the full license text.
+"""
+
+import threading
+
+from stockbot.marketdata import QuoteCache
+
+
+# QuoteCache making one fetch per symbol for concurrent callers and fetching
+# again once a quote is older than ttl, run from repo root with:
+# python -m pytest tests
+
+class Quotes:
+    # fetch_all counting the fetches of each symbol, a fetch with AAA in it
+    # waits until released
+    def __init__(self):
+        self.calls = []
+        self.started = threading.Event()
+        self.release = threading.Event()
+        self.price = 10.0
+
+    def __call__(self, symbols):
+        self.calls.append(sorted(symbols))
+        if 'AAA' in symbols:
+            self.started.set()
+            assert self.release.wait(10)
+        return {symbol: self.price for symbol in symbols if symbol != 'NOPE'}
+
+
+class Now:
+    def __init__(self):
+        self.secs = 0.0
+
+    def __call__(self):
+        return self.secs
+
+
+def test_concurrent_callers_coalesce():
+    quotes = Quotes()
+    cache = QuoteCache(quotes, ttl=30, now=Now())
+    results = {}
+
+    def get(name, symbols):
+        results[name] = cache.get_many(symbols)
+
+    first = threading.Thread(target=get, args=('first', ['AAA', 'BBB']))
+    first.start()
+    assert quotes.started.wait(10)
+    # AAA is being fetched by the first caller, the second waits for it and
+    # only fetches CCC
+    second = threading.Thread(target=get, args=('second', ['AAA', 'CCC']))
+    second.start()
+    second.join(0.2)
+    assert second.is_alive()
+    quotes.release.set()
+    first.join(10)
+    second.join(10)
+    assert results == {'first': {'AAA': 10.0, 'BBB': 10.0}, 'second': {'AAA': 10.0, 'CCC': 10.0}}
+    assert sorted(quotes.calls) == [['AAA', 'BBB'], ['CCC']]
+    assert cache.stats() == {'hits': 0, 'misses': 3, 'coalesced': 1, 'hit_rate': 0.25}
+    assert cache.inflight == {}
+
+
+def test_ttl():
+    quotes = Quotes()
+    quotes.release.set()
+    now = Now()
+    cache = QuoteCache(quotes, ttl=30, now=now)
+    assert cache.get_many(['AAA', 'NOPE']) == {'AAA': 10.0}
+    quotes.price = 11.0
+    now.secs = 30
+    # still fresh, a symbol without a quote isn't kept
+    assert cache.get_many(['AAA', 'NOPE']) == {'AAA': 10.0}
+    now.secs = 30.5
+    assert cache.get_many(['AAA']) == {'AAA': 11.0}
+    assert quotes.calls == [['AAA', 'NOPE'], ['NOPE'], ['AAA']]
+    assert cache.stats()['hits'] == 1
@@ -0,0 +1,110 @@
+"""
+StockBot
+
+https://github.com/shirosaidev/stockbot
+
+Copyright (C) Chris Park (shirosai) 2021
+stockbot is released under the Apache 2.0 license. See
+LICENSE for the full license text.
+"""
+
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip('alpaca_trade_api')
+pd = pytest.importorskip('pandas')
+
+from stockbot.orders import OrderExecutor, OrderLedger
+
+
+# two strategies sending orders through one account's OrderExecutor, each
+# strategy's ledger only counts its own orders, orders not filled in time are
+# canceled and the ledger pages through more orders than a page, run from
+# repo root with: python -m pytest tests
+
+def test_ledger_counts_own_orders(api):
+    orders = OrderExecutor(api)
+    try:
+        sent = [orders.submit('AAA', 5, 'buy', prefix='stockbot-open'),
+                orders.submit('BBB', 2, 'buy', prefix='stockbot-close')]
+        assert orders.wait(sent, timeout=10) == []
+        sent = [orders.submit('AAA', 5, 'sell', prefix='stockbot-open'),
+                orders.submit('BBB', 2, 'sell', prefix='stockbot-close')]
+        assert orders.wait(sent, timeout=10) == []
+    finally:
+        orders.close()
+    assert all(order.client_order_id.startswith('stockbot-open-') for order in api.orders if order.symbol == 'AAA')
+
+    ledger = OrderLedger(api, api.after, prefix='stockbot-open-')
+    assert ledger.update() == 2
+    assert ledger.change_percents() == {'AAA': {'buy': 50, 'sell': 55, 'change': 10.0}}
+
+    ledger = OrderLedger(api, api.after, prefix='stockbot-close-')
+    assert ledger.update() == 2
+    assert ledger.change_percents() == {'BBB': {'buy': 40, 'sell': 36, 'change': -10.0}}
+
+    # without a prefix every order of the account is counted
+    ledger = OrderLedger(api, api.after)
+    assert ledger.update() == 4
+    assert set(ledger.change_percents()) == {'AAA', 'BBB'}
+
+
+def test_cancel_orders_not_filled_in_time(api):
+    api.fills = {'AAA': 2, 'BBB': 0}
+    orders = OrderExecutor(api)
+    try:
+        sent = [orders.submit(symbol, 5, 'buy') for symbol in ('AAA', 'BBB', 'CCC')]
+        pending = orders.wait(sent, timeout=0.5, poll_interval=0.1)
+        assert [order.symbol for order in pending] == ['AAA', 'BBB']
+        # the filled order isn't tracked anymore, the others are until they're canceled
+        assert sorted(order.symbol for order in orders.orders.values()) == ['AAA', 'BBB']
+        assert orders.cancel(pending, timeout=5, poll_interval=0.1) == []
+    finally:
+        orders.close()
+    assert sorted(api.canceled) == ['AAA', 'BBB']
+    assert [(order.status, order.fill_qty) for order in sent] == [('canceled', 2), ('canceled', 0), ('filled', 5)]
+    assert orders.orders == {}
+
+
+class ClosedOrders:
+    # alpaca's list_orders over many orders, oldest first and at most limit
+    # at a time, after is exclusive and several orders share each sec
+    def __init__(self):
+        self.orders = []
+        self.calls = 0
+
+    def add(self, symbol, side, status='filled'):
+        n = len(self.orders)
+        self.orders.append(SimpleNamespace(id=str(n), client_order_id='stockbot-open-{}-{}'.format(side, n),
+                                           symbol=symbol, side=side, status=status, filled_qty='1',
+                                           filled_avg_price='10' if side == 'buy' else '11',
+                                           submitted_at=pd.Timestamp('2021-03-01T15:00:00Z') +
+                                           pd.Timedelta(seconds=n // 4)))
+
+    def list_orders(self, status='open', limit=50, after=None, direction='desc'):
+        self.calls += 1
+        after = pd.Timestamp(after)
+        return [order for order in self.orders if order.submitted_at > after and
+                (order.status == 'new') == (status == 'open')][:limit]
+
+
+def test_ledger_pages_past_open_order():
+    api = ClosedOrders()
+    for i in range(1200):
+        api.add('AAA' if i % 2 else 'BBB', 'buy')
+    # an order still open early on holds the cursor
+    api.orders[100].status = 'new'
+    ledger = OrderLedger(api, '2021-03-01T14:00:00Z', page_size=500)
+    assert ledger.update() == 1199
+    assert api.calls > 3
+    assert ledger.cursor < api.orders[100].submitted_at
+    # the open order fills and more orders close, each is counted once
+    api.orders[100].status = 'filled'
+    for i in range(600):
+        api.add('AAA' if i % 2 else 'BBB', 'sell')
+    assert ledger.update() == 601
+    assert ledger.update() == 0
+    assert ledger.change_percents() == {'AAA': {'buy': 6000, 'sell': 3300, 'change': -45.0},
+                                        'BBB': {'buy': 6000, 'sell': 3300, 'change': -45.0}}
+    assert ledger.cursor >= api.orders[100].submitted_at
@@ -0,0 +1,72 @@
+"""
+StockBot
+
+https://github.com/shirosaidev/stockbot
+
+Copyright (C) Chris Park (shirosai) 2021
+stockbot is released under the Apache 2.0 license. See
+LICENSE for the full license text.
+"""
+
+from stockbot.positions import PositionBook
+
+
+# PositionBook's running bought/sold counts and each symbol's shares as
+# orders are placed, filled and not filled, run from repo root with:
+# python -m pytest tests
+
+STOCKS = [{'symbol': symbol, 'company': symbol + ' Inc.'} for symbol in ('AAA', 'BBB', 'CCC')]
+
+
+def counts(book):
+    return book.num_bought, book.num_sold, book.all_sold()
+
+
+def test_mark_and_unmark():
+    book = PositionBook(STOCKS)
+    aaa, bbb, ccc = (book.get(stock['symbol']) for stock in STOCKS)
+    assert len(book) == 3 and counts(book) == (0, 0, True)
+
+    # buy orders placed for 5 shares
+    book.mark_bought(aaa, 10.0, 't1', 5)
+    book.mark_bought(bbb, 20.0, 't1', 5)
+    assert counts(book) == (2, 0, False)
+    assert book.not_bought_symbols() == ['CCC'] and book.unsold_symbols() == ['AAA', 'BBB']
+    # filled, AAA only 2 shares, marking bought again doesn't count it twice
+    book.mark_bought(aaa, 10.1, 't1', 2)
+    book.mark_bought(bbb, 20.2, 't1', 5)
+    assert counts(book) == (2, 0, False)
+    assert (aaa.qty, aaa.buy_price, bbb.qty) == (2, 10.1, 5)
+    # CCC's buy order didn't fill, unmarking something not bought changes nothing
+    book.mark_bought(ccc, 30.0, 't1', 5)
+    book.unmark_bought(ccc)
+    book.unmark_bought(ccc)
+    assert counts(book) == (2, 0, False)
+    assert (ccc.bought, ccc.qty, ccc.buy_price) == (False, None, None)
+
+    book.mark_sold(aaa, 11.0, 't2')
+    book.mark_sold(aaa, 11.0, 't2')
+    assert counts(book) == (2, 1, False) and book.unsold_symbols() == ['BBB']
+    # BBB's sell didn't fill, it's still held with its shares
+    book.mark_sold(bbb, 21.0, 't2')
+    book.unmark_sold(bbb)
+    book.unmark_sold(bbb)
+    assert counts(book) == (2, 1, False)
+    assert (bbb.sold, bbb.qty, bbb.buy_price) == (False, 5, 20.2)
+    book.mark_sold(bbb, 21.5, 't3')
+    assert counts(book) == (2, 2, True)
+    assert [state.symbol for state in book.bought()] == ['AAA', 'BBB']
+
+
+def test_carry_over():
+    # stocks of yesterday's book that weren't sold are still held today
+    old = PositionBook(STOCKS[:2])
+    aaa, bbb = old.get('AAA'), old.get('BBB')
+    old.mark_bought(aaa, 10.0, 't1', 3)
+    old.mark_bought(bbb, 20.0, 't1', 5)
+    old.mark_sold(aaa, 11.0, 't2')
+    book = PositionBook([{'symbol': 'DDD'}])
+    book.carry_over(old)
+    assert counts(book) == (1, 0, False)
+    assert book.get('BBB') is bbb and bbb.qty == 5
+    assert book.get('AAA') is None and book.not_bought_symbols() == ['DDD']
@@ -0,0 +1,89 @@
+"""
+StockBot
+
+https://github.com/shirosaidev/stockbot
+
+Copyright (C) Chris Park (shirosai) 2021
+stockbot is released under the Apache 2.0 license. See
+LICENSE for the full license text.
+"""
+
+from datetime import date, datetime, timedelta
+from types import SimpleNamespace
+
+from pytz import timezone
+
+from stockbot.scheduler import MarketScheduler, VirtualClock
+
+
+# phases laid out on the trading days of the market calendar over
+# thanksgiving week 2021, closed on the 25th and closing at 1:00pm on the
+# 26th, run from repo root with: python -m pytest tests
+
+TZ = timezone('US/Eastern')
+
+CALENDAR = [('2021-11-22', '16:00'), ('2021-11-23', '16:00'), ('2021-11-24', '16:00'), ('2021-11-26', '13:00'),
+            ('2021-11-29', '16:00'), ('2021-11-30', '16:00')]
+
+BUY_AT_OPEN = {'get_stocks': '8:30', 'buy_start': '9:30', 'buy_end': '11:00', 'sell_start': '11:00',
+               'sell_end': '15:30'}
+BUY_AT_CLOSE = {'get_stocks': '14:30', 'buy_start': '15:00', 'buy_end': '16:00', 'sell_start': '9:30',
+                'sell_end': '14:00'}
+
+
+class Calendar:
+    # alpaca's get_calendar, dates as strings like the v2 api's
+    def __init__(self):
+        self.calls = 0
+
+    def get_calendar(self, start, end):
+        self.calls += 1
+        return [SimpleNamespace(date=day, open='09:30', close=close) for day, close in CALENDAR
+                if start <= day <= end]
+
+
+def phases(times, until, start=datetime(2021, 11, 22), buy_days=(0, 1, 2, 3, 4)):
+    # (name, start, end) of the phases until the day until, as 'MM-DD HH:MM'
+    clock = VirtualClock(TZ, TZ.localize(start))
+    api = Calendar()
+    out = []
+    for phase in MarketScheduler(api, times, list(buy_days), clock, lookahead_days=3):
+        if phase.start.date() >= until:
+            return out, api
+        # each phase is yielded once it's started
+        assert clock.now() == max(phase.start, clock.start)
+        out.append((phase.name, phase.start.strftime('%m-%d %H:%M'),
+                    phase.end.strftime('%H:%M') if phase.end else None))
+
+
+def test_holiday_and_early_close():
+    out, api = phases(BUY_AT_OPEN, date(2021, 11, 30))
+    days = sorted({start[:5] for _, start, _ in out})
+    # no phases on the holiday or the weekend
+    assert days == ['11-22', '11-23', '11-24', '11-26', '11-29']
+    assert out[:4] == [('get_stocks', '11-22 08:30', None), ('buy', '11-22 09:30', '11:00'),
+                       ('sell', '11-22 11:00', '15:30'), ('report', '11-22 15:35', None)]
+    # phases after the early close are moved to 5 min before it
+    assert [phase for phase in out if phase[1].startswith('11-26')] == [
+        ('get_stocks', '11-26 08:30', None), ('buy', '11-26 09:30', '11:00'), ('sell', '11-26 11:00', '12:55'),
+        ('report', '11-26 13:00', None)]
+    # the calendar is got a few days at a time
+    assert api.calls > 1
+
+
+def test_buy_at_close_early_close():
+    out, api = phases(BUY_AT_CLOSE, date(2021, 11, 27), buy_days=(0, 1, 3, 4))
+    # the 24th isn't a buy day
+    assert [phase for phase in out if phase[1].startswith('11-24')] == [
+        ('sell', '11-24 09:30', '14:00'), ('report', '11-24 14:05', None)]
+    # nothing on the holiday, buying on the 26th is moved to 5 min before the early close
+    assert not [phase for phase in out if phase[1].startswith('11-25')]
+    assert [phase for phase in out if phase[1].startswith('11-26')] == [
+        ('sell', '11-26 09:30', '12:55'), ('get_stocks', '11-26 12:55', None), ('buy', '11-26 12:55', '12:55'),
+        ('report', '11-26 13:00', None)]
+
+
+def test_starts_after_phases_already_over():
+    # started at noon, the day's get_stocks and buy are over, its sell isn't
+    out, api = phases(BUY_AT_OPEN, date(2021, 11, 23), start=datetime(2021, 11, 22, 12, 0))
+    assert out == [('sell', '11-22 11:00', '15:30'), ('report', '11-22 15:35', None)]
@@ -0,0 +1,49 @@
+"""
+StockBot
+
+https://github.com/shirosaidev/stockbot
+
+Copyright (C) Chris Park (shirosai) 2021
+stockbot is released under the Apache 2.0 license. See
+LICENSE for the full license text.
+"""
+
+import numpy as np
+
+from stockbot.scoring import top_k
+
+
+# top_k against a full stable sort, with tied and nan scores, run from repo
+# root with: python -m pytest tests
+
+def sorted_picks(scores, k):
+    # best first, ties in symbol order, nan scores never picked
+    order = np.argsort(-np.where(np.isnan(scores), -np.inf, scores), kind='stable')
+    return [i for i in order if not np.isnan(scores[i])][:k]
+
+
+def test_ties_and_nan():
+    scores = np.array([1.0, np.nan, 3.0, 3.0, 2.0, np.nan, 3.0, 1.0])
+    assert top_k(scores, 2).tolist() == [2, 3]
+    assert top_k(scores, 4).tolist() == [2, 3, 6, 4]
+    assert top_k(scores, 10).tolist() == [2, 3, 6, 4, 0, 7]
+    assert top_k(scores, 0).tolist() == []
+    assert top_k(np.full(3, np.nan), 2).tolist() == []
+    # per day, -1 where there are fewer than k stocks to pick from
+    days = np.stack([scores, scores[::-1]], axis=1)
+    assert top_k(days, 2).tolist() == [[2, 1], [3, 4]]
+    assert top_k(days, 7).tolist() == [[2, 1], [3, 4], [6, 5], [4, 3], [0, 0], [7, 7], [-1, -1]]
+
+
+def test_matches_sort():
+    rng = np.random.default_rng(0)
+    for _ in range(500):
+        n = rng.integers(1, 30)
+        k = rng.integers(0, 35)
+        # few distinct scores so there are many ties
+        scores = rng.integers(0, 4, n).astype(float)
+        scores[rng.random(n) < 0.3] = np.nan
+        expected = sorted_picks(scores, k)
+        assert top_k(scores, k).tolist() == expected
+        days = np.stack([scores, scores], axis=1)
+        assert top_k(days, k).tolist() == [[i, i] for i in expected + [-1] * (min(k, n) - len(expected))]
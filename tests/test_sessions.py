@@ -0,0 +1,80 @@
+"""
+StockBot
+
+https://github.com/shirosaidev/stockbot
+
+Copyright (C) Chris Park (shirosai) 2021
+stockbot is released under the Apache 2.0 license. See
+LICENSE for the full license text.
+"""
+
+import pytest
+from requests import ConnectionError
+
+from stockbot.sessions import CircuitBreaker, CircuitOpenError, SessionPool
+
+
+# a host's circuit breaker going open -> half open -> closed (or open again)
+# and requests failing fast while it's open, run from repo root with:
+# python -m pytest tests
+
+class Now:
+    def __init__(self):
+        self.secs = 0.0
+
+    def __call__(self):
+        return self.secs
+
+
+def test_open_half_open_closed():
+    now = Now()
+    breaker = CircuitBreaker('host', failures=3, reset_secs=60, now=now)
+    assert breaker.state == 'closed'
+    # failures below the limit, and a success resets the count
+    breaker.failure()
+    breaker.failure()
+    breaker.success()
+    breaker.failure()
+    breaker.failure()
+    assert breaker.state == 'closed' and breaker.allow()
+    breaker.failure()
+    assert breaker.state == 'open' and not breaker.allow()
+    now.secs = 59.9
+    assert breaker.state == 'open' and not breaker.allow()
+    # after reset_secs a single trial request is let through
+    now.secs = 60
+    assert breaker.state == 'half_open'
+    assert breaker.allow()
+    assert breaker.state == 'half_open' and not breaker.allow()
+    breaker.success()
+    assert breaker.state == 'closed' and breaker.allow()
+
+
+def test_failed_trial_opens_again():
+    now = Now()
+    breaker = CircuitBreaker('host', failures=1, reset_secs=60, now=now)
+    breaker.failure()
+    now.secs = 60
+    assert breaker.allow()
+    # the trial failed, open for another reset_secs from now
+    breaker.failure()
+    now.secs = 100
+    assert breaker.state == 'open' and not breaker.allow()
+    now.secs = 120
+    assert breaker.state == 'half_open' and breaker.allow()
+    breaker.success()
+    assert breaker.state == 'closed'
+
+
+def test_request_fails_fast_while_open():
+    sleeps = []
+    pool = SessionPool(connect_timeout=1, max_retries=1, breaker_failures=2, breaker_reset_secs=60,
+                       sleep=sleeps.append)
+    # nothing listens on port 1, both tries fail and open the breaker
+    with pytest.raises(ConnectionError):
+        pool.request('http://127.0.0.1:1/quote', 'test', 'quote')
+    assert len(sleeps) == 1
+    assert pool.breaker('127.0.0.1:1').state == 'open'
+    with pytest.raises(CircuitOpenError):
+        pool.request('http://127.0.0.1:1/quote', 'test', 'quote')
+    assert len(sleeps) == 1
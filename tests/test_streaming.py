@@ -0,0 +1,108 @@
+"""
+StockBot
+
+https://github.com/shirosaidev/stockbot
+
+Copyright (C) Chris Park (shirosai) 2021
+stockbot is released under the Apache 2.0 license. See
+LICENSE for the full license text.
+"""
+
+import time
+from datetime import datetime
+
+import pytest
+from pytz import timezone
+
+pytest.importorskip('alpaca_trade_api')
+pytest.importorskip('websockets')
+pytest.importorskip('msgpack')
+
+from stockbot import standin
+from stockbot.scheduler import VirtualClock
+from stockbot.streaming import StreamFeed
+
+
+# drives StreamFeed against the stand-in market data websocket, run from
+# repo root with: python -m pytest tests
+
+TZ = timezone('US/Eastern')
+SYMBOLS = ['AAA', 'BBB']
+
+
+class Polls:
+    # poll_fn counting the polls of each symbol
+    def __init__(self, price=9.0):
+        self.price = price
+        self.calls = []
+
+    def __call__(self, symbol):
+        self.calls.append(symbol)
+        return self.price
+
+
+def stream_feed(polls, trade_interval, interval, clock=None):
+    url = standin.serve_stream(interval=trade_interval, price_fn=lambda symbol: 10.0)
+    return StreamFeed(polls, 'standin', 'standin', 'http://127.0.0.1:1', data_stream_url=url,
+                      interval=interval, clock=clock)
+
+
+def test_streamed_prices():
+    polls = Polls()
+    feed = stream_feed(polls, trade_interval=0.05, interval=60)
+    feed.start(SYMBOLS)
+    try:
+        # nothing streamed yet, every symbol is polled once
+        assert feed.next_prices(SYMBOLS) == {'AAA': 9.0, 'BBB': 9.0}
+        # then the prices come from the trades until a poll is due again
+        prices = {}
+        traded = {}
+        deadline = time.monotonic() + 10
+        while set(prices) != set(SYMBOLS) and time.monotonic() < deadline:
+            for symbol, price in feed.next_prices(SYMBOLS).items():
+                prices[symbol] = price
+                traded[symbol] = feed.traded(symbol)
+        assert prices == {'AAA': 10.0, 'BBB': 10.0}
+        # the stand-in's trades are of 100 shares
+        for volume, value in traded.values():
+            assert volume and volume % 100 == 0 and value == volume * 10.0
+        assert sorted(polls.calls) == SYMBOLS
+        assert feed.latest('AAA') == 10.0
+    finally:
+        feed.stop()
+
+
+def test_falls_back_to_polling():
+    # no trades in the test's time, the symbols are polled every interval
+    polls = Polls()
+    feed = stream_feed(polls, trade_interval=60, interval=0.2)
+    feed.start(SYMBOLS)
+    try:
+        assert feed.next_prices(SYMBOLS) == {'AAA': 9.0, 'BBB': 9.0}
+        start = time.monotonic()
+        assert feed.next_prices(SYMBOLS) == {'AAA': 9.0, 'BBB': 9.0}
+        assert time.monotonic() - start >= 0.15
+        assert feed.traded('AAA') == (None, None)
+        assert sorted(polls.calls) == sorted(SYMBOLS * 2)
+    finally:
+        feed.stop()
+
+
+def test_virtual_clock():
+    # on a virtual clock the wait for the next poll jumps the clock instead
+    # of the wall clock
+    clock = VirtualClock(TZ, TZ.localize(datetime(2021, 3, 1, 9, 30)))
+    polls = Polls()
+    feed = stream_feed(polls, trade_interval=60, interval=120, clock=clock)
+    feed.start(SYMBOLS)
+    try:
+        feed.next_prices(SYMBOLS)
+        start = time.monotonic()
+        assert feed.next_prices(SYMBOLS) == {'AAA': 9.0, 'BBB': 9.0}
+        assert time.monotonic() - start < 5
+        assert clock.now() >= TZ.localize(datetime(2021, 3, 1, 9, 32))
+        # no symbols to watch, sleeps the interval on the clock
+        feed.next_prices([])
+        assert clock.now() >= TZ.localize(datetime(2021, 3, 1, 9, 34))
+    finally:
+        feed.stop()